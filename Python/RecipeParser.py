@@ -1,44 +1,375 @@
 # coding: utf-8
 import bs4 as bs
+import codecs
+import importlib.util
+import re
 import urllib
 from urllib import request
 import os.path
-import ast
+import time
 from Python.help_me import *
+from Python.fetcher import fetch_page, get_host
+from Python.scheduler import retry_call
+from Python.timing import timed
+from Python.recipe import Recipe
+from Python.structured_data import get_structured_recipe
+from Python.sanitize import clean_title, get_file_name
+
+# where make_markdown() writes recipes by default
+RECIPE_DIRECTORY = os.path.dirname(os.path.dirname(__file__)) + "/Recipes/"
+
+# Backoff retrying the downloads of lets_get_soup(), None downloads once
+FETCH_BACKOFF = None
+
+# tree builder used by make_soup(), the C-backed lxml parser when available
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+
+def set_html_parser(name):
+    """
+    Selects the tree builder used for every recipe page
+    :param name: "lxml", "html.parser" or "html5lib"
+    :return: None, bs4.FeatureNotFound is raised if name isn't installed
+    """
+    global HTML_PARSER
+    bs.BeautifulSoup("", name)
+    HTML_PARSER = name
+
+
+# {'host': RecipeParse sub class}, filled in by @register
+PARSERS = {}
+
+
+def register(*hosts):
+    """
+    Class decorator registering a RecipeParse sub class for hosts
+    :param hosts: Host names without a leading "www.", e.g. "food52.com"
+    :return: Decorator returning the class unchanged
+    """
+    def decorator(cls):
+        for host in hosts:
+            PARSERS[host] = cls
+        return cls
+    return decorator
+
+
+def get_parser(url):
+    """
+    Picks the RecipeParse sub class able to parse url, sub domains such as
+    m.allrecipes.com fall back to their parent domain
+    :param url: Input url
+    :return: RecipeParse sub class, or None if the url is unsupported
+    """
+    host = get_host(url)
+    while host:
+        if host in PARSERS:
+            return PARSERS[host]
+        host = host.partition(".")[2]
+    return None
+
+
+def get_groups(lines):
+    """
+    Normalizes a list of lines, or a dict of sub-titled lists of lines, into
+    recipe groups
+    :param lines: List of form ['line0', ...] or dict of form
+    {'sub-title': ['line0', ...]}
+    :return: Tuple of form (('sub-title', ('line0', ... , 'lineX')), ...)
+    """
+    lines = get_plain_value(lines)
+    if isinstance(lines, dict):
+        return tuple(((title or '').strip(), tuple(group)) for title, group
+                     in lines.items() if group)
+    return (('', tuple(lines)),) if lines else ()
+
+
+def matches_attrs(attrs, region_attrs):
+    """
+    Checks tag attributes against the attributes of a region
+    :param attrs: Dictionary of tag attributes, values may be lists
+    :param region_attrs: Dictionary of form {'attr': 'value'}, a 'class'
+    value matches the whole class attribute or any one class
+    :return: True or False
+    """
+    for attr, value in region_attrs.items():
+        markup_value = attrs.get(attr)
+        if isinstance(markup_value, list):
+            markup_value = ' '.join(markup_value)
+        if markup_value is None:
+            return False
+        if markup_value != value and not (
+                attr == "class" and value in markup_value.split()):
+            return False
+    return True
+
+
+class RegionStrainer(bs.SoupStrainer):
+    def __init__(self, regions):
+        """
+        Generates RegionStrainer object, only letting the tree builder create
+        tags matching one of regions (along with everything inside them).
+        A plain SoupStrainer can't match a name and attributes per region,
+        so the tag filter bs4 calls while parsing is overridden, which is
+        why bs4 is pinned below 4.16 (checked by tests/test_parsers.py)
+        :param regions: Dictionary of form
+        {'region': ('tag name', {'attr': 'value'})}
+        :return: None
+        """
+        self.regions = list(regions.values())
+        super(RegionStrainer, self).__init__(
+            [name for name, attrs in self.regions])
+
+    def matches_region(self, name, attrs):
+        """
+        Checks a tag about to be created against every region
+        :param name: Tag name
+        :param attrs: Dictionary of raw tag attributes
+        :return: True or False
+        """
+        return any(name == region_name and matches_attrs(attrs, region_attrs)
+                   for region_name, region_attrs in self.regions)
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        """
+        Tag filter used while parsing by bs4 >= 4.13
+        :return: True or False
+        """
+        return self.matches_region(name, attrs or {})
+
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        """
+        Tag filter used while parsing by bs4 < 4.13
+        :return: True or False
+        """
+        return self.matches_region(markup_name, dict(markup_attrs))
+
+
+# <meta charset="x"> or <meta http-equiv=... content="text/html; charset=x">
+META_CHARSET = re.compile(br"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)",
+                          re.IGNORECASE)
+
+# bytes of a page searched for a <meta> charset, as browsers do
+CHARSET_SNIFF_BYTES = 2048
+
+BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16"),
+        (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def get_encoding(name):
+    """
+    Checks a charset name against the codecs python knows
+    :param name: Charset name or None
+    :return: Normalized codec name, or None if unknown
+    """
+    if not name:
+        return None
+    if isinstance(name, bytes):
+        name = name.decode('ascii', 'ignore')
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def sniff_charset(data, charset=None):
+    """
+    Picks the encoding of a page, as browsers do: a byte order mark wins,
+    else the Content-Type header charset, else a <meta> charset in the first
+    CHARSET_SNIFF_BYTES bytes. Charset names python doesn't know are skipped
+    :param data: Raw html bytes
+    :param charset: Charset from the Content-Type header or None
+    :return: Codec name, or None to let the parser guess
+    """
+    for bom, encoding in BOMS:
+        if data.startswith(bom):
+            return encoding
+    encoding = get_encoding(charset)
+    if encoding:
+        return encoding
+    match = META_CHARSET.search(data, 0, CHARSET_SNIFF_BYTES)
+    return get_encoding(match.group(1)) if match else None
+
+
+def make_soup(data, parser=None, regions=None, timings=None, charset=None):
+    """
+    Builds BeautifulSoup object from raw html, handing the bytes to the
+    tree builder as they are so they are decoded exactly once
+    :param data: Raw html bytes
+    :param parser: Tree builder to use, defaults to HTML_PARSER
+    :param regions: Optional dictionary of form
+    {'region': ('tag name', {'attr': 'value'})}, when given only those
+    subtrees are built
+    :param timings: Optional dictionary receiving 'charset' (charset
+    detection) and 'tree_build' (decoding and parsing) seconds
+    :param charset: Charset from the Content-Type header or None
+    :return: BeautifulSoup object
+    """
+    with timed(timings, "charset"):
+        encoding = sniff_charset(data, charset)
+    parse_only = RegionStrainer(regions) if regions else None
+    with timed(timings, "tree_build"):
+        return bs.BeautifulSoup(data, parser or HTML_PARSER,
+                                from_encoding=encoding,
+                                parse_only=parse_only)
+
+
+# {'set_* extractor name': field it sets}
+EXTRACTOR_FIELDS = {
+    "set_recipe_title": "title",
+    "set_recipe_img": "img_url",
+    "set_recipe_yield": "recipe_yield",
+    "set_ingredients": "ingredients",
+    "set_instructions": "instructions",
+}
 
 
 class RecipeParse(object):
-    def __init__(self, url):
+    # {'region': ('tag name', {'attr': 'value'})} holding the recipe, only
+    # these subtrees are parsed (None = all) and set_* methods look them up
+    # with get_first()/get_all() instead of searching the whole soup
+    regions = None
+    # fields taken from the page's JSON-LD when present, see from_html()
+    structured_fields = ("title", "img_url", "recipe_yield", "ingredients",
+                         "instructions")
+    # list fields whose lines the set_* methods pass through
+    # strip_bad_ascii_lines(), JSON-LD values of them are stripped too
+    ascii_fields = ()
+    # raw page bytes the soup is built from on first use, and their charset
+    html = None
+    charset = None
+    # seconds since the epoch the page was downloaded, None if unknown
+    fetched = None
+
+    def __init__(self, url, soup=None):
         """
         Generates generic RecipeParse object
         :param url: Input url
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        on first use if not given
         :return: None
         """
         self.url = url
-        self.soup = self.lets_get_soup()
+        self.soup = soup
         self.title = ''
         self.img_url = ''
         self.recipe_yield = ''
         self.ingredients = {}
         self.instructions = []
+        # {'stage': seconds} spent building and writing this recipe
+        self.timings = {}
+        # set by make_markdown()
+        self.markdown_file = ''
+        self.content_hash = ''
+        # fields set from JSON-LD, their set_* extractors are skipped
+        self.structured = set()
+        # {'region': [tags]} filled by match_regions() on first use
+        self.matches = None
+        # {id(tag): stripped text}, see get_node_text()
+        self.node_text = {}
+
+    @classmethod
+    def from_html(cls, url, data, charset=None, fetched=None):
+        """
+        Generates RecipeParse object from an already downloaded page, without
+        any network I/O. Fields found in the page's JSON-LD are set right
+        away, the soup is only built if a set_* extractor still needs it
+        :param url: Url the page was downloaded from
+        :param data: Raw html bytes or a prebuilt BeautifulSoup object
+        :param charset: Charset from the Content-Type header or None
+        :param fetched: Seconds since the epoch the page was downloaded
+        :return: RecipeParse object (of the calling sub class)
+        """
+        if isinstance(data, bs.BeautifulSoup):
+            recipe = cls(url, data)
+            recipe.fetched = fetched
+            return recipe
+        recipe = cls(url)
+        recipe.fetched = fetched
+        with timed(recipe.timings, "charset"):
+            recipe.charset = sniff_charset(data, charset)
+        recipe.html = data
+        with timed(recipe.timings, "json_ld"):
+            recipe.set_structured_data(
+                get_structured_recipe(data, recipe.charset))
+        return recipe
+
+    @property
+    def soup(self):
+        """
+        BeautifulSoup object of the page, built from self.html, or
+        downloaded if there is none, on first use
+        :return: BeautifulSoup object, or False if there is none
+        """
+        if self.html is not None:
+            html, self.html = self.html, None
+            self._soup = make_soup(html, regions=self.regions,
+                                   timings=self.timings,
+                                   charset=self.charset)
+        elif self._soup is None:
+            self._soup = self.lets_get_soup()
+        return self._soup
+
+    @soup.setter
+    def soup(self, value):
+        self._soup = value
+
+    def set_structured_data(self, fields):
+        """
+        Sets the fields listed in structured_fields from JSON-LD, sanitized
+        like the site's set_* methods do. Fields the site splits into
+        sub-titled groups (dicts) are left to the tree, JSON-LD doesn't have
+        the same groups
+        :param fields: Dictionary returned by get_structured_recipe()
+        :return: None
+        """
+        for name in self.structured_fields:
+            value = fields.get(name)
+            if not value or isinstance(getattr(self, name), dict):
+                continue
+            if name == "instructions":
+                value = [step for title, steps in value for step in steps]
+            if name in self.ascii_fields:
+                value = strip_bad_ascii_lines(value)
+            setattr(self, name, value)
+            self.structured.add(name)
 
     def __str__(self):
         """
         Generates markdown styled string
+        :return: String containing the whole recipe
+        """
+        return ''.join(self.iter_markdown())
+
+    def iter_markdown(self):
+        """
+        Generates markdown styled string piece by piece, overridden by each
+        site
+        :return: Generator of strings
+        """
+        return iter(())
+
+    def render_to(self, fp):
+        """
+        Writes markdown styled recipe to a file-like object piece by piece,
+        without building the whole document as one string
+        :param fp: Object with a write(string) method
         :return: None
         """
+        for piece in self.iter_markdown():
+            fp.write(piece)
 
     def lets_get_soup(self):
         """
-        Gets BeautifulSoup object from url
+        Gets BeautifulSoup object from url, retrying throttled (429) and
+        failed (5xx, timeouts) downloads only if FETCH_BACKOFF is set
         :return: False or BeautifulSoup object
         """
         try:
-            # pretend to be Firefox
-            req = urllib.request.Request(self.url,
-                                         headers={'User-Agent': 'Mozilla/5.0'})
-            with urllib.request.urlopen(req) as url_file:
-                url_byte = url_file.read()
+            if FETCH_BACKOFF:
+                url_byte, charset = retry_call(fetch_page, self.url,
+                                               FETCH_BACKOFF)
+            else:
+                url_byte, charset = fetch_page(self.url)
         except urllib.request.HTTPError as e:  # HTTP status code
             print(e.__str__())
             return False
@@ -53,15 +384,116 @@ class RecipeParse(object):
             return False
 
         try:
-            url_string = url_byte.decode(encoding='latin1').encode(
-                encoding='utf-8')
+            return make_soup(url_byte, regions=self.regions, charset=charset)
         except UnicodeDecodeError as e:
             print(e.__str__())
             return False
         except Exception as e:
             print(e.__str__())
             return False
-        return bs.BeautifulSoup(url_string, "html.parser")
+
+    def release_soup(self):
+        """
+        Drops the BeautifulSoup object once contents are set, converting all
+        recipe elements to plain strings, lists and dicts so the object is
+        small and picklable
+        :return: None
+        """
+        self.soup = False
+        self.html = None
+        self.matches = None
+        self.node_text = {}
+        for name in ("title", "img_url", "recipe_yield", "ingredients",
+                     "instructions"):
+            setattr(self, name, get_plain_value(getattr(self, name)))
+
+    def match_regions(self):
+        """
+        Walks the soup once, sorting every tag that matches a region into
+        self.matches in document order
+        :return: None
+        """
+        selectors = {}
+        for region, (name, attrs) in (self.regions or {}).items():
+            selectors.setdefault(name, []).append((region, attrs))
+        matches = dict((region, []) for region in self.regions or {})
+        with timed(self.timings, "match_regions"):
+            for tag in self.soup.find_all(list(selectors)):
+                for region, attrs in selectors[tag.name]:
+                    if matches_attrs(tag.attrs, attrs):
+                        matches[region].append(tag)
+        self.matches = matches
+
+    def get_all(self, region):
+        """
+        Gets every tag matching a region, like find_all() from the root
+        :param region: Key of self.regions
+        :return: List of tags
+        """
+        if self.matches is None:
+            self.match_regions()
+        return self.matches[region]
+
+    def get_first(self, region):
+        """
+        Gets the first tag matching a region, like find() from the root
+        :param region: Key of self.regions
+        :return: Tag, or None if the page has none
+        """
+        found = self.get_all(region)
+        return found[0] if found else None
+
+    def get_node_text(self, tag):
+        """
+        Gets the stripped text of a tag, computed once per tag
+        :param tag: Tag
+        :return: String
+        """
+        key = id(tag)
+        if key not in self.node_text:
+            self.node_text[key] = tag.get_text().strip()
+        return self.node_text[key]
+
+    def get_ingredient_groups(self):
+        """
+        Normalizes self.ingredients, a list or a {'sub-title': [lines]} dict
+        depending on the site
+        :return: Tuple of form (('sub-title', ('line0', ... , 'lineX')), ...)
+        """
+        return get_groups(self.ingredients)
+
+    def get_instruction_groups(self):
+        """
+        Normalizes self.instructions, a list or a {'sub-title': [steps]} dict
+        depending on the site
+        :return: Tuple of form (('sub-title', ('step0', ... , 'stepX')), ...)
+        """
+        return get_groups(self.instructions)
+
+    def get_recipe(self):
+        """
+        Builds the structured record of this recipe, call after
+        set_recipe_contents()
+        :return: Recipe object
+        """
+        return Recipe(type(self).__name__, self.url,
+                      get_plain_value(self.title),
+                      get_plain_value(self.img_url),
+                      get_plain_value(self.recipe_yield) or None,
+                      self.get_ingredient_groups(),
+                      self.get_instruction_groups())
+
+    def run_extractor(self, extractor):
+        """
+        Runs one of the set_* methods, recording its time in self.timings,
+        unless its field was already set from JSON-LD
+        :param extractor: Bound set_* method
+        :return: None
+        """
+        if EXTRACTOR_FIELDS.get(extractor.__name__) in self.structured:
+            return
+        with timed(self.timings, extractor.__name__):
+            extractor()
 
     def set_recipe_title(self):
         """
@@ -99,116 +531,163 @@ class RecipeParse(object):
         :return:
         """
 
-    def make_markdown(self):
+    def get_markdown_name(self):
+        """
+        Strips non ascii chars from the title and builds the file name, path
+        separators in the title become "-"
+        :return: String of form 'title.md'
         """
-        Creates and writes markdown styled recipe to a file
+        self.title = clean_title(self.title)
+        return get_file_name(self.title)
+
+    def write_markdown_temp(self, directory):
+        """
+        Writes markdown styled recipe to a hidden temp file in directory, to
+        be renamed over the real file once complete
+        :param directory: Output directory, ending in "/"
+        :return: String containing the temp file path
+        """
+        # created 0666 so the kernel applies the umask like open() would,
+        # mkstemp() would leave the renamed file 0600
+        while True:
+            temp_path = directory + "." + os.urandom(6).hex() + ".tmp"
+            try:
+                fd = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY,
+                             0o666)
+                break
+            except FileExistsError:
+                continue
+        start = time.perf_counter()
+        try:
+            with os.fdopen(fd, "w") as new_file:
+                sink = HashingWriter(new_file)
+                self.render_to(sink)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        seconds = time.perf_counter() - start
+        self.content_hash = sink.hash.hexdigest()
+        # time spent inside write() is I/O, the rest is rendering
+        self.timings["write"] = self.timings.get("write", 0.0) + sink.seconds
+        self.timings["render"] = self.timings.get("render", 0.0) + \
+            seconds - sink.seconds
+        return temp_path
+
+    def make_markdown(self, overwrite=False, directory=RECIPE_DIRECTORY,
+                      fsync=False):
+        """
+        Creates and writes markdown styled recipe to a file, atomically: the
+        file only appears once it is complete
+        :param overwrite: Replace an existing file of the same title instead
+        of raising FileExistsError
+        :param directory: Output directory, ending in "/"
+        :param fsync: Flush the file to disk before it is renamed into place
         :return: True or IOError is raised
         """
-        new_file = ''
-        directory = os.path.dirname(os.path.dirname(__file__)) + "/Recipes/"
         if not os.path.exists(directory):
             os.makedirs(directory)
 
+        x = directory + self.get_markdown_name()
+        if not overwrite and os.path.isfile(x):
+            raise FileExistsError(x)
+        temp_path = self.write_markdown_temp(directory)
         try:
-            self.title = ''.join(c for c in self.title if 0 < ord(c) < 127)
-            if os.path.isfile(directory + self.title + ".md"):
-                raise FileExistsError
-            x = str(directory + self.title + ".md")
-            new_file = open(x, "w")
-            new_file.write(self.__str__())
-        except FileExistsError:
-            raise FileExistsError(directory + self.title + ".md")
-        except IOError:
-            raise IOError
-        except:
-            raise Exception
-        finally:
-            if new_file:
-                try:
-                    new_file.close()
-                except IOError:
-                    raise IOError
-                except Exception:
-                    raise Exception
+            if fsync:
+                fsync_path(temp_path)
+            os.replace(temp_path, x)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.markdown_file = x
         return True
 
 
+@register("food52.com")
 class Food52Parse(RecipeParse):
-    def __init__(self, url):
+    # JSON-LD ingredients are whole lines, the table needs quantities apart
+    structured_fields = ("title", "img_url", "recipe_yield", "instructions")
+    regions = {
+        "title": ("h1", {"class": "article-header-title"}),
+        "image": ("figure", {"class": "photo-frame first"}),
+        "yield": ("p", {"itemprop": "recipeYield"}),
+        "ingredients": ("ul", {"class": "recipe-list"}),
+        "instructions": ("li", {"itemprop": "recipeInstructions"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates Food52Parse object
         :param url: Input String of form 52food.com/recipes/xxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(Food52Parse, self).__init__(url)
+        super(Food52Parse, self).__init__(url, soup)
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
+        """
+        yield "#[{}]({})\n![alt text]({})\n###Ingredients\n|Quantity|" \
+              "Ingredient|\n----------:|:-------\n".format(
+                self.title, self.url, self.img_url)
+        yield from iter_ingredient_table(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
+
+    def get_ingredient_groups(self):
+        """
+        Normalizes the {"ingredient": ["quantity"]} dict into lines of form
+        'quantity ingredient'
+        :return: Tuple of form (('', ('line0', ... , 'lineX')),)
         """
-        return "#[{}]({})\n![alt text]({})\n###Ingredients\n|Quantity|" \
-               "Ingredient|\n----------:|:-------\n{}\n###Instructions{}" \
-               "".format(self.title, self.url, self.img_url,
-                         get_ingredient_table(self.ingredients),
-                         get_instruction_list(self.instructions))
+        lines = tuple((''.join(amount) + " " + ingredient).strip() for
+                      ingredient, amount in
+                      get_plain_value(self.ingredients).items())
+        return (('', lines),) if lines else ()
 
     def set_recipe_title(self):
         """
         Gets recipe title from Food52.com recipe
         :return: None
         """
-        self.title = self.soup.find(
-            "h1", {"class": "article-header-title"}
-        ).text.strip()
+        self.title = self.get_node_text(self.get_first("title"))
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = "https:" + self.soup.find(
-            "figure", {"class": "photo-frame first"}).find("img")['src']
+        self.img_url = "https:" + self.get_first("image").find("img")['src']
 
     def set_recipe_yield(self):
         """
         Gets recipe yield (serving size) from Food52 recipe
         :return: None
         """
-        self.recipe_yield = self.soup.find("p", itemprop="recipeYield")
+        self.recipe_yield = self.get_first("yield")
 
     def set_ingredients(self):
         """
         Sets ingredient dict from Food52.com {"ingredient": "quantity"}
         :return: None
         """
-        # find all for multi-part recipes
-        for div in self.soup.findAll("ul", {"class": "recipe-list"}):
+        # all lists for multi-part recipes
+        for div in self.get_all("ingredients"):
             # find all ingredient <li> elements
-            for element in div.findAll("li", itemprop="ingredients"):
+            for element in div.find_all("li", itemprop="ingredients"):
+                quantity = None
                 # find all ingredient names
-                for ingredient in element.findAll(
+                for ingredient in element.find_all(
                         "span", {"class": "recipe-list-item-name"}):
-                    # if ingredient is already present in dict
-                    if ingredient.text.strip() in self.ingredients.keys():
-                        self.ingredients[
-                            ingredient.text.strip()
-                        ].append(
-                            element.find(
-                                "span", {"class": "recipe-list-quantity"}
-                            ).text.strip()
-                        )
-                    # if ingredient is not present in dict or None
-                    if ingredient.text is not None and ingredient.text.strip()\
-                            not in self.ingredients.keys():
-                        self.ingredients[ingredient.text.strip()] = []
-                        self.ingredients[
-                            ingredient.text.strip()
-                        ].append(
-                            element.find(
-                                "span", {"class": "recipe-list-quantity"}
-                            ).text.strip()
-                        )
+                    if quantity is None:
+                        quantity = self.get_node_text(element.find(
+                            "span", {"class": "recipe-list-quantity"}))
+                    # repeated ingredients collect every quantity
+                    self.ingredients.setdefault(
+                        self.get_node_text(ingredient), []).append(quantity)
 
     def set_instructions(self):
         """
@@ -216,8 +695,7 @@ class Food52Parse(RecipeParse):
         :return:
         """
         self.instructions = [
-            step.text.strip() for step in self.soup.findAll(
-                "li", itemprop="recipeInstructions")
+            self.get_node_text(step) for step in self.get_all("instructions")
             ]
 
     def set_recipe_contents(self):
@@ -225,63 +703,71 @@ class Food52Parse(RecipeParse):
         Sets all class variables in prep for make_markdown()
         :return: None
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables", self.url)
 
 
+@register("allrecipes.com")
 class AllRecipesParse(RecipeParse):
-    def __init__(self, url):
+    regions = {
+        "title": ("h1", {"class": "recipe-summary__h1"}),
+        "image": ("img", {"class": "rec-photo"}),
+        "ingredients": ("span", {"class": "recipe-ingred_txt added"}),
+        "instructions": ("span", {"class": "recipe-directions__list--item"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates AllRecipesParse object
         :param url: Input String of form allrecipes.com/recipe/xxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(AllRecipesParse, self).__init__(url)
+        super(AllRecipesParse, self).__init__(url, soup)
         self.ingredients = []
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
-        return "#[{}]({})\n![alt text]({})\n###Ingredients\n|Ingredient|" \
-               "\n|:-------|\n{}\n###Instructions{}".format(
-                self.title, self.url, self.img_url,
-                get_ingredient_table_simple(self.ingredients),
-                get_instruction_list(self.instructions))
+        yield "#[{}]({})\n![alt text]({})\n###Ingredients\n|Ingredient|" \
+              "\n|:-------|\n".format(self.title, self.url, self.img_url)
+        yield from iter_ingredient_table_simple(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from AllRecipes.com recipe
         :return: None
         """
-        self.title = self.soup.find(
-            "h1", {"class": "recipe-summary__h1"}).text.strip()
+        self.title = self.get_node_text(self.get_first("title"))
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = self.soup.find(
-            "img", {"class": "rec-photo"})['src']
+        self.img_url = self.get_first("image")['src']
 
     def set_ingredients(self):
         """
         Sets ingredient dict from AllRecipes.com {"ingredient": "quantity"}
         :return: None
         """
-        # find all for multi-part recipes
+        # all spans for multi-part recipes
         self.ingredients = [
-            ingredient.text.strip() for ingredient in self.soup.findAll(
-                "span", {"class": "recipe-ingred_txt added"})
-                ]
+            self.get_node_text(ingredient) for ingredient in
+            self.get_all("ingredients")
+            ]
 
     def set_instructions(self):
         """
@@ -289,9 +775,8 @@ class AllRecipesParse(RecipeParse):
         :return: None
         """
         self.instructions = [
-            step.text for step in self.soup.findAll(
-                "span", {"class": "recipe-directions__list--item"}
-            ) if step.text
+            text for text in (step.get_text() for step in
+                              self.get_all("instructions")) if text
             ]
 
     def set_recipe_contents(self):
@@ -299,59 +784,68 @@ class AllRecipesParse(RecipeParse):
         Sets all class variables in prep for make_markdown()
         :return: None
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
 
 
+@register("food.com")
 class FoodDotComParse(RecipeParse):
-    def __init__(self, url):
+    regions = {
+        "title": ("h1", {"class": "fd-recipe-title"}),
+        "image": ("img", {"class": "slide-photo"}),
+        "ingredients": ("input", {"name": "ingredient"}),
+        "instructions": ("ol", {}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates FoodDotComParse object
         :param url: Input String of form Food.com/recipe/xxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(FoodDotComParse, self).__init__(url)
+        super(FoodDotComParse, self).__init__(url, soup)
         self.ingredients = []
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
-        return "#[{}]({})\n![alt text]\n({})\n###Ingredients\n" \
-               "|Ingredient|\n|:-------|\n{}\n###Instructions{}".format(
-                self.title, self.url, self.img_url,
-                get_ingredient_table_simple(self.ingredients),
-                get_instruction_list(self.instructions))
+        yield "#[{}]({})\n![alt text]\n({})\n###Ingredients\n" \
+              "|Ingredient|\n|:-------|\n".format(
+                self.title, self.url, self.img_url)
+        yield from iter_ingredient_table_simple(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from recipe
         :return: None
         """
-        self.title = self.soup.find(
-            "h1", {"class": "fd-recipe-title"}).text.strip()
+        self.title = self.get_node_text(self.get_first("title"))
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = self.soup.find(
-            "img", {"class": "slide-photo"})['data-src']
+        self.img_url = self.get_first("image")['data-src']
 
     def set_ingredients(self):
         """
         Sets ingredient list from Food.com
         :return: None
         """
-        self.ingredients = ast.literal_eval(self.soup.find("input", {
-            "name": "ingredient"})['value'])
+        self.ingredients = decode_string_list(
+            self.get_first("ingredients")['value'])
 
     def set_instructions(self):
         """
@@ -359,7 +853,7 @@ class FoodDotComParse(RecipeParse):
         :return:
         """
         self.instructions = [
-            step.string for step in self.soup.find("ol")
+            step.string for step in self.get_first("instructions")
             if step.string.replace('\n', '')
             ]
 
@@ -368,53 +862,60 @@ class FoodDotComParse(RecipeParse):
         Sets all recipe elements
         :return:
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
 
 
+@register("cooking.nytimes.com")
 class CookingNYTimesParse(RecipeParse):
-    def __init__(self, url):
+    regions = {
+        "title": ("h1", {"class": "recipe-title title name"}),
+        "image": ("meta", {"itemprop": "thumbnailUrl"}),
+        "ingredients": ("li", {"itemprop": "recipeIngredient"}),
+        "instructions": ("ol", {"itemprop": "recipeInstructions"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates CookingNYTimesParse object
         :param url: Input String of form cooking.nytimes.com/recipes/xxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(CookingNYTimesParse, self).__init__(url)
+        super(CookingNYTimesParse, self).__init__(url, soup)
         self.ingredients = []
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
-        return "#[{}]({})\n![alt text]({})\n###Ingredients\n|Ingredient|\n" \
-               "|:-------\n{}\n###Instructions{}" \
-               "".format(self.title, self.url, self.img_url,
-                         get_ingredient_table_simple(self.ingredients),
-                         get_instruction_list(self.instructions))
+        yield "#[{}]({})\n![alt text]({})\n###Ingredients\n|Ingredient|\n" \
+              "|:-------\n".format(self.title, self.url, self.img_url)
+        yield from iter_ingredient_table_simple(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from cooking.nytimes.com recipe
         :return: None
         """
-        self.title = self.soup.find(
-            "h1", {"class": "recipe-title title name"}
-        ).text.strip()
+        self.title = self.get_node_text(self.get_first("title"))
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = self.soup.find(
-            "meta", itemprop="thumbnailUrl")['content']
+        self.img_url = self.get_first("image")['content']
 
     def set_ingredients(self):
         """
@@ -423,8 +924,8 @@ class CookingNYTimesParse(RecipeParse):
         :return: None
         """
         self.ingredients = [
-            x.text.replace("\n", ' ') for x in self.soup.findAll(
-                "li", itemprop="recipeIngredient")
+            x.get_text().replace("\n", ' ') for x in
+            self.get_all("ingredients")
             ]
 
     def set_instructions(self):
@@ -433,9 +934,8 @@ class CookingNYTimesParse(RecipeParse):
         :return:
         """
         self.instructions = [
-            x.string.replace("\n", '') for x in self.soup.find(
-                "ol", itemprop="recipeInstructions")
-            if x.string.replace("\n", '')
+            step for step in (x.string.replace("\n", '') for x in
+                              self.get_first("instructions")) if step
             ]
 
     def set_recipe_contents(self):
@@ -443,50 +943,61 @@ class CookingNYTimesParse(RecipeParse):
         Sets all class variables in prep for make_markdown()
         :return: None
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
 
 
+@register("sweetandsavorybyshinee.com")
 class SweetAndSavoryParse(RecipeParse):
-    def __init__(self, url):
+    ascii_fields = ("ingredients", "instructions")
+    regions = {
+        "title": ("h2", {"itemprop": "name"}),
+        "image": ("div", {"id": "content"}),
+        "yield": ("span", {"itemprop": "recipeYield"}),
+        "ingredients": ("div", {"class": "ingredients"}),
+        "instructions": ("div", {"class": "instructions"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates SweetAndSavoryParse object
         :param url: Input String of form sweetandsavorybyshinee.com/xxxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(SweetAndSavoryParse, self).__init__(url)
+        super(SweetAndSavoryParse, self).__init__(url, soup)
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
-        return "#[{}]({})\n![alt text]({})\n###Ingredients\n{}" \
-               "\n###Instructions{}".format(self.title, self.url, self.img_url,
-                                            get_ingredient_list_with_subtitles(
-                                                self.ingredients),
-                                            get_instruction_list(
-                                                self.instructions))
+        yield "#[{}]({})\n![alt text]({})\n###Ingredients\n".format(
+            self.title, self.url, self.img_url)
+        yield from iter_ingredient_list_with_subtitles(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from recipe
         :return: None
         """
-        self.title = self.soup.find("h2", itemprop="name").text
+        self.title = self.get_first("title").get_text()
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = "http://" + self.soup.find("div", id="content").find(
+        self.img_url = "http://" + self.get_first("image").find(
             "img")['src'][2:]
 
     def set_recipe_yield(self):
@@ -494,7 +1005,7 @@ class SweetAndSavoryParse(RecipeParse):
         Gets recipe yield (serving size) from SweetAndSavory recipe
         :return: None
         """
-        self.recipe_yield = self.soup.find("span", itemprop="recipeYield").text
+        self.recipe_yield = self.get_first("yield").get_text()
 
     def set_ingredients(self):
         """
@@ -506,7 +1017,7 @@ class SweetAndSavoryParse(RecipeParse):
         sub_title = ' '
         is_set = False
 
-        for sub in self.soup.find("div", {"class": "ingredients"}):
+        for sub in self.get_first("ingredients"):
             if sub.find("div") and not is_set:  # sub-title in div
                 sub_title = sub.text.split(':')[0]
                 self.ingredients[sub_title] = []
@@ -519,15 +1030,14 @@ class SweetAndSavoryParse(RecipeParse):
             if not sub.find('p') and not is_set:  # no sub-title
                 is_set = True
             if not is_set:  # sub title within inner div as p, along with li
-                for count, y in enumerate(sub.findAll('p')):
-                    self.ingredients[y.string] = [
-                        strip_bad_ascii(li.text) for li in
-                        sub.findAll("ul")[count]]
-                    count += 1
+                for title, items in zip(sub.find_all("p"),
+                                        sub.find_all("ul")):
+                    self.ingredients[title.string] = strip_bad_ascii_lines(
+                        li.text for li in items)
                 return
             if sub.find("li"):
-                self.ingredients[sub_title] = [
-                    strip_bad_ascii(x.text) for x in sub.findAll("li")]
+                self.ingredients[sub_title] = strip_bad_ascii_lines(
+                    x.text for x in sub.find_all("li"))
             is_set = False
 
     def set_instructions(self):
@@ -535,57 +1045,65 @@ class SweetAndSavoryParse(RecipeParse):
         Sets instructions for SweetAndSavory.com recipe
         :return: None
         """
-        for directions in self.soup.findAll("div", {"class": "instructions"}):
-            if directions.find("ol"):
-                for step in directions.find("ol"):
-                    self.instructions.append(strip_bad_ascii(step.text))
-            else:
-                for step in directions:
-                    self.instructions.append(strip_bad_ascii(step.text))
+        for directions in self.get_all("instructions"):
+            steps = directions.find("ol") or directions
+            self.instructions.extend(strip_bad_ascii_lines(
+                step.text for step in steps))
 
     def set_recipe_contents(self):
         """
         Sets all recipe elements
         :return:
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
 
 
+@register("foodnetwork.com")
 class FoodNetworkParse(RecipeParse):
-    def __init__(self, url):
+    regions = {
+        "title": ("h1", {"itemprop": "name"}),
+        "image": ("div", {"class": "col12 pic collapsed"}),
+        "yield": ("div", {"class": "difficulty"}),
+        "ingredients": ("section", {
+            "class": "ingredients-instructions recipe-instructions section"}),
+        "instructions": ("div", {"class": "col10 directions"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates FoodNetworkParse object
         :param url: Input String of form foodnetwork.com/recipes/xxxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(FoodNetworkParse, self).__init__(url)
+        super(FoodNetworkParse, self).__init__(url, soup)
         self.instructions = {}
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
-        return "#[{}]({})\n![alt text]({})\n###Ingredients\n{}" \
-               "\n###Instructions{}".format(self.title, self.url, self.img_url,
-                                            get_ingredient_list_with_subtitles(
-                                                self.ingredients),
-                                            get_ingredient_list_with_subtitles(
-                                                self.instructions))
+        yield "#[{}]({})\n![alt text]({})\n###Ingredients\n".format(
+            self.title, self.url, self.img_url)
+        yield from iter_ingredient_list_with_subtitles(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_ingredient_list_with_subtitles(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from recipe
         :return: None
         """
-        self.title = self.soup.find("h1", itemprop="name").text
+        self.title = self.get_first("title").get_text()
 
     def set_recipe_img(self):
         """
@@ -593,7 +1111,7 @@ class FoodNetworkParse(RecipeParse):
         :return: None
         """
         # recipe video image within a href class="#lightbox-recipe-video"
-        for element in self.soup.find("div", {"class": "col12 pic collapsed"}):
+        for element in self.get_first("image"):
             if element.find("img") != -1:
                 self.img_url = element.find("img")['src']
 
@@ -602,8 +1120,7 @@ class FoodNetworkParse(RecipeParse):
         Gets recipe yield (serving size) from FoodNetwork recipe
         :return: None
         """
-        self.recipe_yield = self.soup.find("div", {"class": "difficulty"}
-                                           ).find("dd").text
+        self.recipe_yield = self.get_first("yield").find("dd").get_text()
 
     def set_ingredients(self):
         """
@@ -615,10 +1132,8 @@ class FoodNetworkParse(RecipeParse):
         self.ingredients[''] = []
         temp = ''
 
-        for instruction in self.soup.find("section", {
-            "class": "ingredients-instructions recipe-instructions section"}
-                                ).find("div", {"class", "bd"}
-                                       ).find("div").findAll("li"):
+        for instruction in self.get_first("ingredients").find(
+                "div", {"class", "bd"}).find("div").find_all("li"):
             if "class" in instruction.attrs:
                 temp = instruction.string
                 self.ingredients[temp] = []
@@ -636,7 +1151,7 @@ class FoodNetworkParse(RecipeParse):
         self.instructions[''] = []
         temp = ''
 
-        for element in self.soup.find("div", {"class": "col10 directions"}):
+        for element in self.get_first("instructions"):
             if isinstance(element, bs.element.Tag) and \
                     element.attrs.get('class'):
                 cur_class = ''.join(element.attrs.get('class'))
@@ -654,59 +1169,63 @@ class FoodNetworkParse(RecipeParse):
         Sets all recipe elements
         :return:
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
 
 
+@register("marthastewart.com")
 class MarthaStewartParse(RecipeParse):
-    def __init__(self, url):
+    regions = {
+        "title": ("h1", {"itemprop": "name"}),
+        "image": ("img", {"class": "feat-primary-img"}),
+        "yield": ("span", {"itemprop": "recipeYield"}),
+        "ingredients": ("section", {"class": "components-group"}),
+        "instructions": ("p", {"class": "directions-item-text"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates MarthaStewartParse object
         :param url: Input String of form marthastewart.com/xxxx/recipe-title
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(MarthaStewartParse, self).__init__(url)
+        super(MarthaStewartParse, self).__init__(url, soup)
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
+        yield "#[{}]({})\n![alt text]({})\n".format(
+            self.title, self.url, self.img_url)
         if self.recipe_yield:
-            return "#[{}]({})\n![alt text]({})\n######{}\n###Ingredients\n{}" \
-                   "\n###Instructions{}".format(
-                    self.title, self.url, self.img_url, self.recipe_yield,
-                    get_ingredient_list_with_subtitles(self.ingredients),
-                    get_instruction_list(self.instructions)
-                    )
-        else:
-            return "#[{}]({})\n![alt text]({})\n###Ingredients\n{}" \
-                   "\n###Instructions{}".format(
-                    self.title, self.url, self.img_url,
-                    get_ingredient_list_with_subtitles(self.ingredients),
-                    get_instruction_list(self.instructions)
-                    )
+            yield "######{}\n".format(self.recipe_yield)
+        yield "###Ingredients\n"
+        yield from iter_ingredient_list_with_subtitles(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from recipe
         :return: None
         """
-        self.title = self.soup.find("h1", itemprop="name").text.strip()
+        self.title = self.get_node_text(self.get_first("title"))
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = self.soup.find(
-            "img", {"class": "feat-primary-img"})['data-original']
+        self.img_url = self.get_first("image")['data-original']
 
     def set_recipe_yield(self):
             """
@@ -714,9 +1233,9 @@ class MarthaStewartParse(RecipeParse):
             :return: None
             """
             # if yield is specified, set it, otherwise set to None
-            self.recipe_yield = self.soup.find(
-                "span", itemprop="recipeYield").text \
-                if self.soup.find("span", itemprop="recipeYield") else None
+            recipe_yield = self.get_first("yield")
+            self.recipe_yield = recipe_yield.get_text() if recipe_yield \
+                else None
 
     def set_ingredients(self):
         """
@@ -725,15 +1244,12 @@ class MarthaStewartParse(RecipeParse):
         if no sub-recipe field is set to ''
         :return: None
         """
-        for element in self.soup.find_all("section",
-                                          {"class": "components-group"}):
-            # assign section title iff exists, else assign to None
-            title = element.find(
-                "h3", {"class": "components-group-header"}).text.strip() \
-                if element.find("h3", {"class": "components-group-header"}) \
-                else ''
+        for element in self.get_all("ingredients"):
+            # assign section title iff exists, else assign to ''
+            header = element.find("h3", {"class": "components-group-header"})
+            title = self.get_node_text(header) if header else ''
             ingredients = [
-                y.text.strip() for y in element.find_all(
+                self.get_node_text(y) for y in element.find_all(
                     "li", itemprop="ingredients")
                 ]
             self.ingredients[title] = ingredients
@@ -745,8 +1261,7 @@ class MarthaStewartParse(RecipeParse):
         :return: None
         """
         self.instructions = [
-            step.text.strip() for step in self.soup.find_all(
-                "p", {"class": "directions-item-text"})
+            self.get_node_text(step) for step in self.get_all("instructions")
             ]
 
     def set_recipe_contents(self):
@@ -754,69 +1269,78 @@ class MarthaStewartParse(RecipeParse):
         Sets all recipe elements
         :return:
         """
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
 
 
+@register("liveeatlearn.com")
 class LiveEatLearnParse(RecipeParse):
-    def __init__(self, url):
+    ascii_fields = ("ingredients", "instructions")
+    regions = {
+        "title": ("h1", {"itemprop": "headline"}),
+        "image": ("img", {"class": "aligncenter"}),
+        "yield": ("div", {"class": "ERSServes"}),
+        "ingredients": ("li", {"class": "ingredient"}),
+        "instructions": ("li", {"class": "instruction"}),
+    }
+
+    def __init__(self, url, soup=None):
         """
         Generates LivEatLearnParse object
         :param url: Input String of form liveEatlearn.com/xxxx
+        :param soup: Optional prebuilt BeautifulSoup object, fetched from url
+        if not given
         :return: None
         """
-        super(LiveEatLearnParse, self).__init__(url)
+        super(LiveEatLearnParse, self).__init__(url, soup)
         self.ingredients = []
 
-    def __str__(self):
+    def iter_markdown(self):
         """
-        Generates markdown styled string
-        :return: None
+        Generates markdown styled string piece by piece
+        :return: Generator of strings
         """
-        return "#[{}]({})\n![alt text]({})\n\n|Ingredients|\n" \
-               "| ------------- |\n{}\n###Instructions{}".format(
-                    self.title, self.url, self.img_url,
-                    get_ingredient_table_simple(self.ingredients),
-                    get_instruction_list(self.instructions)
-                    )
+        yield "#[{}]({})\n![alt text]({})\n\n|Ingredients|\n" \
+              "| ------------- |\n".format(self.title, self.url, self.img_url)
+        yield from iter_ingredient_table_simple(self.ingredients)
+        yield "\n###Instructions"
+        yield from iter_instruction_list(self.instructions)
 
     def set_recipe_title(self):
         """
         Gets recipe title from recipe
         :return: None
         """
-        self.title = self.soup.find("h1", itemprop="headline").text.strip()
+        self.title = self.get_node_text(self.get_first("title"))
 
     def set_recipe_img(self):
         """
         Sets recipe image using url
         :return: None
         """
-        self.img_url = self.soup.find("img", {"class": "aligncenter"})['src']
+        self.img_url = self.get_first("image")['src']
 
     def set_recipe_yield(self):
             """
             Gets recipe yield (serving size) from LiveEatLearn recipe
             :return: None
             """
-            self.recipe_yield = self.soup.find(
-                "div", {"class": "ERSServes"}).text
+            self.recipe_yield = self.get_first("yield").get_text()
 
     def set_ingredients(self):
         """
         Sets ingredient list from LiveEatLearn.com
         :return: None
         """
-        self.ingredients = [
-            strip_bad_ascii(element.text.strip()) for element in
-            self.soup.find_all("li", {"class": "ingredient"})
-            ]
+        self.ingredients = strip_bad_ascii_lines(
+            self.get_node_text(element) for element in
+            self.get_all("ingredients"))
 
     def set_instructions(self):
         """
@@ -824,17 +1348,16 @@ class LiveEatLearnParse(RecipeParse):
         ['step1'....'stepx']
         :return: None
         """
-        self.instructions = [
-            strip_bad_ascii(element.text.strip()) for element in
-            self.soup.find_all("li", {"class": "instruction"})
-            ]
+        self.instructions = strip_bad_ascii_lines(
+            self.get_node_text(element) for element in
+            self.get_all("instructions"))
 
     def set_recipe_contents(self):
-        if self.soup:
-            self.set_recipe_title()
-            self.set_recipe_img()
-            self.set_recipe_yield()
-            self.set_ingredients()
-            self.set_instructions()
+        if self.structured or self.soup:
+            self.run_extractor(self.set_recipe_title)
+            self.run_extractor(self.set_recipe_img)
+            self.run_extractor(self.set_recipe_yield)
+            self.run_extractor(self.set_ingredients)
+            self.run_extractor(self.set_instructions)
         else:
             raise Exception("Unset class variables")
@@ -0,0 +1,291 @@
+# coding: utf-8
+
+# Single-file packed recipe archive with a title/url index...
+
+import json
+import mmap
+import os
+import struct
+from Python.help_me import HashingWriter
+from Python.recipe import Recipe
+from Python.cache import normalize_url
+
+# record header: header json length, markdown length, fields json length
+RECORD = struct.Struct(">III")
+
+# markdown length of a record still being written, runs past the file end
+UNFINISHED = 0xFFFFFFFF
+
+
+def write_json_atomically(path, data):
+    """
+    Writes data as JSON to a temp file and renames it over path
+    :param path: Output file path
+    :param data: JSON serializable object
+    :return: None
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+class ByteCounter(object):
+    def __init__(self, fp):
+        """
+        Generates ByteCounter object, encoding strings as utf-8 into a binary
+        file and counting the bytes written
+        :param fp: File-like object opened in binary mode
+        :return: None
+        """
+        self.fp = fp
+        self.count = 0
+
+    def write(self, string):
+        """
+        Writes string to the wrapped file
+        :param string: String to write
+        :return: None
+        """
+        data = string.encode('utf-8')
+        self.fp.write(data)
+        self.count += len(data)
+
+
+class RecipeArchive(object):
+    def __init__(self, path, store_fields=True):
+        """
+        Generates RecipeArchive object appending rendered recipes to one
+        packed file, indexed by title and url in path + ".idx"
+        :param path: Path to the archive, created if missing
+        :param store_fields: Also store the structured Recipe record as JSON
+        :return: None
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.store_fields = store_fields
+        if not os.path.exists(path):
+            open(path, 'wb').close()
+        self.index = load_index(self.index_path)
+        if self.index.get("size") != os.path.getsize(path):
+            # index is stale, e.g. an earlier run crashed before close()
+            self.index = scan_archive(path)
+        self.pack = open(path, 'r+b')
+        self.pack.seek(self.index["size"])
+        self.pack.truncate()
+        self.done = []
+
+    def append(self, url, recipe, overwrite=False):
+        """
+        Appends recipe to the archive, an existing title is only replaced
+        (the old record becomes unreachable) when overwrite is set
+        :param url: Url the recipe was parsed from
+        :param recipe: RecipeParse object with its contents set
+        :param overwrite: Replace a recipe with the same title
+        :return: Offset of the new record
+        """
+        title = recipe.get_markdown_name()[:-3]
+        if not overwrite and title in self.index["titles"]:
+            raise FileExistsError(self.path + "#" + title)
+
+        header = json.dumps({"title": title, "url": url}).encode('utf-8')
+        fields = b''
+        if self.store_fields:
+            fields = recipe.get_recipe().to_json().encode('utf-8')
+
+        offset = self.index["size"]
+        self.pack.seek(offset)
+        self.pack.write(RECORD.pack(len(header), UNFINISHED, len(fields)))
+        self.pack.write(header)
+        counter = ByteCounter(self.pack)
+        sink = HashingWriter(counter)
+        try:
+            recipe.render_to(sink)
+        except Exception:
+            self.pack.seek(offset)
+            self.pack.truncate()
+            raise
+        # patch the markdown length now that it is known
+        self.pack.seek(offset)
+        self.pack.write(RECORD.pack(len(header), counter.count, len(fields)))
+        self.pack.seek(0, os.SEEK_END)
+        self.pack.write(fields)
+
+        self.index["size"] = self.pack.tell()
+        self.index["titles"][title] = offset
+        self.index["urls"][normalize_url(url)] = offset
+        recipe.markdown_file = self.path + "#" + title
+        recipe.content_hash = sink.hash.hexdigest()
+        return offset
+
+    def submit(self, url, recipe, overwrite=False):
+        """
+        MarkdownWriter compatible append, results are collected by
+        iter_done()
+        :param url: Url the recipe was parsed from
+        :param recipe: RecipeParse object with its contents set
+        :param overwrite: Replace a recipe with the same title
+        :return: None
+        """
+        try:
+            self.append(url, recipe, overwrite)
+            self.done.append((url, recipe, None))
+        except Exception as e:
+            self.done.append((url, recipe, e))
+
+    def iter_done(self):
+        """
+        Collects recipes appended (or failed) since the last call
+        :return: Generator of (url, RecipeParse, error or None) tuples
+        """
+        done, self.done = self.done, []
+        return iter(done)
+
+    def close(self):
+        """
+        Flushes the archive and writes its index
+        :return: None
+        """
+        self.pack.close()
+        write_json_atomically(self.index_path, self.index)
+
+
+def load_index(index_path):
+    """
+    Loads an archive index
+    :param index_path: Path to the .idx file
+    :return: Dictionary of form {'size': archive bytes,
+    'titles': {title: offset}, 'urls': {url: offset}}
+    """
+    if not os.path.isfile(index_path):
+        return {"size": None, "titles": {}, "urls": {}}
+    with open(index_path, 'r') as f:
+        return json.load(f)
+
+
+def scan_archive(path):
+    """
+    Rebuilds an archive index by walking its record headers, stopping at the
+    first incomplete record
+    :param path: Path to the archive
+    :return: Index dictionary, see load_index(), whose size excludes any
+    incomplete trailing record
+    """
+    index = {"size": 0, "titles": {}, "urls": {}}
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + RECORD.size <= file_size:
+            header_len, markdown_len, fields_len = RECORD.unpack(
+                f.read(RECORD.size))
+            end = offset + RECORD.size + header_len + markdown_len + \
+                fields_len
+            if end > file_size:
+                break
+            try:
+                header = json.loads(f.read(header_len).decode('utf-8'))
+            except ValueError:
+                break
+            index["titles"][header["title"]] = offset
+            index["urls"][normalize_url(header["url"])] = offset
+            offset = end
+            index["size"] = end
+            f.seek(end)
+    return index
+
+
+class RecipeArchiveReader(object):
+    def __init__(self, path):
+        """
+        Generates RecipeArchiveReader object, memory-mapping the archive for
+        O(1) lookups by title or url
+        :param path: Path to the archive
+        :return: None
+        """
+        self.path = path
+        self.index = load_index(path + ".idx")
+        if self.index.get("size") != os.path.getsize(path):
+            self.index = scan_archive(path)
+        self.file = open(path, 'rb')
+        size = os.path.getsize(path)
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if size else b''
+
+    def read_record(self, offset):
+        """
+        Reads the record at offset
+        :param offset: Record offset from the index
+        :return: Tuple of form (header dict, markdown memoryview,
+        fields memoryview)
+        """
+        header_len, markdown_len, fields_len = RECORD.unpack_from(
+            self.data, offset)
+        start = offset + RECORD.size
+        view = memoryview(self.data)
+        header = json.loads(bytes(view[start:start + header_len]).decode(
+            'utf-8'))
+        start += header_len
+        markdown = view[start:start + markdown_len]
+        start += markdown_len
+        return header, markdown, view[start:start + fields_len]
+
+    def get_markdown(self, title=None, url=None):
+        """
+        Gets a rendered recipe by title or url
+        :param title: Recipe title
+        :param url: Recipe url
+        :return: String containing the markdown, KeyError is raised if the
+        recipe isn't archived
+        """
+        offset = self.index["titles"][title] if title is not None else \
+            self.index["urls"][normalize_url(url)]
+        return bytes(self.read_record(offset)[1]).decode('utf-8')
+
+    def get_fields(self, title=None, url=None):
+        """
+        Gets the structured fields of a recipe by title or url
+        :param title: Recipe title
+        :param url: Recipe url
+        :return: Recipe object, or None if fields weren't stored
+        """
+        offset = self.index["titles"][title] if title is not None else \
+            self.index["urls"][normalize_url(url)]
+        fields = self.read_record(offset)[2]
+        if not fields:
+            return None
+        return Recipe.from_dict(json.loads(bytes(fields).decode('utf-8')))
+
+    def iter_recipes(self):
+        """
+        Streams every current recipe out of the archive
+        :return: Generator of (title, markdown memoryview) tuples, views must
+        be released before close()
+        """
+        for title, offset in self.index["titles"].items():
+            yield title, self.read_record(offset)[1]
+
+    def export_markdown(self, directory):
+        """
+        Re-exports the archive as one .md file per recipe
+        :param directory: Output directory, ending in "/"
+        :return: Number of files written
+        """
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        count = 0
+        for title, markdown in self.iter_recipes():
+            temp_path = directory + "." + title + ".md.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(markdown)
+            os.replace(temp_path, directory + title + ".md")
+            count += 1
+        return count
+
+    def close(self):
+        """
+        Unmaps and closes the archive
+        :return: None
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
@@ -0,0 +1,433 @@
+# coding: utf-8
+
+# asyncio API: non-blocking downloads, parsing off the event loop...
+
+import asyncio
+import collections
+import http.client
+import io
+import ssl
+import time
+import urllib.error
+from urllib.parse import urlsplit, urljoin
+from Python.fetcher import get_host, HOST_LIMITS, DEFAULT_PER_HOST
+from Python.http_client import Response, decode_body, get_charset, \
+    DEFAULT_TIMEOUT, DEFAULT_POOL_SIZE, DEFAULT_HEADERS, REDIRECT_CODES, \
+    STALE_CONNECTION_ERRORS
+from Python.parse_pool import parse_page
+from Python.RecipeParser import get_parser
+from Python.scheduler import Backoff
+from Python.timing import timed
+
+# max number of urls converted at once by async_main()
+DEFAULT_MAX_CONCURRENCY = 100
+
+# max header lines read per response
+MAX_HEADERS = 100
+
+# statuses whose responses never have a body
+NO_BODY_CODES = (204, 304)
+
+
+class AsyncConnection(object):
+    def __init__(self, reader, writer):
+        """
+        Generates AsyncConnection object, an open asyncio stream pair
+        :param reader: asyncio.StreamReader
+        :param writer: asyncio.StreamWriter
+        :return: None
+        """
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        """
+        Closes the connection without waiting for it to be closed
+        :return: None
+        """
+        self.writer.close()
+
+
+class AsyncHttpClient(object):
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE,
+                 max_redirects=5, headers=None):
+        """
+        Generates AsyncHttpClient object, the asyncio counterpart of
+        HttpClient: GET requests over pooled keep-alive HTTP/1.1 connections,
+        without a thread per request. Must be used from one event loop
+        :param timeout: Seconds to wait for a connect or a read
+        :param pool_size: Max idle connections kept per host
+        :param max_redirects: Max redirects followed per request
+        :param headers: Dictionary of headers sent with every request
+        :return: None
+        """
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_redirects = max_redirects
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+        self.ssl_context = ssl.create_default_context()
+        # {(scheme, host, port): deque of idle AsyncConnection}
+        self.idle = {}
+
+    async def connect(self, scheme, host, port):
+        """
+        Opens a new connection
+        :return: AsyncConnection object
+        """
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(
+            host, port, ssl=self.ssl_context if scheme == 'https' else None,
+            server_hostname=host if scheme == 'https' else None),
+            self.timeout)
+        return AsyncConnection(reader, writer)
+
+    def put_connection(self, key, connection):
+        """
+        Keeps a connection for reuse, closing it if the pool is full
+        :param key: Tuple of form (scheme, host, port)
+        :param connection: AsyncConnection object
+        :return: None
+        """
+        idle = self.idle.setdefault(key, collections.deque())
+        if len(idle) < self.pool_size:
+            idle.append(connection)
+        else:
+            connection.close()
+
+    async def read_line(self, connection):
+        """
+        Reads one CRLF terminated line
+        :param connection: AsyncConnection object
+        :return: Bytes including the line ending, b'' at end of stream
+        """
+        return await asyncio.wait_for(connection.reader.readline(),
+                                      self.timeout)
+
+    async def read_body(self, connection, headers):
+        """
+        Reads a response body framed by Content-Length, chunked
+        Transfer-Encoding or the end of the stream
+        :param connection: AsyncConnection object
+        :param headers: Response headers
+        :return: Tuple of form (bytes, True if the connection is spent)
+        """
+        reader = connection.reader
+        if 'chunked' in (headers.get('Transfer-Encoding') or '').lower():
+            chunks = []
+            while True:
+                size = int((await self.read_line(connection)).split(
+                    b";", 1)[0].strip() or b"0", 16)
+                if not size:
+                    while (await self.read_line(connection)).strip():
+                        pass  # trailers
+                    return b"".join(chunks), False
+                chunks.append(await asyncio.wait_for(
+                    reader.readexactly(size + 2), self.timeout))
+                chunks[-1] = chunks[-1][:-2]
+        length = headers.get('Content-Length')
+        if length is not None:
+            return await asyncio.wait_for(reader.readexactly(int(length)),
+                                          self.timeout), False
+        return await asyncio.wait_for(reader.read(), self.timeout), True
+
+    async def exchange(self, connection, request):
+        """
+        Sends a request and reads the whole response
+        :param connection: AsyncConnection object
+        :param request: Bytes of the request head
+        :return: Tuple of form (status, headers, raw body, True if the
+        connection can be reused)
+        """
+        connection.writer.write(request)
+        await asyncio.wait_for(connection.writer.drain(), self.timeout)
+        while True:
+            status_line = await self.read_line(connection)
+            if not status_line:
+                raise http.client.RemoteDisconnected(
+                    "Remote end closed connection without response")
+            try:
+                version, status = status_line.split(None, 2)[:2]
+                status = int(status)
+            except ValueError:
+                raise http.client.BadStatusLine(status_line)
+            lines = []
+            while True:
+                line = await self.read_line(connection)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                lines.append(line)
+                if len(lines) > MAX_HEADERS:
+                    raise http.client.HTTPException("too many headers")
+            headers = http.client.parse_headers(io.BytesIO(
+                b"".join(lines) + b"\r\n"))
+            if not 100 <= status < 200:  # skip 100 Continue and friends
+                break
+
+        spent = False
+        if status in NO_BODY_CODES:
+            body = b''
+        else:
+            body, spent = await self.read_body(connection, headers)
+        reusable = not spent and version == b"HTTP/1.1" and \
+            (headers.get('Connection') or '').lower() != 'close'
+        return status, headers, body, reusable
+
+    async def request_once(self, url, headers):
+        """
+        Sends a single GET request over a pooled connection, retrying on a
+        fresh connection if a reused one turns out to be closed. Timeouts
+        are never retried here
+        :param url: Input url
+        :param headers: Dictionary of request headers
+        :return: Response with decoded body
+        """
+        timings = {}
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise urllib.error.URLError("unknown url type: " + url)
+        key = (parts.scheme, parts.hostname,
+               parts.port or (443 if parts.scheme == 'https' else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request = "GET {} HTTP/1.1\r\nHost: {}\r\n{}\r\n".format(
+            path, parts.netloc, "".join(
+                "{}: {}\r\n".format(name, value)
+                for name, value in headers.items())).encode('latin-1')
+
+        while True:
+            idle = self.idle.get(key)
+            connection = idle.popleft() if idle else None
+            is_reused = connection is not None
+            try:
+                if not is_reused:  # DNS lookup, TCP connect and TLS handshake
+                    with timed(timings, "connect"):
+                        connection = await self.connect(*key)
+                with timed(timings, "download"):
+                    status, response_headers, body, reusable = \
+                        await self.exchange(connection, request)
+            except asyncio.TimeoutError:
+                # an OSError only from python 3.11, caught first so a timed
+                # out connection is discarded, not resent on, on every version
+                if connection:
+                    connection.close()
+                raise
+            except (http.client.HTTPException, OSError,
+                    asyncio.IncompleteReadError) as e:
+                if connection:
+                    connection.close()
+                if is_reused and isinstance(e, STALE_CONNECTION_ERRORS + (
+                        asyncio.IncompleteReadError,)):
+                    continue
+                if isinstance(e, asyncio.IncompleteReadError):
+                    raise http.client.IncompleteRead(e.partial)
+                raise
+            except BaseException:  # cancellation
+                if connection:
+                    connection.close()
+                raise
+            break
+
+        if reusable:
+            self.put_connection(key, connection)
+        else:
+            connection.close()
+        timings["bytes"] = len(body)
+        with timed(timings, "content_decode"):
+            body = decode_body(body, response_headers.get('Content-Encoding'))
+        return Response(url, status, response_headers, body, timings)
+
+    async def get(self, url, headers=None):
+        """
+        Downloads url, following redirects
+        :param url: Input url
+        :param headers: Optional dictionary of extra request headers
+        :return: Response, urllib.error.HTTPError is raised for 4xx/5xx
+        """
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        url = url.split("#", 1)[0]
+
+        timings = {}
+        for _ in range(self.max_redirects + 1):
+            response = await self.request_once(url, request_headers)
+            for stage, value in response.timings.items():
+                timings[stage] = timings.get(stage, 0) + value
+            location = response.headers.get('Location')
+            if response.status in REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                raise urllib.error.HTTPError(
+                    url, response.status,
+                    http.client.responses.get(response.status, ''),
+                    response.headers, io.BytesIO(response.body))
+            return response._replace(timings=timings)
+        raise urllib.error.HTTPError(url, response.status,
+                                     "Too many redirects", response.headers,
+                                     io.BytesIO(response.body))
+
+    async def close(self):
+        """
+        Closes every pooled connection
+        :return: None
+        """
+        idle, self.idle = self.idle, {}
+        connections = [connection for pool in idle.values()
+                       for connection in pool]
+        for connection in connections:
+            connection.close()
+        for connection in connections:
+            try:
+                await connection.writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def fetch_page(url, client, backoff=None):
+    """
+    Downloads the raw page at url, retrying throttled (429) and failed (5xx,
+    timeouts) downloads without blocking the event loop, see
+    scheduler.Backoff
+    :param url: Input url
+    :param client: AsyncHttpClient object
+    :param backoff: Backoff object, defaults to Backoff()
+    :return: Tuple of form (bytes, charset from the Content-Type header or
+    None), the last HTTPError/URLError/OSError is raised once backoff gives up
+    """
+    backoff = backoff or Backoff()
+    attempt = 0
+    while True:
+        try:
+            response = await client.get(url)
+            return response.body, get_charset(response.headers)
+        except Exception as e:
+            delay = backoff.get_delay(attempt, e)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def parse_recipe(url, client=None, executor=None, timeout=None,
+                       backoff=None):
+    """
+    Downloads and parses a recipe without blocking the event loop: the page
+    is downloaded with AsyncHttpClient and BeautifulSoup runs on executor.
+    Cancelling the call, or hitting timeout, abandons the download at once;
+    a parse already running on the executor finishes there unobserved
+    :param url: Url of a supported recipe website
+    :param client: AsyncHttpClient, pass a long-lived one to reuse
+    connections across calls, a temporary client is used if None
+    :param executor: concurrent.futures executor parsing pages, None uses
+    the event loop's default thread pool. A ProcessPoolExecutor spreads
+    parsing across cores
+    :param timeout: Optional deadline in seconds for the whole conversion,
+    asyncio.TimeoutError is raised when it passes
+    :param backoff: Backoff object for retries, defaults to Backoff()
+    :return: RecipeParse object (of the url's sub class) with its contents
+    set and its soup released. ValueError is raised for unsupported urls,
+    HTTPError/URLError/OSError for failed downloads
+    """
+    parser = get_parser(url)
+    if not parser:
+        raise ValueError("unsupported url: " + url)
+
+    async def convert():
+        data, charset = await fetch_page(url, client, backoff)
+        loop = asyncio.get_running_loop()
+        recipe, error = (await loop.run_in_executor(
+            executor, parse_page,
+            (parser, url, data, charset, time.time())))[1:]
+        if error:
+            raise error
+        return recipe
+
+    own_client = client is None
+    client = client or AsyncHttpClient()
+    try:
+        return await asyncio.wait_for(convert(), timeout)
+    finally:
+        if own_client:
+            await client.close()
+
+
+async def iter_urls(urls):
+    """
+    Walks an iterable or async iterable of urls
+    :param urls: Iterable or async iterable
+    :return: Async generator of urls
+    """
+    if hasattr(urls, "__aiter__"):
+        async for url in urls:
+            yield url
+    else:
+        for url in urls:
+            yield url
+
+
+async def async_main(urls, client=None, executor=None,
+                     max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                     per_host=DEFAULT_PER_HOST, limits=None, timeout=None,
+                     backoff=None):
+    """
+    Converts many urls concurrently on one event loop, see parse_recipe()
+    :param urls: Iterable or async iterable of urls, read only as fast as
+    conversions finish
+    :param client: Optional AsyncHttpClient, a client is made (and closed)
+    for the run if None
+    :param executor: concurrent.futures executor parsing pages, None uses
+    the event loop's default thread pool
+    :param max_concurrency: Max number of urls converted at once
+    :param per_host: Max simultaneous requests for hosts without a limit
+    :param limits: Dictionary of form {'host': max_requests}, defaults to
+    fetcher.HOST_LIMITS
+    :param timeout: Optional deadline in seconds per url, waiting for a
+    free slot of its host included
+    :param backoff: Backoff object for retries, defaults to Backoff()
+    :return: Async generator of (url, RecipeParse or None, error or None)
+    tuples in completion order. Closing it early (or cancelling the task
+    iterating it) cancels every conversion still running
+    """
+    limits = HOST_LIMITS if limits is None else limits
+    own_client = client is None
+    client = client or AsyncHttpClient()
+    semaphores = {}
+    pending = set()
+
+    async def convert(url):
+        host = get_host(url)
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(limits.get(host, per_host))
+
+        async def limited():
+            async with semaphores[host]:
+                return await parse_recipe(url, client, executor,
+                                          backoff=backoff)
+        try:
+            return url, await asyncio.wait_for(limited(), timeout), None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return url, None, e
+
+    try:
+        async for url in iter_urls(urls):
+            if len(pending) >= max_concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.ensure_future(convert(url)))
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if own_client:
+            await client.close()
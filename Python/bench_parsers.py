@@ -0,0 +1,398 @@
+# coding: utf-8
+
+# Offline benchmark of every site parser against recorded pages...
+
+import argparse
+import collections
+import hashlib
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from Python.RecipeParser import get_parser, set_html_parser, HTML_PARSER
+from Python.fetcher import fetch_page
+from Python.http_client import HttpClient
+from Python.parse_pool import parse_page
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(__file__), "fixtures")
+INDEX_FILE = "index.json"
+DEFAULT_BASELINE = os.path.join(FIXTURE_DIRECTORY, "baseline.json")
+
+# share by which pages/sec may drop, or peak RSS grow, before it's a
+# regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def load_index(directory=FIXTURE_DIRECTORY):
+    """
+    Reads the fixture index of a directory of recorded pages
+    :param directory: Fixture directory
+    :return: Dictionary of form {'file.html': {'url': str, 'charset': str}}
+    """
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_fixtures(directory=FIXTURE_DIRECTORY, sites=None):
+    """
+    Reads the recorded pages, grouped by the parser of their url
+    :param directory: Fixture directory
+    :param sites: Optional iterable of parser class names to keep
+    :return: OrderedDict of form {'ParserName': [(file, url, bytes,
+    charset)]}, sorted by parser name
+    """
+    fixtures = {}
+    for file, entry in sorted(load_index(directory).items()):
+        parser = get_parser(entry["url"])
+        if not parser or (sites and parser.__name__ not in sites):
+            continue
+        with open(os.path.join(directory, file), 'rb') as f:
+            data = f.read()
+        fixtures.setdefault(parser.__name__, []).append(
+            (file, entry["url"], data, entry.get("charset")))
+    return collections.OrderedDict(sorted(fixtures.items()))
+
+
+def get_golden_path(file, directory=FIXTURE_DIRECTORY):
+    """
+    Gets the path of the expected markdown of a recorded page
+    :param file: File name of the page, e.g. "food52.html"
+    :param directory: Fixture directory
+    :return: String containing the path of e.g. "food52.md"
+    """
+    return os.path.join(directory, os.path.splitext(file)[0] + ".md")
+
+
+def write_golden(file, url, data, charset, directory=FIXTURE_DIRECTORY):
+    """
+    Writes the markdown a recorded page parses to, the tests compare every
+    parse of the page against it, so check it by hand once written
+    :param file: File name of the page
+    :param url: Url of the page
+    :param data: Raw html bytes
+    :param charset: Charset from the Content-Type header or None
+    :param directory: Fixture directory
+    :return: String containing the path of the markdown file
+    """
+    recipe = get_parser(url).from_html(url, data, charset)
+    recipe.set_recipe_contents()
+    path = get_golden_path(file, directory)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        recipe.render_to(f)
+    return path
+
+
+def record(url, directory=FIXTURE_DIRECTORY, file=None):
+    """
+    Downloads a page and adds it to the fixtures, along with its golden
+    markdown
+    :param url: Url of a supported recipe website
+    :param directory: Fixture directory
+    :param file: File name, defaults to the lower-cased parser name with a
+    ".html" extension
+    :return: String containing the file name
+    """
+    parser = get_parser(url)
+    if not parser:
+        raise ValueError("unsupported url: " + url)
+    data, charset = fetch_page(url)
+    file = file or parser.__name__.lower() + ".html"
+    with open(os.path.join(directory, file), 'wb') as f:
+        f.write(data)
+    write_golden(file, url, data, charset, directory)
+    index = load_index(directory)
+    index[file] = {"url": url, "charset": charset}
+    path = os.path.join(directory, INDEX_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return file
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    # {'/file.html': (bytes, charset)}, set by serve_fixtures()
+    pages = {}
+
+    def do_GET(self):
+        """
+        Replays a recorded page with its recorded charset
+        :return: None
+        """
+        page = self.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        data, charset = page
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html' + (
+            '; charset=' + charset if charset else ''))
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures(fixtures):
+    """
+    Starts a local HTTP stand-in for the recipe websites on a free port
+    :param fixtures: load_fixtures() output
+    :return: Tuple of form (ThreadingHTTPServer, 'http://127.0.0.1:port')
+    """
+    handler = type("Handler", (FixtureHandler,), {"pages": dict(
+        ("/" + file, (data, charset)) for pages in fixtures.values()
+        for file, url, data, charset in pages)})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, "http://127.0.0.1:{}".format(server.server_address[1])
+
+
+def get_peak_rss():
+    """
+    Gets the peak resident set size of this process
+    :return: KiB, or None where the resource module is missing
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB everywhere else
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def get_digest(recipe):
+    """
+    Fingerprints what a parser extracted, so a faster parser that extracts
+    something else shows up as a regression too
+    :param recipe: RecipeParse object
+    :return: String containing a hex digest
+    """
+    return hashlib.sha1(json.dumps(recipe.get_recipe().to_dict(),
+                                   sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def bench_site(pages, repeat=20, base_url=None, html_parser=None):
+    """
+    Parses and renders a site's recorded pages repeat times, meant to run in
+    a fresh process so its peak RSS is the site's own
+    :param pages: List of (file, url, bytes, charset) tuples of one parser
+    :param repeat: Number of timed passes over the pages, after one warm-up
+    :param base_url: Optional url of serve_fixtures(), pages are then
+    downloaded from it on every pass instead of read from memory
+    :param html_parser: Tree builder, see set_html_parser()
+    :return: Dictionary of form {'pages': int, 'seconds': float,
+    'pages_per_sec': float of the fastest pass, 'stages': {'stage': ms per
+    page, averaged over every pass},
+    'peak_rss_kib': int or None, 'digests': {'file': str}, 'http': bool}
+    """
+    if html_parser:
+        set_html_parser(html_parser)
+    client = HttpClient() if base_url else None
+    stages = collections.Counter()
+    digests = {}
+    passes = []
+    for iteration in range(repeat + 1):
+        seconds = 0.0
+        for file, url, data, charset in pages:
+            timings = {}
+            start = time.perf_counter()
+            if base_url:
+                download = time.perf_counter()
+                data, charset = fetch_page(base_url + "/" + file,
+                                           client=client)
+                timings["download"] = time.perf_counter() - download
+            url, recipe, error = parse_page(
+                (get_parser(url), url, data, charset, None))
+            if error:
+                raise error
+            render = time.perf_counter()
+            "".join(recipe.iter_markdown())
+            timings["render"] = time.perf_counter() - render
+            if iteration:  # the first pass only warms caches up
+                seconds += time.perf_counter() - start
+                stages.update(timings)
+                stages.update(recipe.timings)
+            digests[file] = get_digest(recipe)
+        if iteration:
+            passes.append(seconds)
+    if client:
+        client.close()
+
+    count = len(pages) * repeat
+    return {
+        "pages": count,
+        "seconds": sum(passes),
+        "pages_per_sec": len(pages) / min(passes) if passes else 0.0,
+        "stages": dict((stage, total / count * 1000.0)
+                       for stage, total in stages.items()),
+        "peak_rss_kib": get_peak_rss(),
+        "digests": digests,
+        "http": bool(base_url),
+    }
+
+
+def run(fixtures, repeat=20, http=False, html_parser=None):
+    """
+    Benchmarks every site, each in its own process
+    :param fixtures: load_fixtures() output
+    :param repeat: Number of timed passes over each site's pages
+    :param http: True to download the pages from a local HTTP stand-in
+    :param html_parser: Tree builder, see set_html_parser()
+    :return: OrderedDict of form {'ParserName': bench_site() output}
+    """
+    server, base_url = serve_fixtures(fixtures) if http else (None, None)
+    results = collections.OrderedDict()
+    try:
+        for site, pages in fixtures.items():
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=get_context("spawn")) as pool:
+                results[site] = pool.submit(bench_site, pages, repeat,
+                                            base_url, html_parser).result()
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    """
+    Reads results saved by save_baseline()
+    :param path: Baseline file
+    :return: Dictionary of form {'ParserName': bench_site() output}, empty
+    if there is no baseline yet
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    """
+    Stores results as the baseline later runs are compared against
+    :param results: run() output
+    :param path: Baseline file
+    :return: None
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def get_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares results against a baseline. Speed and memory are only compared
+    between runs of the same mode (memory or --http), output always
+    :param results: run() output
+    :param baseline: load_baseline() output
+    :param tolerance: Share by which pages/sec may drop, or peak RSS grow
+    :return: List of strings describing every regression
+    """
+    regressions = []
+    for site, result in results.items():
+        before = baseline.get(site)
+        if not before:
+            continue
+        if before.get("http") != result["http"]:
+            before = {"digests": before.get("digests", {})}
+        elif result["pages_per_sec"] < before["pages_per_sec"] * (
+                1 - tolerance):
+            regressions.append("{}: {:.1f} pages/sec, baseline {:.1f}".format(
+                site, result["pages_per_sec"], before["pages_per_sec"]))
+        if result["peak_rss_kib"] and before.get("peak_rss_kib") and \
+                result["peak_rss_kib"] > before["peak_rss_kib"] * (
+                    1 + tolerance):
+            regressions.append("{}: peak RSS {} KiB, baseline {} KiB".format(
+                site, result["peak_rss_kib"], before["peak_rss_kib"]))
+        for file, digest in sorted(result["digests"].items()):
+            if before.get("digests", {}).get(file, digest) != digest:
+                regressions.append("{}: {} parses differently than the "
+                                   "baseline".format(site, file))
+    return regressions
+
+
+def print_results(results, baseline):
+    """
+    Prints pages/sec, its change against the baseline, peak RSS and the
+    per page time of every stage
+    :param results: run() output
+    :param baseline: load_baseline() output
+    :return: None
+    """
+    for site, result in results.items():
+        before = baseline.get(site)
+        change = "{:+.0%}".format(result["pages_per_sec"] /
+                                  before["pages_per_sec"] - 1) \
+            if before else "no baseline"
+        rss = result["peak_rss_kib"]
+        print("{:<24}{:>10.1f} pages/sec {:>12}{:>12}".format(
+            site, result["pages_per_sec"], change,
+            "{} KiB".format(rss) if rss else ''))
+        for stage, millis in sorted(result["stages"].items(),
+                                    key=lambda item: -item[1]):
+            print("  {:<28}{:>10.3f} ms".format(stage, millis))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="benchmark the site parsers against recorded pages")
+    arg_parser.add_argument("sites", nargs="*",
+                            help="parser class names, all by default")
+    arg_parser.add_argument("--repeat", type=int, default=20,
+                            help="timed passes over every page")
+    arg_parser.add_argument("--http", action="store_true",
+                            help="download pages from a local HTTP stand-in "
+                                 "instead of reading them from memory")
+    arg_parser.add_argument("--html-parser", default=None,
+                            help="tree builder, {} by default".format(
+                                HTML_PARSER))
+    arg_parser.add_argument("--fixtures", default=FIXTURE_DIRECTORY,
+                            help="directory of recorded pages")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                            help="results to compare against")
+    arg_parser.add_argument("--save-baseline", action="store_true",
+                            help="store this run as the new baseline")
+    arg_parser.add_argument("--tolerance", type=float,
+                            default=DEFAULT_TOLERANCE,
+                            help="allowed drop of pages/sec and growth of "
+                                 "peak RSS, as a share")
+    arg_parser.add_argument("--record", nargs="+", metavar="URL",
+                            help="download urls into the fixtures and exit")
+    args = arg_parser.parse_args()
+
+    if args.record:
+        for url in args.record:
+            print("recorded", record(url, args.fixtures))
+        sys.exit(0)
+
+    fixtures = load_fixtures(args.fixtures, args.sites)
+    if not fixtures:
+        sys.exit("no recorded pages found in " + args.fixtures)
+    results = run(fixtures, repeat=args.repeat, http=args.http,
+                  html_parser=args.html_parser)
+    baseline = load_baseline(args.baseline)
+    print_results(results, baseline)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print("baseline saved to", args.baseline)
+    else:
+        regressions = get_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION:", regression)
+        if regressions:
+            sys.exit(1)
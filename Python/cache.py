@@ -0,0 +1,197 @@
+# coding: utf-8
+
+# On-disk HTTP response cache for fetch_url()...
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+# default byte budget for cached page bodies (256 MB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# temp files older than this (seconds) were left behind by a crashed run
+STALE_TEMP_AGE = 60 * 60
+
+
+def normalize_url(url):
+    """
+    Normalizes url for use as a cache key: lower-cases scheme and host, drops
+    default ports and the #fragment
+    :param url: Input url
+    :return: String containing normalized url
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host += ":" + str(parts.port)
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ''))
+
+
+class ResponseCache(object):
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Generates ResponseCache object storing page bodies along with their
+        ETag and Last-Modified headers, evicting least recently used entries
+        once max_bytes is exceeded
+        :param directory: Path to the cache directory, created if missing
+        :param max_bytes: Byte budget for all cached bodies
+        :return: None
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # {'key': body size} from least to most recently used, rebuilt from
+        # the body mtimes so the budget and the LRU order survive runs
+        bodies = []
+        stale = time.time() - STALE_TEMP_AGE
+        for entry in os.scandir(directory):
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(".body"):
+                    bodies.append((stat.st_mtime, entry.name[:-5],
+                                   stat.st_size))
+                elif entry.name.endswith(".tmp") and stat.st_mtime < stale:
+                    os.remove(entry.path)
+            except OSError:  # removed by another process
+                pass
+        bodies.sort()
+        self.sizes = OrderedDict((key, size) for _, key, size in bodies)
+        self.total = sum(self.sizes.values())
+
+    def get_key(self, url):
+        """
+        Gets the file name stem used for url
+        :param url: Input url
+        :return: String containing hex digest of the normalized url
+        """
+        return hashlib.sha1(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def get_path(self, key, extension):
+        """
+        Gets path of a cache file
+        :param key: Cache key from get_key()
+        :param extension: ".body" or ".json"
+        :return: String containing path
+        """
+        return os.path.join(self.directory, key + extension)
+
+    def get_meta(self, url):
+        """
+        Gets the stored headers of a cached url
+        :param url: Input url
+        :return: Dictionary of form {'url', 'etag', 'last_modified',
+        'charset'}, empty if url isn't cached
+        """
+        try:
+            with open(self.get_path(self.get_key(url), ".json"), 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def get_validators(self, url):
+        """
+        Gets conditional request headers for a cached url
+        :param url: Input url
+        :return: Dictionary of form {'If-None-Match': etag,
+        'If-Modified-Since': date}, empty if url isn't cached
+        """
+        meta = self.get_meta(url)
+        headers = {}
+        if meta.get("etag"):
+            headers['If-None-Match'] = meta["etag"]
+        if meta.get("last_modified"):
+            headers['If-Modified-Since'] = meta["last_modified"]
+        return headers
+
+    def get(self, url):
+        """
+        Gets the cached body for url, marking it as recently used
+        :param url: Input url
+        :return: Bytes containing the page, or None if url isn't cached
+        """
+        key = self.get_key(url)
+        path = self.get_path(key, ".body")
+        try:
+            with open(path, 'rb') as f:
+                body = f.read()
+        except IOError:
+            return None
+        # the mtime of the body keeps the LRU order for the next run, touched
+        # under the lock so it can't race evict()
+        with self.lock:
+            try:
+                os.utime(path, None)
+            except FileNotFoundError:  # evicted since it was read
+                return None
+            if key in self.sizes:
+                self.sizes.move_to_end(key)
+        return body
+
+    def write_file(self, path, data):
+        """
+        Writes a cache file through a temp file renamed over it, so readers
+        never see a half written body or header file
+        :param path: Path of the cache file
+        :param data: Bytes
+        :return: None
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def put(self, url, body, etag=None, last_modified=None, charset=None):
+        """
+        Stores body for url, evicting old entries if over budget
+        :param url: Input url
+        :param body: Bytes containing the page
+        :param etag: ETag response header or None
+        :param last_modified: Last-Modified response header or None
+        :param charset: Content-Type charset or None
+        :return: None
+        """
+        if len(body) > self.max_bytes:
+            return
+        key = self.get_key(url)
+        with self.lock:
+            self.write_file(self.get_path(key, ".body"), body)
+            self.write_file(self.get_path(key, ".json"), json.dumps(
+                {"url": normalize_url(url), "etag": etag,
+                 "last_modified": last_modified,
+                 "charset": charset}).encode('utf-8'))
+            self.total += len(body) - self.sizes.pop(key, 0)
+            self.sizes[key] = len(body)
+            self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits max_bytes,
+        caller must hold self.lock. The newest entry is never evicted, put()
+        already skips bodies larger than the whole budget
+        :return: None
+        """
+        while self.total > self.max_bytes and len(self.sizes) > 1:
+            key, size = self.sizes.popitem(last=False)
+            for extension in (".body", ".json"):
+                try:
+                    os.remove(self.get_path(key, extension))
+                except OSError:
+                    pass
+            self.total -= size
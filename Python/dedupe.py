@@ -0,0 +1,218 @@
+# coding: utf-8
+
+# Duplicate detection: canonical urls before fetching, MinHash of
+# ingredient lists after parsing...
+
+import hashlib
+import random
+from urllib.parse import urlsplit, parse_qsl, urlencode, unquote_plus
+from Python.cache import normalize_url
+from Python.search_index import get_ingredient_terms
+
+# query parameters added by newsletters, ads and social networks
+TRACKING_PARAMS = frozenset(["fbclid", "gclid", "dclid", "msclkid", "mc_cid",
+                             "mc_eid", "igshid", "yclid", "_ga", "ref",
+                             "ref_src", "cmpid", "sc_cid", "ncid"])
+TRACKING_PREFIXES = ("utm_", "pk_")
+
+# prime modulus of the MinHash permutations
+MERSENNE_PRIME = (1 << 61) - 1
+
+# recipes with fewer distinct ingredients aren't fingerprinted, two short
+# lists agree too easily
+MIN_SHINGLES = 3
+
+
+def is_tracking_param(name):
+    """
+    Checks whether a query parameter only tracks where a click came from
+    :param name: Query parameter name
+    :return: True or False
+    """
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def clean_url(url):
+    """
+    Removes the #fragment and tracking query parameters, leaving a url that
+    fetches the same page. The rest of the url is kept as it is, query
+    parameters aren't decoded or re-encoded
+    :param url: Input url
+    :return: String containing the cleaned url
+    """
+    url = url.strip().partition("#")[0]
+    base, question, query = url.partition("?")
+    if not question:
+        return url
+    kept = [pair for pair in query.split("&") if not
+            is_tracking_param(unquote_plus(pair.partition("=")[0]))]
+    return base + ("?" + "&".join(kept) if kept else '')
+
+
+def get_canonical_key(url):
+    """
+    Collapses every variant of a url (scheme, "www.", fragment, tracking
+    parameters, parameter order, trailing "/") into one key
+    :param url: Input url
+    :return: String of form host/path?query, not meant to be fetched
+    """
+    parts = urlsplit(normalize_url(clean_url(url)))
+    host = parts.netloc
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    return host + path + ("?" + urlencode(query) if query else '')
+
+
+def get_key_digest(key):
+    """
+    Hashes a canonical key to a fixed size, two distinct keys collide with a
+    probability of about 1 in 2 ** 64
+    :param key: Key from get_canonical_key()
+    :return: Integer of 64 bits
+    """
+    return int.from_bytes(hashlib.blake2b(
+        key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def dedupe_urls(urls, on_duplicate=None):
+    """
+    Cleans urls and drops variants of urls already seen. Only a 64 bit digest
+    of every distinct url is remembered until the generator is closed, under
+    a hundred bytes each however long the urls are
+    :param urls: Iterable of urls
+    :param on_duplicate: Optional callable receiving (url, canonical key)
+    for every dropped url
+    :return: Generator of cleaned urls
+    """
+    seen = set()
+    for url in urls:
+        key = get_canonical_key(url)
+        digest = get_key_digest(key)
+        if digest in seen:
+            if on_duplicate:
+                on_duplicate(url, key)
+            continue
+        seen.add(digest)
+        yield clean_url(url)
+
+
+def get_shingles(recipe):
+    """
+    Normalizes a recipe's ingredient lines into a set comparable across
+    sites, "2 cups thinly sliced Scallions" -> "scallion"
+    :param recipe: Recipe object
+    :return: Set of strings, one per ingredient
+    """
+    shingles = set()
+    for line in recipe.iter_ingredients():
+        terms = get_ingredient_terms(line)
+        if terms:
+            shingles.add(" ".join(terms))
+    return shingles
+
+
+class MinHasher(object):
+    def __init__(self, num_perm=64, seed=1):
+        """
+        Generates MinHasher object, whose signatures agree on a share of
+        positions equal to the Jaccard similarity of the hashed sets
+        :param num_perm: Number of hash permutations (signature length)
+        :param seed: Seed of the permutations, signatures are only
+        comparable between MinHashers of equal seed and num_perm
+        :return: None
+        """
+        rng = random.Random(seed)
+        self.permutations = [(rng.randrange(1, MERSENNE_PRIME),
+                              rng.randrange(0, MERSENNE_PRIME))
+                             for _ in range(num_perm)]
+
+    def get_signature(self, shingles):
+        """
+        Computes the MinHash signature of a set
+        :param shingles: Non-empty iterable of strings
+        :return: Tuple of num_perm ints
+        """
+        hashes = [int.from_bytes(hashlib.sha1(
+            shingle.encode('utf-8')).digest()[:8], 'big')
+            for shingle in shingles]
+        return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes)
+                     for a, b in self.permutations)
+
+
+def get_similarity(signature, other):
+    """
+    Estimates the Jaccard similarity of two sets from their signatures
+    :param signature: MinHash signature
+    :param other: MinHash signature of equal length
+    :return: Float between 0 and 1
+    """
+    return sum(1 for a, b in zip(signature, other) if a == b) / \
+        float(len(signature))
+
+
+class DuplicateFinder(object):
+    def __init__(self, threshold=0.8, num_perm=64, bands=16):
+        """
+        Generates DuplicateFinder object flagging recipes whose ingredients
+        nearly match an earlier recipe, e.g. one syndicated across sites.
+        Candidates are found with locality sensitive hashing, so each check
+        only compares against a few earlier recipes. The signature of every
+        distinct recipe is kept for the finder's lifetime, about 4 KiB each
+        with the default num_perm
+        :param threshold: Min estimated Jaccard similarity of a duplicate
+        :param num_perm: MinHash signature length
+        :param bands: Number of LSH bands, must divide num_perm
+        :return: None
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.rows = num_perm // bands
+        # {(band, band values): [key]}
+        self.buckets = {}
+        # {key: signature}
+        self.signatures = {}
+
+    def get_bands(self, signature):
+        """
+        Splits a signature into its LSH bucket keys
+        :param signature: MinHash signature
+        :return: Generator of (band, band values) tuples
+        """
+        for start in range(0, len(signature), self.rows):
+            yield start, signature[start:start + self.rows]
+
+    def check(self, key, recipe):
+        """
+        Looks recipe up among the recipes checked so far, remembering it
+        unless it is a duplicate
+        :param key: Identifies the recipe, e.g. its url
+        :param recipe: Recipe object
+        :return: Tuple of form (key of the earlier recipe, similarity), or
+        None if recipe isn't a duplicate
+        """
+        shingles = get_shingles(recipe)
+        if len(shingles) < MIN_SHINGLES:
+            return None
+        signature = self.hasher.get_signature(shingles)
+
+        best = None
+        candidates = set()
+        for band in self.get_bands(signature):
+            candidates.update(self.buckets.get(band, ()))
+        for candidate in candidates:
+            similarity = get_similarity(signature, self.signatures[candidate])
+            if similarity >= self.threshold and (
+                    best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        if best:
+            return best
+
+        self.signatures[key] = signature
+        for band in self.get_bands(signature):
+            self.buckets.setdefault(band, []).append(key)
+        return None
@@ -0,0 +1,184 @@
+# coding: utf-8
+
+# Fetching helpers for RecipeParser and main()...
+
+import threading
+import collections
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from Python.http_client import default_client, get_charset
+
+# default number of simultaneous requests allowed against any single host
+DEFAULT_PER_HOST = 2
+
+# per-host overrides, keyed by host with any leading "www." removed
+HOST_LIMITS = {
+    "food52.com": 4,
+    "allrecipes.com": 2,
+    "food.com": 2,
+    "cooking.nytimes.com": 2,
+    "sweetandsavorybyshinee.com": 2,
+    "foodnetwork.com": 2,
+    "marthastewart.com": 2,
+    "liveeatlearn.com": 2,
+}
+
+
+def get_host(url):
+    """
+    Gets the host of a url, lower-cased and without a leading "www."
+    :param url: Input url
+    :return: String containing host name
+    """
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def report_response(report, url, response):
+    """
+    Adds the timings and size of a response to a RunReport
+    :param report: RunReport object
+    :param url: Requested url
+    :param response: http_client.Response
+    :return: None
+    """
+    timings = dict(response.timings)
+    report.add_bytes(url, timings.pop("bytes", 0))
+    report.add_timings(url, timings)
+
+
+def fetch_page(url, cache=None, client=None, report=None):
+    """
+    Downloads the raw page at url along with its declared charset
+    :param url: Input url
+    :param cache: Optional ResponseCache, used to revalidate with a
+    conditional request and reuse the stored body on 304 Not Modified
+    :param client: HttpClient to send the request with, defaults to the
+    shared keep-alive client
+    :param report: Optional RunReport recording connect/download/content_decode
+    times and bytes transferred
+    :return: Tuple of form (bytes, charset from the Content-Type header or
+    None), HTTPError/URLError/OSError is raised
+    """
+    client = client or default_client
+    headers = cache.get_validators(url) if cache else {}
+    response = client.get(url, headers=headers)
+    if report:
+        report_response(report, url, response)
+
+    if response.status == 304:
+        body = cache.get(url) if cache else None
+        if body is None:  # evicted since the validators were read
+            response = client.get(url)
+            if report:
+                report_response(report, url, response)
+        else:
+            return body, cache.get_meta(url).get("charset")
+    charset = get_charset(response.headers)
+    if cache:
+        cache.put(url, response.body, etag=response.headers.get('ETag'),
+                  last_modified=response.headers.get('Last-Modified'),
+                  charset=charset)
+    return response.body, charset
+
+
+def fetch_url(url, cache=None, client=None, report=None):
+    """
+    Downloads the raw page at url, see fetch_page()
+    :return: Bytes containing the page, HTTPError/URLError/OSError is raised
+    """
+    return fetch_page(url, cache=cache, client=client, report=report)[0]
+
+
+class HostLimiter(object):
+    def __init__(self, per_host=DEFAULT_PER_HOST, limits=None):
+        """
+        Generates HostLimiter object, handing out one semaphore per host
+        :param per_host: Max simultaneous requests for hosts without a limit
+        :param limits: Dictionary of form {'host': max_requests}
+        :return: None
+        """
+        self.per_host = per_host
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get_semaphore(self, url):
+        """
+        Gets (creating if needed) the semaphore guarding the url's host
+        :param url: Input url
+        :return: threading.BoundedSemaphore
+        """
+        host = get_host(url)
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(
+                    self.limits.get(host, self.per_host))
+            return self.semaphores[host]
+
+
+def get_result(url, future):
+    """
+    Waits for a submitted call
+    :param url: Url the call was made for
+    :param future: concurrent.futures.Future
+    :return: Tuple of form (url, result, error)
+    """
+    try:
+        return url, future.result(), None
+    except Exception as e:
+        return url, None, e
+
+
+def run_concurrently(func, urls, max_workers=8, per_host=DEFAULT_PER_HOST,
+                     limits=None, max_pending=None):
+    """
+    Calls func(url) for every url on a thread pool, bounded globally by
+    max_workers and per host by a HostLimiter. urls are only pulled from the
+    iterable as results are consumed, so memory stays flat for any input size
+    :param func: Callable taking a url, typically downloading it
+    :param urls: Iterable of urls, may be a generator
+    :param max_workers: Max number of urls being worked on at once
+    :param per_host: Max simultaneous requests for hosts without a limit
+    :param limits: Dictionary of form {'host': max_requests}
+    :param max_pending: Max number of submitted but unconsumed urls,
+    defaults to twice max_workers
+    :return: Generator of (url, result, error) tuples in input order, where
+    error is the exception raised by func(url) or None
+    """
+    limiter = HostLimiter(per_host=per_host, limits=limits)
+    max_pending = max_pending or max_workers * 2
+    pending = collections.deque()
+
+    def work(url):
+        with limiter.get_semaphore(url):
+            return func(url)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for url in urls:
+            pending.append((url, executor.submit(work, url)))
+            if len(pending) >= max_pending:
+                yield get_result(*pending.popleft())
+        while pending:
+            yield get_result(*pending.popleft())
+
+
+def fetch_pages(urls, max_workers=8, per_host=DEFAULT_PER_HOST, limits=None,
+                cache=None, client=None, report=None):
+    """
+    Downloads every url concurrently, to be handed to RecipeParse.from_html
+    :param urls: Iterable of urls
+    :param max_workers: Max number of downloads at once
+    :param per_host: Max simultaneous requests for hosts without a limit
+    :param limits: Dictionary of form {'host': max_requests}
+    :param cache: Optional ResponseCache shared by all downloads
+    :param client: Optional HttpClient shared by all downloads
+    :param report: Optional RunReport shared by all downloads
+    :return: Generator of (url, bytes, error) tuples in input order, where
+    bytes is None if the download raised error
+    """
+    fetch = functools.partial(fetch_url, cache=cache, client=client,
+                              report=report)
+    return run_concurrently(fetch, urls, max_workers=max_workers,
+                            per_host=per_host, limits=limits)
@@ -2,6 +2,31 @@
 
 # Helper functions for RecipeParser and sub classes...
 
+import os
+import re
+import sys
+import time
+import json
+import hashlib
+from Python.sanitize import strip_bad_ascii, strip_bad_ascii_lines
+
+# size limits of decode_string_list() payloads
+MAX_LIST_CHARS = 256 * 1024
+MAX_LIST_ITEMS = 2000
+
+# one quoted python string literal, optionally u-prefixed, and what may
+# follow it inside a list
+STRING_LITERAL = re.compile(
+    r"""\s*[uU]?(?:'([^'\\\n]*(?:\\.[^'\\\n]*)*)'"""
+    r"""|"([^"\\\n]*(?:\\.[^"\\\n]*)*)")\s*(,|\])""",
+    re.DOTALL)
+ESCAPE = re.compile(
+    r"\\(x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|[0-7]{1,3}|.)",
+    re.DOTALL)
+SIMPLE_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "a": "\a", "b": "\b",
+                  "f": "\f", "v": "\v", "\\": "\\", "'": "'", '"': '"',
+                  "\n": ""}
+
 
 def read_input_file(my_file):
     """
@@ -17,14 +42,179 @@ def read_input_file(my_file):
     return content
 
 
-def strip_bad_ascii(string):
+def iter_input_file(my_file):
+    """
+    Reads txt file in lazily, line by line, so huge url lists never have to
+    fit in memory
+    :param my_file: path to txt file, or "-" for stdin
+    :return: Generator of lines, IOError is raised right away if my_file
+    can't be opened
+    """
+    f = sys.stdin if my_file == "-" else open(my_file, 'r')
+
+    def lines():
+        try:
+            for line in f:
+                yield line.rstrip("\r\n")
+        finally:
+            if f is not sys.stdin:
+                f.close()
+    return lines()
+
+
+def normalize_urls(urls):
+    """
+    Skips blank lines and adds "http://" to urls missing a scheme
+    :param urls: Iterable of urls
+    :return: Generator of urls
+    """
+    for url in urls:
+        url = url.strip()
+        if url:
+            yield "http://" + url if "http" not in url else url
+
+
+class HashingWriter(object):
+    def __init__(self, fp):
+        """
+        Generates HashingWriter object, a write-through wrapper hashing
+        everything written and timing the underlying writes
+        :param fp: File-like object opened in text mode
+        :return: None
+        """
+        self.fp = fp
+        self.hash = hashlib.sha1()
+        self.seconds = 0.0
+
+    def write(self, string):
+        """
+        Writes string to the wrapped file
+        :param string: String to write
+        :return: None
+        """
+        self.hash.update(string.encode('utf-8'))
+        start = time.perf_counter()
+        self.fp.write(string)
+        self.seconds += time.perf_counter() - start
+
+
+def fsync_path(path):
+    """
+    Flushes a file (or directory entry changes) to disk
+    :param path: Path to a file or directory
+    :return: None
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def get_plain_value(value):
     """
-    Removes ascii chars excluding those for 1/4, 1/2, and 3/4
-    :param string: input string containing ascii to be stripped
-    :return: string containing above specified ascii chars
+    Converts extracted recipe values into plain python types, so they no
+    longer reference (and keep alive) the BeautifulSoup tree
+    :param value: str, NavigableString, Tag, list, dict or None
+    :return: Same value built from str, list and dict only
     """
-    return "".join(filter(
-        lambda x: ord(x) < 128 or 187 < ord(x) < 191, string))
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, dict):
+        return dict((get_plain_value(key), get_plain_value(item))
+                    for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [get_plain_value(item) for item in value]
+    return value.get_text().strip()
+
+
+def unescape_literal(body):
+    """
+    Resolves the backslash escapes of a python string literal body
+    :param body: Text between the quotes
+    :return: String
+    """
+    if "\\" not in body:
+        return body
+
+    def replace(match):
+        escape = match.group(1)
+        if escape[0] in "xuU" and len(escape) > 1:
+            return chr(int(escape[1:], 16))
+        if escape[0] in "01234567":
+            return chr(int(escape, 8))
+        return SIMPLE_ESCAPES.get(escape, "\\" + escape)
+    return ESCAPE.sub(replace, body)
+
+
+def decode_string_list(value, max_chars=MAX_LIST_CHARS,
+                       max_items=MAX_LIST_ITEMS):
+    """
+    Decodes a list of strings serialized as JSON or as a python literal,
+    e.g. "['1 onion', \"2 cups broth\"]", without building an AST
+    :param value: Serialized list
+    :param max_chars: Longest value accepted, in characters
+    :param max_items: Most strings accepted
+    :return: List of strings, ValueError is raised for anything else or
+    anything over the limits
+    """
+    if len(value) > max_chars:
+        raise ValueError("String list longer than " + str(max_chars) +
+                         " characters")
+    value = value.strip()
+    if not value.startswith("[") or not value.endswith("]"):
+        raise ValueError("Not a list: " + value[:40])
+
+    if '"' not in value and "\\" not in value:
+        # no escapes and no double quotes inside the strings, so swapping
+        # the quotes turns a python literal into the same JSON list
+        value = value.replace("'", '"')
+    try:
+        items = json.loads(value)
+    except ValueError:
+        items = None
+    if items is not None:
+        if not all(isinstance(item, str) for item in items):
+            raise ValueError("Not a list of strings: " + value[:40])
+        if len(items) > max_items:
+            raise ValueError("More than " + str(max_items) + " strings")
+        return items
+
+    # python literal, single quotes or u'' prefixes, walked left to right
+    items = []
+    position = 1
+    if value[1:].strip() == "]":
+        return items
+    while True:
+        match = STRING_LITERAL.match(value, position)
+        if match is None:
+            if items and value[position:].strip() == "]":  # trailing comma
+                return items
+            raise ValueError("Malformed string list at " + str(position))
+        body = match.group(1) if match.group(1) is not None else \
+            match.group(2)
+        items.append(unescape_literal(body))
+        if len(items) > max_items:
+            raise ValueError("More than " + str(max_items) + " strings")
+        position = match.end()
+        if match.group(3) == "]":
+            break
+    if position != len(value):
+        raise ValueError("Trailing data at " + str(position))
+    return items
+
+
+def iter_ingredient_table(ingredient_dict):
+    """
+    Generates markdown table rows one at a time
+    :param ingredient_dict: Dictionary of form {'ingredient' : 'quantity'}
+    :return: Generator of strings, rows of a 2 column table
+    (Quantity|Ingredient)
+    """
+    for ingredient, amount in ingredient_dict.items():
+        yield "|" + ''.join(amount) + "|" + ingredient + "|\n"
 
 
 def get_ingredient_table(ingredient_dict):
@@ -33,12 +223,17 @@ def get_ingredient_table(ingredient_dict):
     :param ingredient_dict: Dictionary of form {'ingredient' : 'quantity'}
     :return: String containing markdown 2 column table (Quantity|Ingredient)
     """
-    ingredient_table = ''
+    return ''.join(iter_ingredient_table(ingredient_dict))
 
-    for ingredient, amount in ingredient_dict.items():
-            ingredient_table += "|" + ''.join(amount) + "|" + \
-                                 ingredient + "|\n"
-    return ingredient_table
+
+def iter_ingredient_table_simple(ingredient_list):
+    """
+    Generates markdown table rows one at a time
+    :param ingredient_list: List of form ['x ingredient a', 'y ingredient b']
+    :return: Generator of strings, rows of a 1 column table (Ingredient)
+    """
+    for ingredient in ingredient_list:
+        yield "|" + ''.join(ingredient) + "|\n"
 
 
 def get_ingredient_table_simple(ingredient_list):
@@ -47,10 +242,21 @@ def get_ingredient_table_simple(ingredient_list):
     :param ingredient_list: List of form ['x ingredient a', 'y ingredient b']
     :return: String containing markdown 1 column table (Ingredient)
     """
-    ingredient_table = ''
-    for ingredient in ingredient_list:
-            ingredient_table += "|" + ''.join(ingredient) + "|\n"
-    return ingredient_table
+    return ''.join(iter_ingredient_table_simple(ingredient_list))
+
+
+def iter_ingredient_list_with_subtitles(ingredient_dict):
+    """
+    Generates a markdown list with sub-titles one line at a time
+    :param ingredient_dict: Dictionary of form
+    {'title', ['step0', ... , 'stepX'}}
+    :return: Generator of strings
+    """
+    for title, ingredients in ingredient_dict.items():
+        if title:
+            yield "\n######" + title + "\n"
+        for ingredient in ingredients:
+            yield "* " + ingredient + "\n"
 
 
 def get_ingredient_list_with_subtitles(ingredient_dict):
@@ -60,13 +266,17 @@ def get_ingredient_list_with_subtitles(ingredient_dict):
     {'title', ['step0', ... , 'stepX'}}
     :return: String containing markdown list with sub-title
     """
-    ingredient_list = ''
+    return ''.join(iter_ingredient_list_with_subtitles(ingredient_dict))
 
-    for title, ingredients in ingredient_dict.items():
-            ingredient_list += "\n######" + title + "\n" if title else ''
-            for ingredient in ingredients:
-                ingredient_list += "* " + ingredient + "\n"
-    return ingredient_list
+
+def iter_instruction_list(instruction_list):
+    """
+    Generates a markdown list one step at a time
+    :param instruction_list: List of form ['step0', ... , 'stepX']
+    :return: Generator of strings
+    """
+    for step in instruction_list:
+        yield "\n\n* " + step
 
 
 def get_instruction_list(instruction_list):
@@ -75,10 +285,24 @@ def get_instruction_list(instruction_list):
     :param instruction_list: List of form ['step0', ... , 'stepX']
     :return: String containing markdown list
     """
-    instruction_list_string = ''
-    for step in instruction_list:
-            instruction_list_string += "\n\n* " + step
-    return instruction_list_string
+    return ''.join(iter_instruction_list(instruction_list))
+
+
+def iter_instruction_dict_with_subtitles(instruction_dict):
+    """
+    Generates a markdown list with sub-titles one line at a time
+    :param instruction_dict: Dictionary of form
+    {'title' : ['step0', ... , 'stepX']}
+    :return: Generator of strings
+    """
+    for title, steps in instruction_dict.items():
+        if title:
+            yield "\n####" + title + "\n"
+        else:
+            yield "\n"
+        for step in steps:
+            yield "* " + step + "\n"
+        yield "\n"
 
 
 def get_instruction_dict_with_subtitles(instruction_dict):
@@ -88,12 +312,4 @@ def get_instruction_dict_with_subtitles(instruction_dict):
     {'title' : ['step0', ... , 'stepX']}
     :return: String containing markdown list with sub-titles
     """
-    instruction_list = ''
-    for title, steps in instruction_dict.items():
-            if title:
-                instruction_list += "\n####" + title + "\n"
-            else:
-                instruction_list += "\n"
-            for step in steps:
-                instruction_list += "* " + step + "\n"
-            instruction_list += "\n"
+    return ''.join(iter_instruction_dict_with_subtitles(instruction_dict))
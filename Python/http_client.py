@@ -0,0 +1,266 @@
+# coding: utf-8
+
+# Keep-alive HTTP client with per-host connection pools for fetch_url()...
+
+import gzip
+import http.client
+import io
+import ssl
+import threading
+import zlib
+import urllib
+from urllib import error
+from urllib.parse import urlsplit, urljoin
+from collections import namedtuple
+from Python.timing import timed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# seconds to wait for a connect or a read before giving up
+DEFAULT_TIMEOUT = 30
+
+# max idle connections kept open per host
+DEFAULT_POOL_SIZE = 8
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+# raised when a reused keep-alive connection was closed by the server while
+# idle, the request is sent again on a fresh connection. Timeouts aren't
+# retried, the server may still be working on the request
+STALE_CONNECTION_ERRORS = (ConnectionResetError, BrokenPipeError,
+                           http.client.RemoteDisconnected)
+
+# sent with every request, pretending to be Firefox
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept-Encoding': 'gzip, deflate, br' if brotli else 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# timings is a dictionary of form
+# {'connect': seconds, 'download': seconds, 'content_decode': seconds (undoing
+# the Content-Encoding), 'bytes': count}
+Response = namedtuple("Response", ["url", "status", "headers", "body",
+                                   "timings"])
+
+
+class ConnectionPool(object):
+    def __init__(self, scheme, host, port, timeout=DEFAULT_TIMEOUT,
+                 maxsize=DEFAULT_POOL_SIZE, ssl_context=None):
+        """
+        Generates ConnectionPool object holding idle keep-alive connections
+        to one host
+        :param scheme: "http" or "https"
+        :param host: Host name
+        :param port: Port number or None for the scheme default
+        :param timeout: Socket timeout in seconds
+        :param maxsize: Max idle connections kept, extra ones are closed
+        :param ssl_context: ssl.SSLContext used for https
+        :return: None
+        """
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.ssl_context = ssl_context
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        """
+        Takes an idle connection, or opens a new one if there are none
+        :return: Tuple of form (http.client.HTTPConnection, is_reused)
+        """
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), True
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout,
+                context=self.ssl_context), False
+        return http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout), False
+
+    def put_connection(self, connection):
+        """
+        Returns a connection whose response was fully read to the pool
+        :param connection: http.client.HTTPConnection
+        :return: None
+        """
+        with self.lock:
+            if len(self.idle) < self.maxsize:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        """
+        Closes every idle connection
+        :return: None
+        """
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+
+def decode_body(body, encoding):
+    """
+    Undoes the Content-Encoding of a response body
+    :param body: Bytes as received
+    :param encoding: Content-Encoding header value or None
+    :return: Bytes containing the decoded body
+    """
+    encoding = (encoding or '').strip().lower()
+    if encoding in ('', 'identity'):
+        return body
+    if encoding in ('gzip', 'x-gzip'):
+        return gzip.decompress(body)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(body)
+        except zlib.error:  # raw deflate stream without zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    if encoding == 'br' and brotli:
+        return brotli.decompress(body)
+    raise ValueError("Unsupported Content-Encoding: " + encoding)
+
+
+def get_charset(headers):
+    """
+    Gets the charset parameter of a Content-Type header
+    :param headers: Response headers
+    :return: String containing the charset name, or None if not given
+    """
+    content_type = headers.get('Content-Type') or ''
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip("\"'") or None
+    return None
+
+
+class HttpClient(object):
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_size=DEFAULT_POOL_SIZE,
+                 max_redirects=5, headers=None):
+        """
+        Generates HttpClient object, reusing one pool of keep-alive
+        connections per host across requests and threads
+        :param timeout: Socket timeout in seconds
+        :param pool_size: Max idle connections kept per host
+        :param max_redirects: Max redirects followed per request
+        :param headers: Dictionary of headers sent with every request
+        :return: None
+        """
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_redirects = max_redirects
+        self.headers = dict(DEFAULT_HEADERS)
+        self.headers.update(headers or {})
+        self.ssl_context = ssl.create_default_context()
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def get_pool(self, scheme, host, port):
+        """
+        Gets (creating if needed) the connection pool for a host
+        :return: ConnectionPool object
+        """
+        key = (scheme, host, port)
+        with self.lock:
+            if key not in self.pools:
+                self.pools[key] = ConnectionPool(
+                    scheme, host, port, timeout=self.timeout,
+                    maxsize=self.pool_size, ssl_context=self.ssl_context)
+            return self.pools[key]
+
+    def request_once(self, url, headers):
+        """
+        Sends a single GET request over a pooled connection, retrying once on
+        a fresh connection if a reused one turns out to be closed
+        :param url: Input url
+        :param headers: Dictionary of request headers
+        :return: Response with decoded body
+        """
+        timings = {}
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise urllib.error.URLError("unknown url type: " + url)
+        pool = self.get_pool(parts.scheme, parts.hostname, parts.port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        while True:
+            connection, is_reused = pool.get_connection()
+            try:
+                if not is_reused:  # DNS lookup, TCP connect and TLS handshake
+                    with timed(timings, "connect"):
+                        connection.connect()
+                with timed(timings, "download"):
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    body = response.read()
+            except (http.client.HTTPException, OSError) as e:
+                connection.close()
+                if is_reused and isinstance(e, STALE_CONNECTION_ERRORS):
+                    continue
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            pool.put_connection(connection)
+        timings["bytes"] = len(body)
+        with timed(timings, "content_decode"):
+            body = decode_body(body, response.headers.get('Content-Encoding'))
+        return Response(url, response.status, response.headers, body, timings)
+
+    def get(self, url, headers=None):
+        """
+        Downloads url, following redirects
+        :param url: Input url
+        :param headers: Optional dictionary of extra request headers
+        :return: Response, urllib.error.HTTPError is raised for 4xx/5xx
+        """
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        url = url.split("#", 1)[0]
+
+        timings = {}
+        for _ in range(self.max_redirects + 1):
+            response = self.request_once(url, request_headers)
+            for stage, value in response.timings.items():
+                timings[stage] = timings.get(stage, 0) + value
+            location = response.headers.get('Location')
+            if response.status in REDIRECT_CODES and location:
+                url = urljoin(url, location)
+                continue
+            if response.status >= 400:
+                raise urllib.error.HTTPError(
+                    url, response.status,
+                    http.client.responses.get(response.status, ''),
+                    response.headers, io.BytesIO(response.body))
+            return response._replace(timings=timings)
+        raise urllib.error.HTTPError(url, response.status,
+                                     "Too many redirects", response.headers,
+                                     io.BytesIO(response.body))
+
+    def close(self):
+        """
+        Closes every pooled connection
+        :return: None
+        """
+        with self.lock:
+            pools = list(self.pools.values())
+        for pool in pools:
+            pool.close()
+
+
+# shared by every fetch_url() call that isn't handed its own client
+default_client = HttpClient()
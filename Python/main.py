@@ -1,69 +1,335 @@
 # coding: utf-8
 from Python.help_me import *
 from Python.RecipeParser import *
+from Python.fetcher import fetch_page, run_concurrently, DEFAULT_PER_HOST
+from Python.http_client import HttpClient, DEFAULT_TIMEOUT
+from Python.cache import ResponseCache, DEFAULT_MAX_BYTES
+from Python.parse_pool import parse_page, parse_pages
+from Python.timing import RunReport
+from Python.manifest import Manifest
+from Python.writer import MarkdownWriter, FSYNC_NONE
+from Python.archive import RecipeArchive
+from Python.recipe import write_ndjson
+from Python.search_index import RecipeIndex
+from Python.dedupe import dedupe_urls, DuplicateFinder
+from Python.scheduler import PoliteScheduler, RobotsCache, Backoff, \
+    DEFAULT_RATE, DEFAULT_MAX_RETRIES
+import argparse
+import functools
+import os
+import time
 
 
-def main(cur_file):
-    count = -1
+def fetch_recipe_page(url, cache=None, client=None, report=None):
+    """
+    Downloads url if it is a supported recipe website
+    :param url: Input url
+    :param cache: Optional ResponseCache
+    :param client: Optional HttpClient
+    :param report: Optional RunReport
+    :return: Tuple of form (bytes, charset or None, fetch time in seconds
+    since the epoch), or None if the url is unsupported
+    """
+    parser = get_parser(url)
+    if not parser:
+        return None
+    if report:
+        report.add_timings(url, {}, site=parser.__name__)
+    return fetch_page(url, cache=cache, client=client, report=report) + \
+        (time.time(),)
+
+
+def get_pages(urls, fetch, max_workers, per_host, scheduler=None):
+    """
+    Downloads every supported url, reporting failed and unsupported urls
+    :param urls: Iterable of urls
+    :param fetch: Callable downloading a url, see fetch_recipe_page()
+    :param max_workers: Number of urls downloaded at once
+    :param per_host: Max simultaneous requests against a single website
+    :param scheduler: Optional PoliteScheduler pacing and retrying the
+    downloads, pages then come back in completion order
+    :return: Generator of (RecipeParse sub class, url, bytes, charset,
+    fetched) tuples
+    """
+    def supported(urls):
+        for url in urls:
+            if get_parser(url):
+                yield url
+            else:
+                print("UNSUPPORTED URL:\t", url)
+
+    if scheduler:
+        results = scheduler.run(fetch, supported(urls),
+                                max_workers=max_workers)
+    else:
+        results = run_concurrently(fetch, supported(urls),
+                                   max_workers=max_workers, per_host=per_host)
+    for url, data, error in results:
+        if error:
+            print(url, "\tPAGE NOT DOWNLOADED:\t", error.__str__())
+        else:
+            yield (get_parser(url), url) + data
+
+
+def update_manifest(manifest, url, recipe):
+    """
+    Records a written recipe in the manifest, removing the file an earlier
+    run wrote for url when the refreshed recipe got another title, unless
+    another url still points at it
+    :param manifest: Manifest object
+    :param url: Input url
+    :param recipe: RecipeParse object after make_markdown()
+    :return: None
+    """
+    entry = manifest.get(url)
+    manifest.record(url, recipe.markdown_file, recipe.content_hash,
+                    fetched=recipe.fetched)
+    if entry and entry["file"] != recipe.markdown_file and \
+            not manifest.is_referenced(entry["file"]) and \
+            os.path.isfile(entry["file"]):
+        os.remove(entry["file"])
+
+
+def main(cur_file, max_workers=1, per_host=DEFAULT_PER_HOST, cache_dir=None,
+         cache_bytes=DEFAULT_MAX_BYTES, parse_workers=0, parse_chunksize=1,
+         html_parser=None, timeout=DEFAULT_TIMEOUT, report_file=None,
+         manifest_file=None, refresh_older_than=None, fsync=FSYNC_NONE,
+         archive_file=None, ndjson_file=None, index_file=None,
+         dedupe_threshold=None, polite=False, rate=DEFAULT_RATE,
+         max_retries=DEFAULT_MAX_RETRIES, report_per_url=False):
+    """
+    Generates markdown files for every recipe url in cur_file
+    :param cur_file: path to txt file containing recipe urls, or "-" to read
+    them from stdin
+    :param max_workers: Number of urls downloaded at once
+    :param per_host: Max simultaneous requests against a single website
+    :param cache_dir: Optional directory caching downloaded pages between runs
+    :param cache_bytes: Byte budget of the page cache
+    :param parse_workers: Number of processes parsing pages, 0 parses them
+    in this process
+    :param parse_chunksize: Number of pages sent to a parse process at once
+    :param html_parser: Tree builder, "lxml" (default when installed),
+    "html.parser" or "html5lib"
+    :param timeout: Seconds to wait for a connect or a read
+    :param report_file: Optional path receiving a JSON report with per stage
+    and per site timings (p50/p95/p99) and bytes transferred
+    :param manifest_file: Optional path of the manifest of generated recipes,
+    urls found in it are skipped without being downloaded
+    :param refresh_older_than: Optional age in days after which urls in the
+    manifest are downloaded and written again
+    :param fsync: When markdown files are flushed to disk, "none", "file"
+    (every file) or "batch" (groups of files)
+    :param archive_file: Optional path of a packed recipe archive written
+    instead of one markdown file per recipe
+    :param ndjson_file: Optional path receiving one JSON line per parsed
+    recipe, see Python.recipe.Recipe
+    :param index_file: Optional path of the ingredient/full-text index,
+    updated with every recipe written, see Python.search_index
+    :param dedupe_threshold: Optional share of matching ingredients above
+    which a recipe is reported as a duplicate of one parsed earlier in the
+    run, it is still written
+    :param polite: True to pace every website to rate requests per second,
+    obey robots.txt (including its crawl-delay) and retry throttled (429)
+    and failed (5xx) downloads with backoff, see Python.scheduler
+    :param rate: Requests per second against a single website when polite
+    :param max_retries: Max retries of a url when polite
+    :param report_per_url: True to also list every url's timings in the
+    report, which grows with the number of urls
+    :return: True if every markdown file was generated, else False
+    """
+    count = 0
+    total = 0
     try:
-        content = read_input_file(my_file=cur_file)
+        content = iter_input_file(my_file=cur_file)
     except IOError as e:
         print("UNABLE TO OPEN FILE: ", e)
         return False
 
-    content[:] = ["http://" + content if "http" not in content else content
-                  for content in content]
+    manifest = Manifest(manifest_file) if manifest_file else None
+    index = RecipeIndex(index_file) if index_file else None
 
-    for count, url in enumerate(content):
+    def count_urls(urls):
+        nonlocal total, count
+        for url in urls:
+            total += 1
+            if manifest and manifest.is_fresh(url, refresh_older_than):
+                count += 1  # generated by an earlier run
+                continue
+            yield url
 
-        if "food52" in url:
-            thisrecipe = Food52Parse(url)
+    if html_parser:
+        set_html_parser(html_parser)
 
-        if "allrecipes" in url:
-            thisrecipe = AllRecipesParse(url)
+    cache = ResponseCache(cache_dir, cache_bytes) if cache_dir else None
+    client = HttpClient(timeout=timeout)
+    report = RunReport(per_url=report_per_url) if report_file else None
+    fetch = functools.partial(fetch_recipe_page, cache=cache, client=client,
+                              report=report)
 
-        if "food.com" in url:
-            thisrecipe = FoodDotComParse(url)
+    def report_duplicate(url, key):
+        print(url, "\tDUPLICATE URL OF:\t", key)
 
-        if "nytimes" in url:
-            thisrecipe = CookingNYTimesParse(url)
+    urls = dedupe_urls(normalize_urls(content), on_duplicate=report_duplicate)
+    scheduler = None
+    if polite:
+        scheduler = PoliteScheduler(rate=rate, per_host=per_host,
+                                    robots=RobotsCache(client),
+                                    backoff=Backoff(max_retries=max_retries))
+    tasks = get_pages(count_urls(urls), fetch, max_workers, per_host,
+                      scheduler=scheduler)
+    if parse_workers:
+        results = parse_pages(tasks, max_workers=parse_workers,
+                              chunksize=parse_chunksize,
+                              html_parser=html_parser)
+    else:
+        results = (parse_page(task) for task in tasks)
 
-        if "sweetandsavory" in url:
-            thisrecipe = SweetAndSavoryParse(url)
+    if archive_file:
+        writer = RecipeArchive(archive_file)
+    else:
+        writer = MarkdownWriter(RECIPE_DIRECTORY, fsync=fsync)
+    ndjson = open(ndjson_file, 'w', encoding='utf-8') if ndjson_file else None
+    finder = DuplicateFinder(dedupe_threshold) if dedupe_threshold else None
 
-        if "foodnetwork" in url:
-            thisrecipe = FoodNetworkParse(url)
+    def handle_written():
+        nonlocal count
+        for url, thisrecipe, error in writer.iter_done():
+            if isinstance(error, FileExistsError):
+                print(thisrecipe.title, "\t FILE EXISTS:\t", error.__str__())
+            elif error:
+                print(thisrecipe.title, "\tFILE NOT CREATED:\t",
+                      error.__str__())
+            else:
+                count += 1
+                if manifest:
+                    update_manifest(manifest, url, thisrecipe)
+                if index:
+                    index.add(thisrecipe.get_recipe(),
+                              thisrecipe.markdown_file)
+            if report:
+                report.add_timings(url, thisrecipe.timings,
+                                   site=type(thisrecipe).__name__)
+                report.finish(url)
 
-        if "marthastewart" in url:
-            thisrecipe = MarthaStewartParse(url)
+    try:
+        for url, thisrecipe, error in results:
+            if error:
+                print(url, "\tRECIPE NOT PARSED:\t", error.__str__())
+                if report:
+                    report.finish(url)
+                continue
 
-        if "liveeatlearn" in url:
-            thisrecipe = LiveEatLearnParse(url)
+            if finder:
+                duplicate = finder.check(url, thisrecipe.get_recipe())
+                if duplicate:
+                    print(url, "\tDUPLICATE RECIPE OF:\t", duplicate[0])
+            if ndjson:
+                write_ndjson([thisrecipe.get_recipe()], ndjson)
+            writer.submit(url, thisrecipe,
+                          overwrite=bool(manifest and manifest.get(url)))
+            handle_written()
+    finally:
+        # flush queued recipes and release every file and connection even
+        # when a stage raised
+        try:
+            writer.close()
+            handle_written()
+        finally:
+            client.close()
+            if ndjson:
+                ndjson.close()
+            if manifest:
+                manifest.close()
+            if index:
+                index.close()
 
-        if thisrecipe:
-            thisrecipe.set_recipe_contents()
-            try:
-                thisrecipe.make_markdown()
-                count += 1
-            except FileExistsError as e:
-                print(thisrecipe.title, "\t FILE EXISTS:\t", e.__str__())
-            except IOError as e:
-                print(thisrecipe.title, "\tFILE NOT CREATED:\t", e.__str__())
-            except Exception as e:
-                pass
-                print(thisrecipe.title, "\tFILE NOT CREATED:\t", e.__str__())
-        else:
-            print("UNSUPPORTED URL:\t", url)
+    if report:
+        report.write(report_file)
 
-    if count == len(content):
+    if count == total:
         return True
     else:
         return False
 
+def get_arg_parser():
+    """
+    Builds the command line parser of python -m Python.main
+    :return: argparse.ArgumentParser object
+    """
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("file", nargs="?",
+                            default="/Users/brooke/Desktop/recipes.txt",
+                            help='txt file of recipe urls, "-" for stdin')
+    arg_parser.add_argument("--workers", type=int, default=8,
+                            help="number of urls downloaded at once")
+    arg_parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST,
+                            help="max simultaneous requests per website")
+    arg_parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                            help="seconds to wait for a connect or a read")
+    arg_parser.add_argument("--cache-dir",
+                            help="directory caching downloaded pages "
+                                 "between runs")
+    arg_parser.add_argument("--cache-bytes", type=int,
+                            default=DEFAULT_MAX_BYTES,
+                            help="byte budget of the page cache")
+    arg_parser.add_argument("--parse-workers", type=int, default=0,
+                            help="processes parsing pages, 0 parses them in "
+                                 "this process")
+    arg_parser.add_argument("--parse-chunksize", type=int, default=1,
+                            help="pages sent to a parse process at once")
+    arg_parser.add_argument("--html-parser",
+                            choices=["lxml", "html.parser", "html5lib"],
+                            help="tree builder, lxml when installed")
+    arg_parser.add_argument("--report",
+                            help="write a JSON report of stage timings to "
+                                 "this file")
+    arg_parser.add_argument("--manifest",
+                            help="manifest of generated recipes, known urls "
+                                 "are skipped")
+    arg_parser.add_argument("--refresh-older-than", type=float,
+                            metavar="DAYS",
+                            help="re-generate manifest urls older than DAYS")
+    arg_parser.add_argument("--fsync", default=FSYNC_NONE,
+                            choices=["none", "file", "batch"],
+                            help="when markdown files are flushed to disk")
+    arg_parser.add_argument("--archive",
+                            help="write recipes to this packed archive "
+                                 "instead of Recipes/")
+    arg_parser.add_argument("--ndjson",
+                            help="also export every recipe as a JSON line "
+                                 "to this file")
+    arg_parser.add_argument("--index",
+                            help="ingredient/full-text index updated with "
+                                 "every recipe written")
+    arg_parser.add_argument("--dedupe", action="store_true",
+                            help="report recipes whose ingredients match an "
+                                 "earlier recipe")
+    arg_parser.add_argument("--polite", action="store_true",
+                            help="pace requests per website, obey "
+                                 "robots.txt and retry 429/5xx with backoff")
+    arg_parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                            help="requests per second per website with "
+                                 "--polite")
+    arg_parser.add_argument("--retries", type=int,
+                            default=DEFAULT_MAX_RETRIES,
+                            help="max retries per url with --polite")
+    return arg_parser
+
+
 if __name__ == "__main__":
-    file = "/Users/brooke/Desktop/recipes.txt"
+    args = get_arg_parser().parse_args()
 
-    if main(file):
+    if main(args.file, max_workers=args.workers, per_host=args.per_host,
+            cache_dir=args.cache_dir, cache_bytes=args.cache_bytes,
+            parse_workers=args.parse_workers,
+            parse_chunksize=args.parse_chunksize,
+            html_parser=args.html_parser, timeout=args.timeout,
+            report_file=args.report, manifest_file=args.manifest,
+            refresh_older_than=args.refresh_older_than, fsync=args.fsync,
+            archive_file=args.archive, ndjson_file=args.ndjson,
+            index_file=args.index,
+            dedupe_threshold=0.8 if args.dedupe else None,
+            polite=args.polite, rate=args.rate, max_retries=args.retries):
         print("Success")
     else:
         print("Not all markdown files were generated")
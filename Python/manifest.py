@@ -0,0 +1,98 @@
+# coding: utf-8
+
+# Persistent manifest of generated recipes, so re-runs skip known urls...
+
+import sqlite3
+import time
+from Python.cache import normalize_url
+
+# seconds in a day, refresh ages are given in days
+DAY = 24 * 60 * 60
+
+
+class Manifest(object):
+    def __init__(self, path, commit_every=100):
+        """
+        Generates Manifest object backed by a SQLite file mapping canonical
+        url -> markdown file, content hash and fetch time
+        :param path: Path to the manifest file, created if missing
+        :param commit_every: Number of recorded recipes between commits
+        :return: None
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS recipes (url TEXT PRIMARY KEY, "
+            "file TEXT, content_hash TEXT, fetched REAL)")
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def get(self, url):
+        """
+        Gets the manifest entry of url
+        :param url: Input url, normalized before lookup
+        :return: Dictionary of form {'url', 'file', 'content_hash',
+        'fetched'}, or None if url was never generated
+        """
+        row = self.connection.execute(
+            "SELECT url, file, content_hash, fetched FROM recipes "
+            "WHERE url = ?", (normalize_url(url),)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("url", "file", "content_hash", "fetched"), row))
+
+    def is_fresh(self, url, max_age=None):
+        """
+        Checks whether url was already generated and doesn't need a refresh
+        :param url: Input url
+        :param max_age: Optional age in days after which an entry is stale
+        :return: True or False
+        """
+        entry = self.get(url)
+        if entry is None:
+            return False
+        if max_age is None:
+            return True
+        return time.time() - entry["fetched"] < max_age * DAY
+
+    def record(self, url, file, content_hash, fetched=None):
+        """
+        Adds or updates the entry of a generated recipe
+        :param url: Input url
+        :param file: Path of the markdown file
+        :param content_hash: Hex digest of the markdown
+        :param fetched: Fetch time in seconds since the epoch, defaults to now
+        :return: None
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO recipes VALUES (?, ?, ?, ?)",
+            (normalize_url(url), file, content_hash,
+             time.time() if fetched is None else fetched))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def is_referenced(self, file):
+        """
+        Checks whether any entry still points at a markdown file
+        :param file: Path of the markdown file
+        :return: True or False
+        """
+        return self.connection.execute(
+            "SELECT 1 FROM recipes WHERE file = ? LIMIT 1",
+            (file,)).fetchone() is not None
+
+    def commit(self):
+        """
+        Writes pending entries to disk
+        :return: None
+        """
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        """
+        Commits and closes the manifest
+        :return: None
+        """
+        self.commit()
+        self.connection.close()
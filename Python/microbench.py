@@ -0,0 +1,154 @@
+# coding: utf-8
+
+# Microbenchmarks of hot helper functions against the code they replaced...
+
+import argparse
+import ast
+import json
+import timeit
+import tracemalloc
+import bs4 as bs
+from Python.help_me import decode_string_list
+from Python.sanitize import strip_bad_ascii_lines, clean_title
+from Python.RecipeParser import make_soup, sniff_charset, HTML_PARSER
+
+
+def compare(candidates, number=1000, repeat=5):
+    """
+    Times every candidate on the same input, best of repeat runs
+    :param candidates: List of form [('name', callable without arguments)]
+    :param number: Calls per run
+    :param repeat: Runs per candidate
+    :return: List of form [('name', microseconds per call)]
+    """
+    return [(name, min(timeit.repeat(func, number=number, repeat=repeat)) /
+             number * 1e6) for name, func in candidates]
+
+
+def print_comparison(title, results):
+    """
+    Prints compare() results relative to the first (baseline) candidate
+    :param title: Benchmark title
+    :param results: compare() output
+    :return: None
+    """
+    print(title)
+    baseline = results[0][1]
+    for name, micros in results:
+        print("  {:<28}{:>12.2f} us{:>8.1f}x".format(name, micros,
+                                                      baseline / micros))
+
+
+def get_peak_memory(func):
+    """
+    Measures the memory a call allocates on top of what is already live
+    :param func: Callable without arguments
+    :return: Peak traced KiB during the call
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024.0
+    finally:
+        tracemalloc.stop()
+
+
+def bench_page_decode(size=200, number=20):
+    """
+    Page decoding before building the tree: the old latin1 -> utf-8
+    re-encode against handing the bytes and their charset straight to the
+    tree builder
+    :param size: Approximate page size in KiB
+    :param number: Calls per run
+    :return: None
+    """
+    row = u"<li class=\"ingredient\">2 cups crème fraîche ½ – ok</li>\n"
+    page = (u"<html><head><meta charset=\"utf-8\"></head><body><ul>" +
+            row * (size * 1024 // len(row.encode('utf-8'))) +
+            u"</ul></body></html>").encode('utf-8')
+
+    def reencode():
+        return page.decode(encoding='latin1').encode(encoding='utf-8')
+
+    title = "page decode, {} KiB utf-8, {}".format(len(page) // 1024,
+                                                   HTML_PARSER)
+    before = [("latin1 re-encode", reencode),
+              ("sniff_charset", lambda: sniff_charset(page))]
+    whole = [("re-encode + soup",
+              lambda: bs.BeautifulSoup(reencode(), HTML_PARSER)),
+             ("charset-aware soup", lambda: make_soup(page))]
+    print_comparison(title + ", before tree build",
+                     compare(before, number * 10))
+    print_comparison(title + ", whole soup", compare(whole, number, 3))
+    for name, func in before + whole:
+        print("  peak memory {:<24}{:>10.0f} KiB".format(
+            name, get_peak_memory(func)))
+
+
+def bench_sanitize(lines=40, number=200):
+    """
+    Per-character filtering of instruction lines and titles: the old filter
+    and generator loops against Python.sanitize
+    :param lines: Number of instruction lines
+    :param number: Calls per run
+    :return: None
+    """
+    def old_strip_bad_ascii(string):
+        return "".join(filter(
+            lambda x: ord(x) < 128 or 187 < ord(x) < 191, string))
+
+    def old_clean_title(title):
+        return ''.join(c for c in title if 0 < ord(c) < 127)
+
+    mixed = [u"Whisk 2 \xbd cups cr\xe8me fra\xeeche with the sugar \u2013 "
+             u"about 3 minutes, until \u201cfluffy\u201d. "] * lines
+    plain = [line.encode('ascii', 'ignore').decode('ascii') for line in mixed]
+    for title, batch in (("mixed", mixed), ("ascii", plain)):
+        print_comparison(
+            "instruction lines, {} x {} chars, {}".format(
+                lines, len(batch[0]), title),
+            compare([("filter + lambda",
+                      lambda: [old_strip_bad_ascii(x) for x in batch]),
+                     ("strip_bad_ascii_lines",
+                      lambda: strip_bad_ascii_lines(batch))], number))
+    title = u"You Won\u2019t Believe It\u2019s Vegan Cr\xe8me Br\xfbl\xe9e"
+    print_comparison("title", compare([
+        ("generator", lambda: old_clean_title(title)),
+        ("clean_title", lambda: clean_title(title))], number * 50))
+
+
+def bench_string_list(size=40, number=1000):
+    """
+    FoodDotComParse ingredient payload: ast.literal_eval against
+    decode_string_list(), for a python literal and a JSON payload
+    :param size: Number of ingredients in the payload
+    :param number: Calls per run
+    :return: None
+    """
+    items = ["{} cups of ingredient number {}, finely chopped".format(
+        i % 4 + 1, i) for i in range(size)]
+    literal = repr(items)
+    as_json = json.dumps(items)
+    for title, value in (("python literal", literal), ("json", as_json)):
+        print_comparison(
+            "string list, {} items, {}".format(size, title),
+            compare([("ast.literal_eval", lambda: ast.literal_eval(value)),
+                     ("decode_string_list",
+                      lambda: decode_string_list(value))], number))
+
+
+BENCHMARKS = {
+    "page_decode": bench_page_decode,
+    "sanitize": bench_sanitize,
+    "string_list": bench_string_list,
+}
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("names", nargs="*",
+                            help="benchmarks to run, all by default: " +
+                                 ", ".join(sorted(BENCHMARKS)))
+    args = arg_parser.parse_args()
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,72 @@
+# coding: utf-8
+
+# Process pool parse stage, spreading BeautifulSoup work across cores...
+
+import collections
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from Python.RecipeParser import set_html_parser
+
+
+def parse_page(task):
+    """
+    Builds a recipe from a downloaded page and sets its contents, runs inside
+    a worker process
+    :param task: Tuple of form (RecipeParse sub class, url, bytes,
+    charset from the Content-Type header or None, fetch time or None)
+    :return: Tuple of form (url, RecipeParse or None, error or None), where
+    the RecipeParse object has released its soup
+    """
+    parser, url, data, charset, fetched = task
+    try:
+        recipe = parser.from_html(url, data, charset, fetched)
+        recipe.set_recipe_contents()
+        recipe.release_soup()
+        return url, recipe, None
+    except Exception as e:
+        return url, None, e
+
+
+def parse_chunk(tasks):
+    """
+    Parses several pages in one worker call
+    :param tasks: List of (RecipeParse sub class, url, bytes, charset,
+    fetched) tuples
+    :return: List of parse_page() results
+    """
+    return [parse_page(task) for task in tasks]
+
+
+def parse_pages(tasks, max_workers=None, chunksize=1, html_parser=None,
+                max_pending=None):
+    """
+    Parses pages on a ProcessPoolExecutor, pulling tasks only as results are
+    consumed
+    :param tasks: Iterable of (RecipeParse sub class, url, bytes, charset,
+    fetched) tuples
+    :param max_workers: Number of worker processes, defaults to cpu count
+    :param chunksize: Number of pages sent to a worker at once
+    :param html_parser: Tree builder for the workers, see set_html_parser()
+    :param max_pending: Max number of submitted but unconsumed chunks,
+    defaults to twice the worker count
+    :return: Generator of (url, RecipeParse or None, error or None) tuples
+    in input order
+    """
+    max_pending = max_pending or (max_workers or os.cpu_count() or 1) * 2
+    pending = collections.deque()
+    initializer = set_html_parser if html_parser else None
+    initargs = (html_parser,) if html_parser else ()
+    tasks = iter(tasks)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer,
+                             initargs=initargs) as executor:
+        while True:
+            chunk = list(itertools.islice(tasks, chunksize))
+            if chunk:
+                pending.append(executor.submit(parse_chunk, chunk))
+            if pending and (len(pending) >= max_pending or not chunk):
+                for result in pending.popleft().result():
+                    yield result
+            elif not chunk:
+                break
@@ -0,0 +1,143 @@
+# coding: utf-8
+
+# Compact structured recipe record and its NDJSON / msgpack export...
+
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Recipe(object):
+    __slots__ = ("site", "url", "title", "img_url", "recipe_yield",
+                 "ingredient_groups", "instruction_groups")
+
+    def __init__(self, site, url, title, img_url='', recipe_yield=None,
+                 ingredient_groups=(), instruction_groups=()):
+        """
+        Generates Recipe object, a slotted record holding only plain values
+        :param site: Name of the RecipeParse sub class it was extracted by
+        :param url: Recipe url
+        :param title: Recipe title
+        :param img_url: Recipe image url
+        :param recipe_yield: Serving size or None
+        :param ingredient_groups: Tuple of form
+        (('sub-title', ('line0', ... , 'lineX')), ...), sub-title '' if none
+        :param instruction_groups: Tuple of form
+        (('sub-title', ('step0', ... , 'stepX')), ...), sub-title '' if none
+        :return: None
+        """
+        self.site = site
+        self.url = url
+        self.title = title
+        self.img_url = img_url
+        self.recipe_yield = recipe_yield
+        self.ingredient_groups = ingredient_groups
+        self.instruction_groups = instruction_groups
+
+    def iter_ingredients(self):
+        """
+        Generates every ingredient line regardless of group
+        :return: Generator of strings
+        """
+        for _, lines in self.ingredient_groups:
+            for line in lines:
+                yield line
+
+    def iter_instructions(self):
+        """
+        Generates every instruction step regardless of group
+        :return: Generator of strings
+        """
+        for _, steps in self.instruction_groups:
+            for step in steps:
+                yield step
+
+    def to_dict(self):
+        """
+        Converts the record into JSON / msgpack friendly types
+        :return: Dictionary keyed by field name, groups as nested lists
+        """
+        record = dict((name, getattr(self, name)) for name in self.__slots__)
+        for name in ("ingredient_groups", "instruction_groups"):
+            record[name] = [[title, list(lines)] for title, lines in
+                            record[name]]
+        return record
+
+    @classmethod
+    def from_dict(cls, record):
+        """
+        Builds a Recipe from to_dict() output
+        :param record: Dictionary keyed by field name
+        :return: Recipe object
+        """
+        record = dict(record)
+        for name in ("ingredient_groups", "instruction_groups"):
+            record[name] = tuple((title, tuple(lines)) for title, lines in
+                                 record.get(name, ()))
+        return cls(**record)
+
+    def to_json(self):
+        """
+        Serializes the record as one line of JSON
+        :return: String without newlines
+        """
+        return json.dumps(self.to_dict(), ensure_ascii=False,
+                          separators=(',', ':'))
+
+
+def write_ndjson(recipes, fp):
+    """
+    Writes recipes as newline delimited JSON
+    :param recipes: Iterable of Recipe objects
+    :param fp: File-like object opened in text mode
+    :return: Number of recipes written
+    """
+    count = 0
+    for recipe in recipes:
+        fp.write(recipe.to_json())
+        fp.write("\n")
+        count += 1
+    return count
+
+
+def read_ndjson(fp):
+    """
+    Reads recipes written by write_ndjson()
+    :param fp: File-like object opened in text mode
+    :return: Generator of Recipe objects
+    """
+    for line in fp:
+        if line.strip():
+            yield Recipe.from_dict(json.loads(line))
+
+
+def write_msgpack(recipes, fp):
+    """
+    Writes recipes as a stream of msgpack maps, needs the msgpack package
+    :param recipes: Iterable of Recipe objects
+    :param fp: File-like object opened in binary mode
+    :return: Number of recipes written
+    """
+    if msgpack is None:
+        raise ImportError("msgpack export needs: pip install msgpack")
+    packer = msgpack.Packer(use_bin_type=True)
+    count = 0
+    for recipe in recipes:
+        fp.write(packer.pack(recipe.to_dict()))
+        count += 1
+    return count
+
+
+def read_msgpack(fp):
+    """
+    Reads recipes written by write_msgpack()
+    :param fp: File-like object opened in binary mode
+    :return: Generator of Recipe objects
+    """
+    if msgpack is None:
+        raise ImportError("msgpack export needs: pip install msgpack")
+    for record in msgpack.Unpacker(fp, raw=False):
+        yield Recipe.from_dict(record)
@@ -0,0 +1,57 @@
+# coding: utf-8
+
+# Text sanitizing for recipe lines and markdown file names...
+
+import re
+
+# anything but ascii and the 1/4, 1/2 and 3/4 fractions
+NOT_ASCII_OR_FRACTION = re.compile(u"[^\x00-\x7f\xbc-\xbe]+")
+
+# anything but printable ascii, the characters a title may keep
+NOT_TITLE_SAFE = re.compile(u"[^\x01-\x7e]+")
+
+# path separators, replaced in file names so a title can't name a directory
+PATH_SEPARATORS = {ord("/"): u"-", ord("\\"): u"-"}
+
+
+def strip_bad_ascii(string):
+    """
+    Removes non ascii chars excluding those for 1/4, 1/2, and 3/4
+    :param string: Input string
+    :return: String containing only ascii and the above fraction chars
+    """
+    if string.isascii():  # C-speed check, most lines need no work
+        return string
+    return NOT_ASCII_OR_FRACTION.sub(u"", string)
+
+
+def strip_bad_ascii_lines(lines):
+    """
+    strip_bad_ascii() over a whole list of ingredient or instruction lines
+    :param lines: Iterable of strings
+    :return: List of strings
+    """
+    return [line if line.isascii() else NOT_ASCII_OR_FRACTION.sub(u"", line)
+            for line in lines]
+
+
+def clean_title(title):
+    """
+    Removes everything but printable ascii from a title
+    :param title: Recipe title
+    :return: String
+    """
+    if title.isascii() and u"\x00" not in title and u"\x7f" not in title:
+        return title
+    return NOT_TITLE_SAFE.sub(u"", title)
+
+
+def get_file_name(title, extension=".md"):
+    """
+    Builds a file name from a title cleaned by clean_title(), path
+    separators become "-"
+    :param title: Recipe title
+    :param extension: File extension including the dot
+    :return: String of form 'title.md'
+    """
+    return clean_title(title).translate(PATH_SEPARATORS) + extension
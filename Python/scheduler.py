@@ -0,0 +1,513 @@
+# coding: utf-8
+
+# Polite crawling: per-host rate limits, robots.txt and retries with backoff...
+
+import asyncio
+import collections
+import heapq
+import http.client
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.robotparser
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from Python.fetcher import get_host, HOST_LIMITS, DEFAULT_PER_HOST
+from Python.http_client import default_client
+
+# default requests per second and burst allowed against any single host
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+
+# per-host overrides of DEFAULT_RATE, keyed like HOST_LIMITS
+HOST_RATES = {}
+
+# statuses worth asking again for later, the rest are final
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# statuses that throttle the whole host rather than one url
+THROTTLE_STATUSES = frozenset([429, 503])
+
+DEFAULT_MAX_RETRIES = 4
+
+# max urls read from the input but not yet yielded back
+DEFAULT_MAX_QUEUED = 1000
+
+
+class RobotsDisallowed(Exception):
+    def __init__(self, url):
+        """
+        Raised for urls the host's robots.txt doesn't let us fetch
+        :param url: Disallowed url
+        :return: None
+        """
+        super(RobotsDisallowed, self).__init__(
+            "disallowed by robots.txt: " + url)
+        self.url = url
+
+
+def parse_retry_after(value, now=None):
+    """
+    Reads a Retry-After header, given either in seconds or as an http date
+    :param value: Header value or None
+    :param now: Current unix time, defaults to time.time()
+    :return: Seconds to wait (0 or more), or None if value is missing or
+    malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date is None:
+        return None
+    return max(0.0, date.timestamp() - (time.time() if now is None else now))
+
+
+def is_retryable(error):
+    """
+    Checks whether a failed download may succeed if tried again later
+    :param error: Exception raised by the download
+    :return: True or False
+    """
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRY_STATUSES
+    if isinstance(error, urllib.error.URLError):
+        # bad urls, or the underlying error of a failed open
+        if not isinstance(error.reason, Exception):
+            return False
+        error = error.reason
+    # unknown hosts, closed ports and bad certificates won't get better
+    if isinstance(error, (socket.gaierror, ConnectionRefusedError,
+                          ssl.SSLCertVerificationError)):
+        return False
+    # timeouts, resets and dropped connections, asyncio.TimeoutError is only
+    # an OSError from python 3.11
+    return isinstance(error, (OSError, http.client.HTTPException,
+                              asyncio.TimeoutError))
+
+
+class Backoff(object):
+    def __init__(self, base=1.0, cap=60.0, max_retries=DEFAULT_MAX_RETRIES,
+                 max_retry_after=300.0):
+        """
+        Generates Backoff object, deciding when a failed download is tried
+        again: exponential backoff with full jitter, or the server's
+        Retry-After when it sends one
+        :param base: Seconds of the first backoff step
+        :param cap: Max seconds of a backoff step
+        :param max_retries: Max retries per url, 0 never retries
+        :param max_retry_after: A Retry-After longer than this gives up
+        instead of waiting
+        :return: None
+        """
+        self.base = base
+        self.cap = cap
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+
+    def get_delay(self, attempt, error):
+        """
+        Gets how long to wait before trying a url again
+        :param attempt: Number of retries done so far
+        :param error: Exception raised by the last try
+        :return: Seconds to wait, or None to give up
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        retry_after = None
+        if isinstance(error, urllib.error.HTTPError) and error.headers:
+            retry_after = parse_retry_after(error.headers.get('Retry-After'))
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            # a little jitter so throttled urls don't all return at once
+            return retry_after + random.uniform(0, self.base)
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+def retry_call(func, url, backoff=None):
+    """
+    Calls func(url), sleeping and calling again on retryable errors. Blocks
+    the calling thread, PoliteScheduler retries without blocking
+    :param func: Callable taking a url, typically downloading it
+    :param url: Input url
+    :param backoff: Backoff object, defaults to Backoff()
+    :return: Result of func(url), the last error is raised once backoff
+    gives up
+    """
+    backoff = backoff or Backoff()
+    attempt = 0
+    while True:
+        try:
+            return func(url)
+        except Exception as e:
+            delay = backoff.get_delay(attempt, e)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+class TokenBucket(object):
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        """
+        Generates TokenBucket object allowing rate requests per second on
+        average and up to burst at once. Not thread-safe, it is only used by
+        the PoliteScheduler dispatching thread
+        :param rate: Tokens added per second
+        :param burst: Max tokens held
+        :return: None
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        # no token is handed out before this monotonic time
+        self.held_until = 0.0
+
+    def refill(self, now):
+        """
+        Adds the tokens earned since the last call
+        :param now: time.monotonic() value
+        :return: None
+        """
+        self.tokens = min(self.burst, self.tokens +
+                          (now - self.updated) * self.rate)
+        self.updated = now
+
+    def get_wait(self, now):
+        """
+        Gets how long until a token is available
+        :param now: time.monotonic() value
+        :return: Seconds, 0 if a token can be taken right away
+        """
+        self.refill(now)
+        wait_tokens = 0.0 if self.tokens >= 1 else \
+            (1 - self.tokens) / self.rate
+        return max(wait_tokens, self.held_until - now, 0.0)
+
+    def take(self, now):
+        """
+        Takes a token, call get_wait() first
+        :param now: time.monotonic() value
+        :return: None
+        """
+        self.refill(now)
+        self.tokens -= 1
+
+    def hold(self, until):
+        """
+        Hands out no token before until, e.g. after a 429 Too Many Requests
+        :param until: time.monotonic() value
+        :return: None
+        """
+        self.held_until = max(self.held_until, until)
+
+    def slow_down(self, rate):
+        """
+        Lowers the rate, e.g. to a robots.txt crawl-delay, never raises it
+        :param rate: Tokens per second
+        :return: None
+        """
+        if rate < self.rate:
+            self.rate = rate
+            self.burst = 1
+            self.tokens = min(self.tokens, 1.0)
+
+
+def get_origin(url):
+    """
+    Gets the scheme and host part of a url, robots.txt applies per origin
+    :param url: Input url
+    :return: String of form 'https://host:port'
+    """
+    parts = urlsplit(url)
+    return "{}://{}".format(parts.scheme, parts.netloc.lower())
+
+
+class RobotsCache(object):
+    def __init__(self, client=None, user_agent=None):
+        """
+        Generates RobotsCache object downloading and parsing robots.txt once
+        per origin
+        :param client: HttpClient to download with, defaults to the shared
+        keep-alive client
+        :param user_agent: Agent matched against robots.txt rules, defaults
+        to the client's User-Agent header
+        :return: None
+        """
+        self.client = client or default_client
+        self.user_agent = user_agent or self.client.headers.get(
+            'User-Agent', '*')
+        # {'origin': RobotFileParser}
+        self.rules = {}
+        self.lock = threading.Lock()
+
+    def is_loaded(self, url):
+        """
+        Checks whether robots.txt of the url's origin was already loaded
+        :param url: Input url
+        :return: True or False
+        """
+        with self.lock:
+            return get_origin(url) in self.rules
+
+    def load(self, url):
+        """
+        Downloads and parses robots.txt of the url's origin. A missing file
+        allows everything, 401/403 disallow everything, network errors and
+        5xx allow everything rather than losing the whole site
+        :param url: Any url of the origin
+        :return: RobotFileParser object
+        """
+        origin = get_origin(url)
+        rules = urllib.robotparser.RobotFileParser(origin + "/robots.txt")
+        try:
+            response = self.client.get(origin + "/robots.txt")
+            rules.parse(response.body.decode('utf-8', 'replace').splitlines())
+        except urllib.error.HTTPError as e:
+            if e.code in (401, 403):
+                rules.disallow_all = True
+            else:
+                rules.allow_all = True
+        except (OSError, http.client.HTTPException, ValueError):
+            rules.allow_all = True
+        with self.lock:
+            self.rules[origin] = rules
+        return rules
+
+    def get_rules(self, url):
+        """
+        Gets the parsed robots.txt of the url's origin, loading it if needed
+        :param url: Input url
+        :return: RobotFileParser object
+        """
+        with self.lock:
+            rules = self.rules.get(get_origin(url))
+        return rules or self.load(url)
+
+    def can_fetch(self, url):
+        """
+        Checks whether robots.txt lets us fetch url
+        :param url: Input url
+        :return: True or False
+        """
+        return self.get_rules(url).can_fetch(self.user_agent, url)
+
+    def get_crawl_delay(self, url):
+        """
+        Gets the seconds robots.txt asks us to wait between requests.
+        urllib.robotparser only reads whole seconds, a fractional
+        crawl-delay is ignored
+        :param url: Input url
+        :return: Float, or None if robots.txt sets no crawl-delay or
+        request-rate
+        """
+        rules = self.get_rules(url)
+        delay = rules.crawl_delay(self.user_agent)
+        if delay is not None:
+            return float(delay)
+        rate = rules.request_rate(self.user_agent)
+        if rate and rate.requests:
+            return rate.seconds / float(rate.requests)
+        return None
+
+
+class HostQueue(object):
+    def __init__(self, bucket, limit):
+        """
+        Generates HostQueue object, the PoliteScheduler state of one host
+        :param bucket: TokenBucket pacing the host
+        :param limit: Max simultaneous requests against the host
+        :return: None
+        """
+        self.bucket = bucket
+        self.limit = limit
+        # (url, attempt) tuples ready to be downloaded
+        self.pending = collections.deque()
+        self.active = 0
+
+
+class PoliteScheduler(object):
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, rates=None,
+                 per_host=DEFAULT_PER_HOST, limits=None, robots=None,
+                 backoff=None, max_queued=DEFAULT_MAX_QUEUED):
+        """
+        Generates PoliteScheduler object, a drop-in for
+        fetcher.run_concurrently() that paces every host with a token
+        bucket, obeys robots.txt and retries throttled or failed downloads.
+        Urls are queued per host and worker threads only ever download, so
+        a slow or throttled host waits on its own without stalling the others
+        :param rate: Requests per second for hosts without a rate
+        :param burst: Requests allowed at once before rate applies
+        :param rates: Dictionary of form {'host': requests per second}
+        :param per_host: Max simultaneous requests for hosts without a limit
+        :param limits: Dictionary of form {'host': max_requests}
+        :param robots: Optional RobotsCache, None ignores robots.txt
+        :param backoff: Backoff object, defaults to Backoff()
+        :param max_queued: Max urls read from the input but not yet yielded
+        :return: None
+        """
+        self.rate = rate
+        self.burst = burst
+        self.rates = HOST_RATES if rates is None else rates
+        self.per_host = per_host
+        self.limits = HOST_LIMITS if limits is None else limits
+        self.robots = robots
+        self.backoff = backoff or Backoff()
+        self.max_queued = max_queued
+
+    def get_queue(self, hosts, host):
+        """
+        Gets (creating if needed) the queue of a host
+        :param hosts: Dictionary of form {'host': HostQueue}
+        :param host: Host name, see fetcher.get_host()
+        :return: HostQueue object
+        """
+        if host not in hosts:
+            hosts[host] = HostQueue(
+                TokenBucket(self.rates.get(host, self.rate), self.burst),
+                self.limits.get(host, self.per_host))
+        return hosts[host]
+
+    def run(self, func, urls, max_workers=8):
+        """
+        Calls func(url) for every url on a thread pool, see __init__()
+        :param func: Callable taking a url, typically downloading it
+        :param urls: Iterable of urls, may be a generator
+        :param max_workers: Max number of urls being worked on at once
+        :return: Generator of (url, result, error) tuples in completion
+        order, where error is the exception of the last try, or
+        RobotsDisallowed
+        """
+        urls = iter(urls)
+        hosts = {}
+        order = collections.deque()  # hosts with pending urls, round-robin
+        retries = []  # heap of (monotonic time, sequence, url, attempt)
+        sequence = 0
+        loading = set()  # origins whose robots.txt is being downloaded
+        running = {}  # {future: (url, attempt) or (origin, None)}
+        queued = 0
+        exhausted = False
+
+        def enqueue(url, attempt, first=False):
+            host = get_host(url)
+            queue = self.get_queue(hosts, host)
+            if not queue.pending and host not in order:
+                order.append(host)
+            if first:
+                queue.pending.appendleft((url, attempt))
+            else:
+                queue.pending.append((url, attempt))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                while not exhausted and queued < self.max_queued:
+                    try:
+                        url = next(urls)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    queued += 1
+                    enqueue(url, 0)
+
+                now = time.monotonic()
+                while retries and retries[0][0] <= now:
+                    url, attempt = heapq.heappop(retries)[2:]
+                    enqueue(url, attempt, first=True)
+
+                # one url per ready host per pass, until workers are busy
+                finished = []
+                wake = retries[0][0] - now if retries else None
+                dispatched = True
+                while dispatched and len(running) < max_workers:
+                    dispatched = False
+                    for _ in range(len(order)):
+                        if len(running) >= max_workers:
+                            break
+                        host = order.popleft()
+                        queue = hosts[host]
+                        url, attempt = queue.pending[0]
+                        origin = get_origin(url)
+                        if self.robots and (origin in loading or
+                                            not self.robots.is_loaded(url)):
+                            if origin not in loading:
+                                loading.add(origin)
+                                running[executor.submit(
+                                    self.robots.load, url)] = (origin, None)
+                            order.append(host)
+                            continue
+                        if self.robots and not self.robots.can_fetch(url):
+                            queue.pending.popleft()
+                            finished.append((url, None,
+                                             RobotsDisallowed(url)))
+                            dispatched = True
+                        elif queue.active < queue.limit:
+                            delay = queue.bucket.get_wait(now)
+                            if delay:
+                                wake = delay if wake is None else \
+                                    min(wake, delay)
+                            else:
+                                queue.pending.popleft()
+                                queue.bucket.take(now)
+                                queue.active += 1
+                                running[executor.submit(func, url)] = \
+                                    (url, attempt)
+                                dispatched = True
+                        if queue.pending:
+                            order.append(host)
+
+                for result in finished:
+                    queued -= 1
+                    yield result
+                if finished:
+                    continue
+                if not running and not order and not retries and exhausted:
+                    return
+
+                if running:
+                    done = wait(running, timeout=wake,
+                                return_when=FIRST_COMPLETED)[0]
+                else:
+                    time.sleep(wake or 0)
+                    done = ()
+
+                for future in done:
+                    url, attempt = running.pop(future)
+                    if attempt is None:  # robots.txt of origin url loaded
+                        loading.discard(url)
+                        delay = self.robots.get_crawl_delay(url)
+                        if delay:
+                            self.get_queue(hosts, get_host(url)) \
+                                .bucket.slow_down(1.0 / delay)
+                        continue
+
+                    queue = hosts[get_host(url)]
+                    queue.active -= 1
+                    error = future.exception()
+                    if error is None:
+                        queued -= 1
+                        yield url, future.result(), None
+                        continue
+
+                    delay = self.backoff.get_delay(attempt, error)
+                    if delay is None:
+                        queued -= 1
+                        yield url, None, error
+                        continue
+                    retry_at = time.monotonic() + delay
+                    if isinstance(error, urllib.error.HTTPError) and \
+                            error.code in THROTTLE_STATUSES:
+                        queue.bucket.hold(retry_at)
+                    sequence += 1
+                    heapq.heappush(retries,
+                                   (retry_at, sequence, url, attempt + 1))
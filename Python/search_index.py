@@ -0,0 +1,278 @@
+# coding: utf-8
+
+# Inverted index from ingredient names and instruction words to recipes...
+
+import argparse
+import re
+import sqlite3
+from Python.cache import normalize_url
+
+INGREDIENT = "ingredient"
+TEXT = "text"
+
+WORD = re.compile(r"[^\W\d_]+")
+
+VOWELS = frozenset("aeiouy")
+
+# quantities, units and preparation words that never name an ingredient
+INGREDIENT_STOP_WORDS = frozenset("""
+a an and or of to for the in into with without about plus more as at
+cup cups c tablespoon tablespoons tbsp tbs tbl teaspoon teaspoons tsp
+ounce ounces oz pound pounds lb lbs gram grams g kg kilogram ml l liter litre
+quart quarts qt pint pints pt gallon can cans jar package packages pkg
+stick sticks clove cloves pinch dash handful bunch slice slices piece pieces
+large medium small whole half quarter inch inches sprig sprigs
+chopped minced diced sliced grated shredded crushed ground peeled seeded
+cored cubed halved quartered trimmed rinsed drained softened melted
+beaten divided optional fresh freshly finely coarsely roughly thinly
+thickly lightly packed room temperature taste needed cut
+""".split())
+
+# words too common in instructions to be worth a posting list
+TEXT_STOP_WORDS = frozenset("""
+a an and or of to for the in into on onto with without by at from as is
+it its be are was until then than this that these those over about up
+out off if each all your you will can minutes minute hour hours
+""".split())
+
+
+def stem(word):
+    """
+    Folds plurals onto their singular so "scallions" finds "scallion".
+    Both "cookies" and "berries" end in "ies", so singulars ending in a
+    consonant + "y" are folded onto "ie" too: "berry", "berries" -> "berrie"
+    :param word: Lower case word
+    :return: String containing the stemmed word
+    """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-1]
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes", "sses",
+                                        "xes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(
+            ("ss", "us", "is")):
+        return word[:-1]
+    if len(word) > 3 and word.endswith("y") and word[-2] not in VOWELS:
+        return word[:-1] + "ie"
+    return word
+
+
+def get_terms(line, stop_words):
+    """
+    Splits a line into normalized index terms
+    :param line: Ingredient line, instruction step or query string
+    :param stop_words: Words left out of the index
+    :return: List of terms, in line order
+    """
+    return [stem(word) for word in WORD.findall(line.lower())
+            if word not in stop_words]
+
+
+def get_ingredient_terms(line):
+    """
+    Gets the ingredient names of an ingredient line, e.g.
+    "2 cups thinly sliced Scallions" -> ["scallion"]
+    :param line: Ingredient line
+    :return: List of terms
+    """
+    return get_terms(line, INGREDIENT_STOP_WORDS)
+
+
+def get_text_terms(line):
+    """
+    Gets the full-text terms of a title or instruction step
+    :param line: Title or instruction step
+    :return: List of terms
+    """
+    return get_terms(line, TEXT_STOP_WORDS)
+
+
+class RecipeIndex(object):
+    def __init__(self, path, commit_every=100):
+        """
+        Generates RecipeIndex object backed by a SQLite file, posting lists
+        are keyed by (field, term) so exact and prefix lookups are a single
+        B-tree range scan
+        :param path: Path to the index file, created if missing
+        :param commit_every: Number of added recipes between commits
+        :return: None
+        """
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS recipes (id INTEGER PRIMARY KEY, "
+            "url TEXT UNIQUE, title TEXT, file TEXT);"
+            "CREATE TABLE IF NOT EXISTS postings (field TEXT, term TEXT, "
+            "recipe INTEGER, PRIMARY KEY (field, term, recipe)) "
+            "WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_recipe ON "
+            "postings (recipe);")
+        self.commit_every = commit_every
+        self.pending = 0
+
+    def add(self, recipe, file=None):
+        """
+        Adds or re-indexes a recipe
+        :param recipe: Recipe object, see RecipeParse.get_recipe()
+        :param file: Optional path of its markdown file
+        :return: Id of the recipe in the index
+        """
+        url = normalize_url(recipe.url)
+        row = self.connection.execute(
+            "SELECT id FROM recipes WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            recipe_id = self.connection.execute(
+                "INSERT INTO recipes (url, title, file) VALUES (?, ?, ?)",
+                (url, recipe.title, file)).lastrowid
+        else:
+            recipe_id = row[0]
+            self.connection.execute(
+                "UPDATE recipes SET title = ?, file = ? WHERE id = ?",
+                (recipe.title, file, recipe_id))
+            self.connection.execute(
+                "DELETE FROM postings WHERE recipe = ?", (recipe_id,))
+
+        postings = set()
+        for line in recipe.iter_ingredients():
+            postings.update((INGREDIENT, term, recipe_id) for term in
+                            get_ingredient_terms(line))
+        for line in [recipe.title] + list(recipe.iter_instructions()):
+            postings.update((TEXT, term, recipe_id) for term in
+                            get_text_terms(line or ''))
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO postings VALUES (?, ?, ?)", postings)
+
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+        return recipe_id
+
+    def get_recipe_ids(self, field, term):
+        """
+        Gets the posting list of a term, a trailing "*" makes it a prefix
+        :param field: INGREDIENT or TEXT
+        :param term: Normalized term, e.g. "scallion" or "scal*"
+        :return: Set of recipe ids
+        """
+        if term.endswith("*"):
+            prefix = term[:-1]
+            rows = self.connection.execute(
+                "SELECT recipe FROM postings WHERE field = ? AND term >= ? "
+                "AND term < ?", (field, prefix, prefix + "\uffff"))
+        else:
+            rows = self.connection.execute(
+                "SELECT recipe FROM postings WHERE field = ? AND term = ?",
+                (field, term))
+        return set(row[0] for row in rows)
+
+    def normalize_query(self, words, field):
+        """
+        Normalizes query words the same way indexed lines are, keeping a
+        trailing "*" as a prefix marker
+        :param words: Iterable of query words, e.g. ["Scallions", "gin*"]
+        :param field: INGREDIENT or TEXT
+        :return: List of terms
+        """
+        stop_words = INGREDIENT_STOP_WORDS if field == INGREDIENT else \
+            TEXT_STOP_WORDS
+        terms = []
+        for word in words:
+            if word.endswith("*"):
+                # stemmed like a whole word so "scallions*" finds "scallion",
+                # stop words are kept since they may start a longer word
+                terms.extend(stem(term) + "*" for term in
+                             WORD.findall(word[:-1].lower()))
+            else:
+                terms.extend(get_terms(word, stop_words))
+        return terms
+
+    def search(self, ingredients=(), text=(), match_all=True, limit=None):
+        """
+        Finds recipes by ingredient and/or full-text terms
+        :param ingredients: Iterable of ingredient words, "word*" for prefixes
+        :param text: Iterable of title/instruction words, "word*" for prefixes
+        :param match_all: True for recipes having every term (AND), False
+        for recipes having any term (OR)
+        :param limit: Optional max number of results
+        :return: List of dictionaries of form {'url', 'title', 'file'},
+        sorted by title
+        """
+        queries = [(INGREDIENT, term) for term in
+                   self.normalize_query(ingredients, INGREDIENT)]
+        queries += [(TEXT, term) for term in
+                    self.normalize_query(text, TEXT)]
+        if not queries:
+            return []
+
+        matches = None
+        if match_all:
+            # smallest posting lists first so the intersection shrinks fast
+            for ids in sorted((self.get_recipe_ids(*query) for query in
+                               queries), key=len):
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return []
+        else:
+            matches = set()
+            for query in queries:
+                matches |= self.get_recipe_ids(*query)
+
+        results = []
+        matches = list(matches)
+        for start in range(0, len(matches), 500):
+            chunk = matches[start:start + 500]
+            results.extend(self.connection.execute(
+                "SELECT url, title, file FROM recipes WHERE id IN (" +
+                ",".join("?" * len(chunk)) + ")", chunk))
+        results.sort(key=lambda row: (row[1] or '', row[0]))
+        return [dict(zip(("url", "title", "file"), row)) for row in
+                results[:limit]]
+
+    def get_terms(self, prefix, field=INGREDIENT, limit=20):
+        """
+        Lists indexed terms starting with prefix, most used first, e.g. for
+        completing a query
+        :param prefix: Start of a term, stemmed like query words
+        :param field: INGREDIENT or TEXT
+        :param limit: Max number of terms
+        :return: List of tuples of form (term, recipe count)
+        """
+        prefix = stem(prefix.lower())
+        return self.connection.execute(
+            "SELECT term, COUNT(*) AS n FROM postings WHERE field = ? AND "
+            "term >= ? AND term < ? GROUP BY term ORDER BY n DESC, term "
+            "LIMIT ?", (field, prefix, prefix + "\uffff", limit)).fetchall()
+
+    def commit(self):
+        """
+        Writes pending recipes to disk
+        :return: None
+        """
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        """
+        Commits and closes the index
+        :return: None
+        """
+        self.commit()
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description="search recipes by ingredient")
+    arg_parser.add_argument("index", help="index built by main --index")
+    arg_parser.add_argument("ingredients", nargs="*",
+                            help='ingredient words, "word*" for prefixes')
+    arg_parser.add_argument("--text", nargs="*", default=(),
+                            help="title/instruction words")
+    arg_parser.add_argument("--any", action="store_true",
+                            help="match any word instead of all of them")
+    args = arg_parser.parse_args()
+
+    index = RecipeIndex(args.index)
+    for result in index.search(args.ingredients, args.text,
+                               match_all=not args.any):
+        print(result["title"], "\t", result["file"] or result["url"])
+    index.close()
@@ -0,0 +1,186 @@
+# coding: utf-8
+
+# schema.org JSON-LD Recipe extraction straight from the raw page bytes...
+
+import html
+import json
+import re
+
+# opening tag of a JSON-LD block, attributes in any order and quoting
+JSON_LD_TAG = re.compile(
+    br"<script\b[^>]*\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>",
+    re.IGNORECASE)
+SCRIPT_END = re.compile(br"</script\s*>", re.IGNORECASE)
+
+# JSON-LD blocks larger than this are skipped rather than decoded
+MAX_JSON_LD_BYTES = 2 * 1024 * 1024
+
+
+def iter_json_ld(data, encoding=None):
+    """
+    Finds every JSON-LD block of a page with a byte scan, no tree is built
+    :param data: Raw html bytes
+    :param encoding: Page encoding, defaults to utf-8
+    :return: Generator of decoded JSON values, blocks that don't decode are
+    skipped
+    """
+    for match in JSON_LD_TAG.finditer(data):
+        end = SCRIPT_END.search(data, match.end())
+        if end is None:
+            return
+        blob = data[match.end():end.start()].strip()
+        if not blob or len(blob) > MAX_JSON_LD_BYTES:
+            continue
+        try:
+            yield json.loads(blob.decode(encoding or 'utf-8', 'replace'))
+        except ValueError:
+            continue
+
+
+def is_recipe(node):
+    """
+    Checks whether a JSON-LD node is a schema.org Recipe
+    :param node: Decoded JSON value
+    :return: True or False
+    """
+    if not isinstance(node, dict):
+        return False
+    types = node.get("@type")
+    if not isinstance(types, list):
+        types = [types]
+    return any(isinstance(t, str) and t.rsplit("/", 1)[-1] == "Recipe"
+               for t in types)
+
+
+def find_recipe_node(value):
+    """
+    Looks for a Recipe node in a JSON-LD value, including inside lists and
+    "@graph" arrays
+    :param value: Decoded JSON value
+    :return: Dictionary of the Recipe node, or None
+    """
+    if is_recipe(value):
+        return value
+    if isinstance(value, dict):
+        value = value.get("@graph") or value.get("mainEntity")
+    if isinstance(value, (list, dict)):
+        for node in value if isinstance(value, list) else [value]:
+            found = find_recipe_node(node)
+            if found:
+                return found
+    return None
+
+
+def get_text(value):
+    """
+    Cleans a JSON-LD string: unescapes html entities, drops stray tags and
+    collapses whitespace
+    :param value: String or None
+    :return: String
+    """
+    if not isinstance(value, str):
+        return ''
+    value = html.unescape(re.sub(r"<[^>]+>", " ", value))
+    return " ".join(value.split())
+
+
+def get_image(value):
+    """
+    Gets the first image url of a JSON-LD image value
+    :param value: String, ImageObject dictionary or list of either
+    :return: String containing the url, '' if none
+    """
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("url") or value.get("contentUrl")
+    return value.strip() if isinstance(value, str) else ''
+
+
+def get_yield(value):
+    """
+    Gets a printable serving size from a JSON-LD recipeYield value
+    :param value: String, number or list of either
+    :return: String, '' if none
+    """
+    if isinstance(value, list):
+        # e.g. ["4", "4 servings"], keep the most descriptive one
+        strings = [item for item in value if isinstance(item, str)]
+        value = max(strings, key=len) if strings else (
+            value[0] if value else None)
+    if isinstance(value, (int, float)):
+        return str(value)
+    return get_text(value)
+
+
+def get_steps(value):
+    """
+    Flattens JSON-LD instructions into steps
+    :param value: String, HowToStep dictionary or list of strings/steps
+    :return: List of strings
+    """
+    if isinstance(value, str):
+        return [step for step in (get_text(line) for line in
+                                  value.splitlines()) if step]
+    if isinstance(value, dict):
+        if "itemListElement" in value:
+            return get_steps(value["itemListElement"])
+        # a HowToStep is one step even if its text wraps over several lines
+        step = get_text(value.get("text") or value.get("name"))
+        return [step] if step else []
+    if isinstance(value, list):
+        return [step for item in value for step in get_steps(item)]
+    return []
+
+
+def get_instruction_sections(value):
+    """
+    Groups JSON-LD instructions by HowToSection
+    :param value: recipeInstructions value
+    :return: List of form [('sub-title', ['step0', ... , 'stepX'])], the
+    sub-title of steps outside any section is ''
+    """
+    sections = []
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict) and "itemListElement" in item:
+            title, steps = get_text(item.get("name")), get_steps(item)
+        else:
+            title, steps = '', get_steps(item)
+        if not steps:
+            continue
+        if sections and sections[-1][0] == title:
+            sections[-1][1].extend(steps)
+        else:
+            sections.append((title, steps))
+    return sections
+
+
+def get_structured_recipe(data, encoding=None):
+    """
+    Extracts recipe fields from the schema.org JSON-LD of a page
+    :param data: Raw html bytes
+    :param encoding: Page encoding, defaults to utf-8
+    :return: Dictionary holding only the fields found, of form
+    {'title': str, 'img_url': str, 'recipe_yield': str,
+    'ingredients': [lines], 'instructions': [(sub-title, [steps])]}
+    """
+    node = None
+    for value in iter_json_ld(data, encoding):
+        node = find_recipe_node(value)
+        if node:
+            break
+    if not node:
+        return {}
+
+    fields = {
+        "title": get_text(node.get("name")),
+        "img_url": get_image(node.get("image")),
+        "recipe_yield": get_yield(node.get("recipeYield")),
+        "ingredients": [line for line in (
+            get_text(item) for item in
+            node.get("recipeIngredient") or node.get("ingredients") or [])
+            if line],
+        "instructions": get_instruction_sections(
+            node.get("recipeInstructions")),
+    }
+    return dict((name, value) for name, value in fields.items() if value)
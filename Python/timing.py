@@ -0,0 +1,235 @@
+# coding: utf-8
+
+# Per-stage timing instrumentation and the JSON run report for main()...
+
+import json
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+PERCENTILES = (50, 95, 99)
+
+# timing samples kept per stage for percentiles, beyond that a uniform
+# random sample of them is kept
+DEFAULT_MAX_SAMPLES = 10000
+
+
+@contextmanager
+def timed(timings, stage):
+    """
+    Adds the seconds spent in the with block to timings[stage]
+    :param timings: Dictionary of form {'stage': seconds} or None to skip
+    :param stage: Stage name, e.g. "tree_build"
+    :return: Context manager
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + \
+            time.perf_counter() - start
+
+
+def get_percentile(values, percent):
+    """
+    Nearest-rank percentile
+    :param values: Sorted list of numbers
+    :param percent: Percentile between 0 and 100
+    :return: Number from values, or None if values is empty
+    """
+    if not values:
+        return None
+    rank = max(int(math.ceil(percent / 100.0 * len(values))), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def get_summary(samples):
+    """
+    Summarizes timing samples
+    :param samples: List of seconds
+    :return: Dictionary of form {'count', 'total', 'p50', 'p95', 'p99'}
+    """
+    samples = sorted(samples)
+    summary = {"count": len(samples), "total": sum(samples)}
+    for percent in PERCENTILES:
+        summary["p" + str(percent)] = get_percentile(samples, percent)
+    return summary
+
+
+class StageTotals(object):
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES):
+        """
+        Generates StageTotals object keeping the count and total of a
+        stage's timings, along with a reservoir sample of at most
+        max_samples of them for percentiles
+        :param max_samples: Max samples kept
+        :return: None
+        """
+        self.max_samples = max_samples
+        self.count = 0
+        self.total = 0.0
+        self.samples = []
+
+    def add(self, seconds):
+        """
+        Adds one timing
+        :param seconds: Seconds spent in the stage
+        :return: None
+        """
+        self.count += 1
+        self.total += seconds
+        if len(self.samples) < self.max_samples:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.max_samples:
+                self.samples[slot] = seconds
+
+    def get_summary(self):
+        """
+        Summarizes the timings, percentiles are estimated from the samples
+        once more than max_samples were added
+        :return: Dictionary of form {'count', 'total', 'p50', 'p95', 'p99'}
+        """
+        summary = get_summary(self.samples)
+        summary["count"] = self.count
+        summary["total"] = self.total
+        return summary
+
+
+class RunReport(object):
+    def __init__(self, per_url=False, max_samples=DEFAULT_MAX_SAMPLES):
+        """
+        Generates RunReport object collecting stage timings and bytes
+        transferred, safe to share between fetch threads. Urls are folded
+        into running totals per stage and per site once finished, so memory
+        doesn't grow with the number of urls unless per_url is set
+        :param per_url: True to also keep every url's record in the report
+        :param max_samples: Max timing samples kept per stage and per site
+        stage for percentiles, see StageTotals
+        :return: None
+        """
+        self.start = time.time()
+        self.per_url = per_url
+        self.max_samples = max_samples
+        # {'url': record} of urls not finished yet
+        self.pending = {}
+        # {'url': record} of finished urls, only filled if per_url
+        self.urls = {}
+        self.url_count = 0
+        self.bytes = 0
+        # {'stage': StageTotals}
+        self.stages = {}
+        # {'site': {'urls': int, 'bytes': int, 'stages': {'stage':
+        # StageTotals}}}
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def get_record(self, url):
+        """
+        Gets (creating if needed) the pending record of url, caller holds
+        self.lock
+        :param url: Input url
+        :return: Dictionary of form {'site', 'bytes', 'stages'}
+        """
+        if url not in self.pending:
+            self.pending[url] = {"site": None, "bytes": 0, "stages": {}}
+        return self.pending[url]
+
+    def add_timings(self, url, timings, site=None):
+        """
+        Adds stage timings for url
+        :param url: Input url
+        :param timings: Dictionary of form {'stage': seconds}
+        :param site: Optional site (RecipeParse sub class name)
+        :return: None
+        """
+        with self.lock:
+            record = self.get_record(url)
+            if site:
+                record["site"] = site
+            for stage, seconds in timings.items():
+                record["stages"][stage] = \
+                    record["stages"].get(stage, 0.0) + seconds
+
+    def add_bytes(self, url, count):
+        """
+        Adds bytes transferred for url
+        :param url: Input url
+        :param count: Number of bytes received
+        :return: None
+        """
+        with self.lock:
+            self.get_record(url)["bytes"] += count
+
+    def finish(self, url):
+        """
+        Folds the record of a url that won't get any more timings into the
+        running totals
+        :param url: Input url
+        :return: None
+        """
+        with self.lock:
+            self.fold(url)
+
+    def fold(self, url):
+        """
+        Moves a pending record into the totals, caller holds self.lock
+        :param url: Input url
+        :return: None
+        """
+        record = self.pending.pop(url, None)
+        if record is None:
+            return
+        site = self.sites.setdefault(record["site"] or "unknown",
+                                     {"urls": 0, "bytes": 0, "stages": {}})
+        self.url_count += 1
+        self.bytes += record["bytes"]
+        site["urls"] += 1
+        site["bytes"] += record["bytes"]
+        for stage, seconds in record["stages"].items():
+            for stages in (self.stages, site["stages"]):
+                if stage not in stages:
+                    stages[stage] = StageTotals(self.max_samples)
+                stages[stage].add(seconds)
+        if self.per_url:
+            self.urls[url] = record
+
+    def get_report(self):
+        """
+        Builds the run report with p50/p95/p99 per stage and per site, urls
+        not finished yet are folded in first
+        :return: Dictionary ready for json.dump
+        """
+        with self.lock:
+            for url in list(self.pending):
+                self.fold(url)
+            report = {
+                "elapsed": time.time() - self.start,
+                "urls": self.url_count,
+                "bytes": self.bytes,
+                "stages": dict((stage, totals.get_summary()) for
+                               stage, totals in self.stages.items()),
+                "sites": dict((name, {
+                    "urls": site["urls"], "bytes": site["bytes"],
+                    "stages": dict((stage, totals.get_summary()) for
+                                   stage, totals in site["stages"].items())})
+                    for name, site in self.sites.items()),
+            }
+            if self.per_url:
+                report["per_url"] = dict(self.urls)
+        return report
+
+    def write(self, path):
+        """
+        Writes the run report as JSON
+        :param path: Output file path
+        :return: None
+        """
+        with open(path, 'w') as f:
+            json.dump(self.get_report(), f, indent=2, sort_keys=True)
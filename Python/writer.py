@@ -0,0 +1,175 @@
+# coding: utf-8
+
+# Background markdown writer: atomic renames, batched metadata and fsync...
+
+import os
+import queue
+import threading
+import time
+from Python.help_me import fsync_path
+
+# fsync policies
+FSYNC_NONE = "none"    # leave flushing to the OS
+FSYNC_FILE = "file"    # fsync every file before it is renamed into place
+FSYNC_BATCH = "batch"  # fsync a whole batch of files, then the directory once
+
+
+def remove_temp(temp_path):
+    """
+    Removes a temp file left by a failed write, if there is one
+    :param temp_path: Path of the temp file or None
+    :return: None
+    """
+    if not temp_path:
+        return
+    try:
+        os.remove(temp_path)
+    except OSError:
+        pass
+
+
+class MarkdownWriter(object):
+    def __init__(self, directory, fsync=FSYNC_NONE, batch_size=50,
+                 max_pending=64):
+        """
+        Generates MarkdownWriter object, writing recipes on a dedicated thread
+        so rendering and parsing never block on disk
+        :param directory: Output directory, ending in "/"
+        :param fsync: FSYNC_NONE, FSYNC_FILE or FSYNC_BATCH
+        :param batch_size: Number of files renamed into place together
+        :param max_pending: Max recipes waiting to be written, submit()
+        blocks beyond that
+        :return: None
+        """
+        if fsync not in (FSYNC_NONE, FSYNC_FILE, FSYNC_BATCH):
+            raise ValueError("Unknown fsync policy: " + str(fsync))
+        self.directory = directory
+        self.fsync = fsync
+        self.batch_size = batch_size
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # one listing instead of an isfile() call per recipe
+        self.existing = set(os.listdir(directory))
+        self.todo = queue.Queue(maxsize=max_pending)
+        self.done = queue.Queue()
+        self.batch = []
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, url, recipe, overwrite=False):
+        """
+        Queues recipe for writing
+        :param url: Url the recipe was parsed from
+        :param recipe: RecipeParse object with its contents set
+        :param overwrite: Replace an existing file of the same title
+        :return: None
+        """
+        self.todo.put((url, recipe, overwrite))
+
+    def iter_done(self):
+        """
+        Collects recipes written (or failed) since the last call, without
+        blocking
+        :return: Generator of (url, RecipeParse, error or None) tuples, error
+        is FileExistsError, IOError or whatever rendering raised
+        """
+        while True:
+            try:
+                yield self.done.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self):
+        """
+        Writes everything still queued and stops the writer thread
+        :return: None
+        """
+        self.todo.put(None)
+        self.thread.join()
+
+    def run(self):
+        """
+        Writer thread loop, every failure is reported through iter_done() so
+        the thread keeps consuming and submit() never blocks for good
+        :return: None
+        """
+        while True:
+            item = self.todo.get()
+            if item is None:
+                self.commit_batch()
+                return
+            try:
+                self.write(*item)
+            except Exception as e:
+                self.done.put((item[0], item[1], e))
+            if len(self.batch) >= self.batch_size or self.todo.empty():
+                self.commit_batch()
+
+    def write(self, url, recipe, overwrite):
+        """
+        Writes one recipe to a temp file, renaming it into place right away
+        unless the fsync policy is FSYNC_BATCH
+        :param url: Url the recipe was parsed from
+        :param recipe: RecipeParse object
+        :param overwrite: Replace an existing file of the same title
+        :return: None
+        """
+        name = recipe.get_markdown_name()
+        path = self.directory + name
+        exists = name in self.existing
+        temp_path = None
+        try:
+            if exists and not overwrite:
+                raise FileExistsError(path)
+            # reserve the name so a duplicate title in this batch is caught
+            self.existing.add(name)
+            temp_path = recipe.write_markdown_temp(self.directory)
+            if self.fsync == FSYNC_BATCH:
+                self.batch.append((url, recipe, temp_path, path))
+                return
+            start = time.perf_counter()
+            if self.fsync == FSYNC_FILE:
+                fsync_path(temp_path)
+            os.replace(temp_path, path)
+            recipe.timings["write"] += time.perf_counter() - start
+        except Exception as e:
+            if not exists:
+                self.existing.discard(name)
+            remove_temp(temp_path)
+            self.done.put((url, recipe, e))
+            return
+        recipe.markdown_file = path
+        self.done.put((url, recipe, None))
+
+    def commit_batch(self):
+        """
+        Flushes and renames every file of the current batch, then flushes the
+        directory once
+        :return: None
+        """
+        if not self.batch:
+            return
+        batch, self.batch = self.batch, []
+        start = time.perf_counter()
+        renamed = []
+        for url, recipe, temp_path, path in batch:
+            try:
+                fsync_path(temp_path)
+                os.replace(temp_path, path)
+            except Exception as e:
+                remove_temp(temp_path)
+                self.existing.discard(os.path.basename(path))
+                self.done.put((url, recipe, e))
+                continue
+            recipe.markdown_file = path
+            renamed.append((url, recipe))
+        error = None
+        if renamed and os.name == "posix":  # persist the renames themselves
+            try:
+                fsync_path(self.directory)
+            except Exception as e:  # files are in place, but maybe not durable
+                error = e
+        seconds = (time.perf_counter() - start) / len(batch)
+        for url, recipe in renamed:
+            recipe.timings["write"] += seconds
+            self.done.put((url, recipe, error))
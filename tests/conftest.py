@@ -0,0 +1,59 @@
+# coding: utf-8
+
+# Shared pytest fixtures, run the suite with python -m pytest from the repo root...
+
+import http.server
+import threading
+import pytest
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    # set on a sub class by serve(), called as respond(handler)
+    respond = None
+
+    def do_GET(self):
+        type(self).respond(self)
+
+    def send(self, body, status=200, headers=None):
+        """
+        Writes a whole response
+        :param body: Bytes
+        :param status: HTTP status code
+        :param headers: Dictionary of extra headers
+        :return: None
+        """
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """
+    Starts local HTTP servers, each answering every GET with respond(handler)
+    :return: Function of form serve(respond) -> 'http://127.0.0.1:port'
+    """
+    servers = []
+
+    def start(respond):
+        handler = type("Handler", (Handler,), {"respond": staticmethod(respond)})
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever,
+                                  kwargs={"poll_interval": 0.05})
+        thread.daemon = True
+        thread.start()
+        servers.append(server)
+        return "http://127.0.0.1:{}".format(server.server_address[1])
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
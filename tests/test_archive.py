@@ -0,0 +1,150 @@
+# coding: utf-8
+
+# Tests of the packed recipe archive in Python/archive.py...
+
+import os
+from Python.archive import RecipeArchive, RecipeArchiveReader, \
+    scan_archive, RECORD, UNFINISHED
+from Python.bench_parsers import load_fixtures
+from Python.RecipeParser import get_parser
+from Python.writer import MarkdownWriter
+
+# [(file, url, bytes, charset)] of every recorded page
+PAGES = [page for pages in load_fixtures().values() for page in pages]
+
+
+def get_recipes():
+    """
+    Parses every recorded page, numbering the titles since the pages record
+    the same recipe
+    :return: List of (url, RecipeParse) tuples
+    """
+    recipes = []
+    for i, (_, url, data, charset) in enumerate(PAGES):
+        recipe = get_parser(url).from_html(url, data, charset)
+        recipe.set_recipe_contents()
+        recipe.release_soup()
+        recipe.title = "{} {} Crème Brûlée".format(recipe.title, i)
+        recipes.append((url, recipe))
+    return recipes
+
+
+def write_archive(path, recipes):
+    archive = RecipeArchive(path)
+    for url, recipe in recipes:
+        archive.append(url, recipe)
+    archive.close()
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "recipes.pack")
+    recipes = get_recipes()
+    write_archive(path, recipes)
+
+    reader = RecipeArchiveReader(path)
+    try:
+        for url, recipe in recipes:
+            title = recipe.get_markdown_name()[:-3]
+            assert recipe.markdown_file == path + "#" + title
+            assert reader.get_markdown(title=title) == str(recipe)
+            assert reader.get_markdown(url=url + "#comments") == \
+                str(recipe)
+            assert reader.get_fields(url=url).to_dict() == \
+                recipe.get_recipe().to_dict()
+        assert len(list(reader.iter_recipes())) == len(recipes)
+    finally:
+        reader.close()
+
+
+def test_rejects_existing_titles(tmp_path):
+    path = str(tmp_path / "recipes.pack")
+    (url, recipe), (other_url, other) = get_recipes()[:2]
+    archive = RecipeArchive(path, store_fields=False)
+    archive.append(url, recipe)
+    other.title = recipe.title
+    archive.submit(other_url, other)
+    archive.append(other_url, other, overwrite=True)
+    archive.close()
+
+    assert isinstance(list(archive.iter_done())[0][2], FileExistsError)
+    reader = RecipeArchiveReader(path)
+    try:
+        title = recipe.get_markdown_name()[:-3]
+        assert reader.get_markdown(title=title) == str(other)
+        assert reader.get_markdown(url=url) == str(recipe)
+        assert reader.get_fields(title=title) is None
+    finally:
+        reader.close()
+
+
+def test_recovers_from_unfinished_record(tmp_path):
+    path = str(tmp_path / "recipes.pack")
+    recipes = get_recipes()
+    write_archive(path, recipes[:2])
+    size = os.path.getsize(path)
+    # a run killed while rendering leaves a record with UNFINISHED length
+    # and an index that no longer matches the file size
+    with open(path, 'ab') as f:
+        f.write(RECORD.pack(2, UNFINISHED, 0) + b"{}" + b"# Half a recipe")
+
+    assert scan_archive(path)["size"] == size
+    reader = RecipeArchiveReader(path)
+    try:
+        assert len(reader.index["titles"]) == 2
+    finally:
+        reader.close()
+
+    write_archive(path, recipes[2:3])
+    reader = RecipeArchiveReader(path)
+    try:
+        assert len(reader.index["titles"]) == 3
+        url, recipe = recipes[2]
+        assert reader.get_markdown(url=url) == str(recipe)
+    finally:
+        reader.close()
+
+
+def test_rebuilds_index_of_truncated_archive(tmp_path):
+    path = str(tmp_path / "recipes.pack")
+    recipes = get_recipes()
+    write_archive(path, recipes[:3])
+    offsets = sorted(scan_archive(path)["titles"].values())
+    with open(path, 'r+b') as f:  # cut the last record in half
+        f.truncate(offsets[2] + RECORD.size + 4)
+
+    index = scan_archive(path)
+    assert index["size"] == offsets[2]
+    assert sorted(index["titles"].values()) == offsets[:2]
+    reader = RecipeArchiveReader(path)
+    try:
+        assert reader.index == index
+    finally:
+        reader.close()
+
+    archive = RecipeArchive(path)
+    assert os.path.getsize(path) == offsets[2]  # torn record dropped
+    archive.close()
+
+
+def test_export_matches_markdown_writer(tmp_path):
+    path = str(tmp_path / "recipes.pack")
+    recipes = get_recipes()
+    write_archive(path, recipes)
+    directory = str(tmp_path / "written") + "/"
+    markdown_writer = MarkdownWriter(directory)
+    for url, recipe in recipes:
+        markdown_writer.submit(url, recipe)
+    markdown_writer.close()
+
+    exported = str(tmp_path / "exported") + "/"
+    reader = RecipeArchiveReader(path)
+    try:
+        assert reader.export_markdown(exported) == len(recipes)
+    finally:
+        reader.close()
+
+    assert sorted(os.listdir(exported)) == sorted(os.listdir(directory))
+    for name in os.listdir(directory):
+        with open(directory + name, 'rb') as written, \
+                open(exported + name, 'rb') as archived:
+            assert archived.read() == written.read()
@@ -0,0 +1,248 @@
+# coding: utf-8
+
+# Tests of the asyncio client and pipeline in Python/async_pipeline.py...
+
+import asyncio
+import gzip
+import threading
+import time
+import urllib.error
+import pytest
+from Python import async_pipeline
+from Python.async_pipeline import AsyncHttpClient, fetch_page, \
+    parse_recipe, async_main
+from Python.bench_parsers import load_fixtures
+from Python.RecipeParser import get_parser
+from Python.scheduler import Backoff
+
+FILE, URL, DATA, CHARSET = load_fixtures(sites=["AllRecipesParse"])[
+    "AllRecipesParse"][0]
+
+
+def get(url, **kwargs):
+    """
+    Downloads url with a temporary AsyncHttpClient
+    :return: Response
+    """
+    async def run():
+        client = AsyncHttpClient(**kwargs)
+        try:
+            return await client.get(url)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+
+def keep_alive(handler):
+    """
+    Answers over HTTP/1.1 and keeps the connection open, the test server
+    speaks HTTP/1.0 otherwise
+    :return: None
+    """
+    handler.protocol_version = "HTTP/1.1"
+    handler.close_connection = False
+
+
+def test_chunked_body(serve):
+    def respond(handler):
+        handler.send_response(200)
+        handler.send_header('Transfer-Encoding', 'chunked')
+        handler.end_headers()
+        for chunk in (b"Chewy ", b"oatmeal ", b"cookies"):
+            handler.wfile.write(b"%x;ext=1\r\n%s\r\n" % (len(chunk), chunk))
+        handler.wfile.write(b"0\r\nX-Trailer: yes\r\n\r\n")
+
+    assert get(serve(respond) + "/").body == b"Chewy oatmeal cookies"
+
+
+def test_gzip_body(serve):
+    def respond(handler):
+        assert 'gzip' in handler.headers['Accept-Encoding']
+        handler.send(gzip.compress(DATA),
+                     headers={'Content-Encoding': 'gzip',
+                              'Content-Type': 'text/html; charset=utf-8'})
+
+    response = get(serve(respond) + "/")
+    assert response.body == DATA
+    assert response.timings["bytes"] < len(DATA)
+
+
+def test_follows_redirects(serve):
+    def respond(handler):
+        if handler.path == "/old#top":
+            raise AssertionError("fragment sent")
+        if handler.path == "/old":
+            handler.send(b'', status=301, headers={'Location': '/new?a=1'})
+        else:
+            handler.send(handler.path.encode('ascii'))
+
+    url = serve(respond)
+    assert get(url + "/old#top").body == b"/new?a=1"
+
+    with pytest.raises(urllib.error.HTTPError):
+        get(url + "/old", max_redirects=0)
+
+
+def test_raises_http_errors(serve):
+    url = serve(lambda handler: handler.send(b'gone', status=404))
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(url + "/")
+    assert error.value.code == 404
+
+
+def test_retries_429_after_retry_after(serve):
+    statuses = [429, 503, 200]
+
+    def respond(handler):
+        status = statuses.pop(0)
+        handler.send(b'page' if status == 200 else b'', status=status,
+                     headers={'Retry-After': '0',
+                              'Content-Type': 'text/html; charset=latin-1'})
+
+    async def run():
+        client = AsyncHttpClient(timeout=5)
+        try:
+            return await fetch_page(serve(respond) + "/", client,
+                                    Backoff(base=0.01))
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == (b'page', 'latin-1')
+    assert statuses == []
+
+
+def test_reuses_connections_and_discards_timed_out_ones(serve):
+    requests = []
+
+    def respond(handler):
+        keep_alive(handler)
+        requests.append(handler.path)
+        if handler.path == "/slow":
+            time.sleep(0.5)
+        handler.send(handler.path.encode('ascii'))
+
+    url = serve(respond)
+
+    async def run():
+        client = AsyncHttpClient(timeout=0.2)
+        try:
+            assert (await client.get(url + "/1")).body == b"/1"
+            assert (await client.get(url + "/2")).body == b"/2"
+            assert sum(len(idle) for idle in client.idle.values()) == 1
+            with pytest.raises(asyncio.TimeoutError):
+                await client.get(url + "/slow")
+            assert sum(len(idle) for idle in client.idle.values()) == 0
+        finally:
+            await client.close()
+
+    asyncio.run(run())
+    time.sleep(0.5)
+    assert requests == ["/1", "/2", "/slow"]  # one connection, no resend
+
+
+def test_retries_closed_idle_connection(serve):
+    def respond(handler):
+        keep_alive(handler)
+        handler.send(handler.path.encode('ascii'))
+        handler.close_connection = handler.path == "/1"
+
+    url = serve(respond)
+
+    async def run():
+        client = AsyncHttpClient(timeout=5)
+        try:
+            await client.get(url + "/1")
+            await asyncio.sleep(0.1)  # let the server close its side
+            return (await client.get(url + "/2")).body
+        finally:
+            await client.close()
+
+    assert asyncio.run(run()) == b"/2"
+
+
+@pytest.fixture
+def recipe_server(serve, monkeypatch):
+    """
+    Serves the recorded AllRecipes page at every path, "/slow..." paths
+    after a delay, and makes parse_recipe() treat the server as AllRecipes
+    :return: Tuple of form (base url, list of requested paths)
+    """
+    requests = []
+    lock = threading.Lock()
+
+    def respond(handler):
+        with lock:
+            requests.append(handler.path)
+        if handler.path.startswith("/slow"):
+            time.sleep(0.4)
+        handler.send(DATA, headers={'Content-Type': 'text/html; charset=' +
+                                    CHARSET})
+
+    monkeypatch.setattr(async_pipeline, "get_parser",
+                        lambda url: get_parser(URL))
+    return serve(respond), requests
+
+
+def test_parse_recipe(recipe_server):
+    url, _ = recipe_server
+    recipe = asyncio.run(parse_recipe(url + "/recipe", timeout=5))
+
+    assert recipe.title == "Chewy Oatmeal Raisin Cookies"
+    assert recipe.soup is False
+    expected = get_parser(URL).from_html(URL, DATA, CHARSET)
+    expected.set_recipe_contents()
+    assert str(recipe) == str(expected).replace(URL, url + "/recipe")
+
+
+def test_parse_recipe_timeout_cancels_download(recipe_server):
+    url, _ = recipe_server
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(parse_recipe(url + "/slow", timeout=0.1))
+    assert time.perf_counter() - start < 0.35
+
+
+def test_parse_recipe_rejects_unsupported_urls():
+    with pytest.raises(ValueError):
+        asyncio.run(parse_recipe("http://example.com/recipe"))
+
+
+def test_async_main_completion_order(recipe_server):
+    url, _ = recipe_server
+
+    async def run(urls, timeout):
+        return [(result_url, error) async for result_url, recipe, error in
+                async_main(urls, timeout=timeout)]
+
+    assert asyncio.run(run([url + "/slow", url + "/fast"], 5)) == [
+        (url + "/fast", None), (url + "/slow", None)]
+    (result_url, error), = asyncio.run(run([url + "/slow"], 0.1))
+    assert result_url == url + "/slow"
+    assert isinstance(error, asyncio.TimeoutError)
+
+
+def test_async_main_early_close_cancels_the_rest(recipe_server):
+    url, _ = recipe_server
+    urls = [url + "/fast"] + [url + "/slow" + str(i) for i in range(5)]
+    pulled = []
+
+    def iter_urls():
+        for page_url in urls:
+            pulled.append(page_url)
+            yield page_url
+
+    async def run():
+        client = AsyncHttpClient(timeout=5)
+        results = async_main(iter_urls(), client, max_concurrency=3,
+                             per_host=10)
+        try:
+            first = await results.__anext__()
+            await results.aclose()
+        finally:
+            await client.close()
+        return first
+
+    start = time.perf_counter()
+    assert asyncio.run(run())[:3:2] == (url + "/fast", None)
+    assert time.perf_counter() - start < 0.35  # slow ones weren't awaited
+    assert pulled == urls[:4]  # urls are read only as slots free up
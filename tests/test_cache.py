@@ -0,0 +1,111 @@
+# coding: utf-8
+
+# Tests of the on-disk response cache in Python/cache.py...
+
+import os
+from Python.cache import ResponseCache, normalize_url
+from Python.fetcher import fetch_page
+from Python.http_client import HttpClient
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Food52.com:80/recipes#comments") == \
+        "http://food52.com/recipes"
+    assert normalize_url("https://food52.com") == "https://food52.com/"
+
+
+def test_revalidates_with_304(serve, tmp_path):
+    requests = []
+
+    def respond(handler):
+        requests.append(dict(handler.headers))
+        if handler.headers.get('If-None-Match') == '"v1"':
+            handler.send(b'', status=304)
+        else:
+            handler.send(b'<p>page</p>', headers={
+                'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2018 00:00:00 GMT',
+                'Content-Type': 'text/html; charset=utf-8'})
+
+    url = serve(respond) + "/recipe"
+    cache = ResponseCache(str(tmp_path))
+    client = HttpClient(timeout=5)
+
+    assert fetch_page(url, cache=cache, client=client) == (b'<p>page</p>', 'utf-8')
+    assert 'If-None-Match' not in requests[0]
+    assert fetch_page(url, cache=cache, client=client) == (b'<p>page</p>', 'utf-8')
+    assert requests[1]['If-None-Match'] == '"v1"'
+    assert requests[1]['If-Modified-Since'] == 'Mon, 01 Jan 2018 00:00:00 GMT'
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
+
+
+def test_refetches_when_evicted_after_304(serve, tmp_path):
+    def respond(handler):
+        if handler.headers.get('If-None-Match'):
+            handler.send(b'', status=304)
+        else:
+            handler.send(b'fresh', headers={'ETag': '"v1"'})
+
+    url = serve(respond) + "/recipe"
+    cache = ResponseCache(str(tmp_path))
+    client = HttpClient(timeout=5)
+    fetch_page(url, cache=cache, client=client)
+    os.remove(cache.get_path(cache.get_key(url), ".body"))
+
+    assert cache.get(url) is None
+    assert fetch_page(url, cache=cache, client=client) == (b'fresh', None)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=25)
+    for i, url in enumerate(("http://a.com/1", "http://a.com/2")):
+        cache.put(url, b"x" * 10, etag=str(i))
+        os.utime(cache.get_path(cache.get_key(url), ".body"), (i, i))
+    assert cache.get("http://a.com/1") == b"x" * 10  # now the newest
+
+    cache.put("http://a.com/3", b"y" * 10)
+
+    assert cache.get("http://a.com/2") is None
+    assert cache.get_meta("http://a.com/2") == {}
+    assert cache.get("http://a.com/1") == b"x" * 10
+    assert cache.get("http://a.com/3") == b"y" * 10
+    assert cache.total == 20
+    assert ResponseCache(str(tmp_path), max_bytes=25).total == 20
+
+
+def test_skips_bodies_over_budget(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=4)
+    cache.put("http://a.com/", b"too big")
+    assert cache.get("http://a.com/") is None
+    assert cache.total == 0
+
+
+def test_keeps_lru_order_across_runs(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=100)
+    for i, url in enumerate(("http://a.com/1", "http://a.com/2",
+                             "http://a.com/3")):
+        cache.put(url, b"x" * 10)
+        os.utime(cache.get_path(cache.get_key(url), ".body"), (i, i))
+
+    cache = ResponseCache(str(tmp_path), max_bytes=20)
+    assert list(cache.sizes) == [cache.get_key("http://a.com/" + str(i))
+                                 for i in (1, 2, 3)]
+    cache.put("http://a.com/2", b"z" * 5)  # re-put makes it the newest
+
+    assert cache.get("http://a.com/1") is None
+    assert cache.get("http://a.com/3") == b"x" * 10
+    assert cache.get("http://a.com/2") == b"z" * 5
+    assert cache.total == 15
+
+
+def test_sweeps_stale_temp_files(tmp_path):
+    stale = tmp_path / "crashed.tmp"
+    stale.write_bytes(b"half written")
+    os.utime(str(stale), (0, 0))
+    fresh = tmp_path / "writing.tmp"
+    fresh.write_bytes(b"in progress")
+
+    cache = ResponseCache(str(tmp_path))
+
+    assert not stale.exists()
+    assert fresh.exists()  # may belong to another live process
+    assert cache.total == 0
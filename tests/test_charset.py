@@ -0,0 +1,47 @@
+# coding: utf-8
+
+# Tests of charset detection in Python/RecipeParser.py...
+
+import codecs
+import pytest
+from Python.RecipeParser import sniff_charset, make_soup, CHARSET_SNIFF_BYTES
+from Python.bench_parsers import load_fixtures
+
+META = b'<html><head><meta charset="windows-1252"></head>'
+HTTP_EQUIV = (b'<meta http-equiv="Content-Type" '
+              b'content="text/html; charset=ISO-8859-1">')
+
+
+@pytest.mark.parametrize("data, header, expected", [
+    (codecs.BOM_UTF8 + META, "iso-8859-1", "utf-8"),  # BOM over header
+    (codecs.BOM_UTF16_LE + META, None, "utf-16"),
+    (codecs.BOM_UTF16_BE + META, "utf-8", "utf-16"),
+    (META, "UTF-8", "utf-8"),  # header over meta
+    (META, None, "cp1252"),
+    (HTTP_EQUIV, None, "iso8859-1"),
+    (META, "no-such-charset", "cp1252"),  # unknown names are skipped
+    (b'<meta charset="no-such-charset">', None, None),
+    (b'<html>' + b' ' * CHARSET_SNIFF_BYTES + META, None, None),
+    (b'<html></html>', None, None),
+])
+def test_precedence(data, header, expected):
+    assert sniff_charset(data, header) == expected
+
+
+def test_decodes_once_with_the_chosen_charset():
+    title = u"Crème brûlée"
+    page = (u'<html><head><meta charset="utf-8"></head><body>'
+            u'<h1>{}</h1></body></html>').format(title)
+
+    assert make_soup(page.encode('utf-8')).h1.string == title
+    assert make_soup(page.encode('windows-1252'), charset="windows-1252") \
+        .h1.string == title
+    assert make_soup(codecs.BOM_UTF8 + page.encode('utf-8'),
+                     charset="windows-1252").h1.string == title
+
+
+def test_fixture_with_meta_charset_only():
+    file, url, data, charset = load_fixtures(sites=["MarthaStewartParse"])[
+        "MarthaStewartParse"][0]
+    assert charset is None
+    assert sniff_charset(data, charset) == "cp1252"
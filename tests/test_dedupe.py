@@ -0,0 +1,69 @@
+# coding: utf-8
+
+# Tests of url and recipe duplicate detection in Python/dedupe.py...
+
+import pytest
+from Python.dedupe import clean_url, get_canonical_key, dedupe_urls, \
+    get_key_digest, DuplicateFinder
+from Python.recipe import Recipe
+
+
+@pytest.mark.parametrize("url, cleaned", [
+    ("http://food.com/recipe?123", "http://food.com/recipe?123"),
+    ("http://food.com/r?a=1;b=2&utm_source=x", "http://food.com/r?a=1;b=2"),
+    ("http://food.com/r?q=%20a+b&fbclid=1#top", "http://food.com/r?q=%20a+b"),
+    ("http://food.com/r?utm_medium=mail&utm_source=x", "http://food.com/r"),
+    ("HTTP://Food.com/r/?b=2&a=1#c", "HTTP://Food.com/r/?b=2&a=1"),
+])
+def test_clean_url_only_strips_tracking(url, cleaned):
+    assert clean_url(url) == cleaned
+
+
+def test_canonical_key_collapses_variants():
+    keys = set(get_canonical_key(url) for url in (
+        "http://food52.com/recipes/1?b=2&a=1",
+        "https://www.Food52.com/recipes/1/?a=1&b=2&utm_source=x#comments",
+        "http://food52.com:80/recipes/1?a=1&b=2"))
+    assert keys == {"food52.com/recipes/1?a=1&b=2"}
+    assert get_canonical_key("http://food52.com/recipes/2") not in keys
+
+
+def test_dedupe_urls():
+    duplicates = []
+    urls = list(dedupe_urls(
+        ["http://food.com/r?123#a", "https://www.food.com/r/?123",
+         "http://food.com/other"],
+        on_duplicate=lambda url, first: duplicates.append((url, first))))
+
+    assert urls == ["http://food.com/r?123", "http://food.com/other"]
+    assert duplicates == [("https://www.food.com/r/?123", "food.com/r?123=")]
+
+
+def get_recipe(url, lines):
+    return Recipe("Food52Parse", url, "title", ingredient_groups=(
+        ('', tuple(lines)),))
+
+
+def test_finds_recipe_with_same_ingredients():
+    finder = DuplicateFinder(threshold=0.8)
+    lines = ["2 cups flour", "1 cup sugar", "3 eggs", "1 tsp vanilla",
+             "1/2 cup butter"]
+    assert finder.check("a", get_recipe("a", lines)) is None
+    assert finder.check("b", get_recipe("b", ["salt", "pepper", "beef",
+                                              "onion"])) is None
+
+    duplicate = finder.check("c", get_recipe("c", [
+        "250 g Flour", "200 g sugar", "4 large eggs", "2 tsp vanilla",
+        "1 stick butter, melted"]))
+    assert duplicate[0] == "a" and duplicate[1] >= 0.8
+    assert finder.check("d", get_recipe("d", lines[:2])) is None
+
+
+def test_dedupe_urls_remembers_fixed_size_digests():
+    urls = dedupe_urls(["http://food.com/r/" + "x" * 2000,
+                        "http://food.com/r/" + "x" * 2000 + "#a"])
+    assert next(urls) == "http://food.com/r/" + "x" * 2000
+    seen = urls.gi_frame.f_locals["seen"]
+    assert seen == {get_key_digest("food.com/r/" + "x" * 2000)}
+    assert all(0 <= digest < 2 ** 64 for digest in seen)
+    assert list(urls) == []
@@ -0,0 +1,81 @@
+# coding: utf-8
+
+# Tests of the concurrent fetching in Python/fetcher.py...
+
+import threading
+import time
+from Python.fetcher import run_concurrently, fetch_pages, get_host
+from Python.http_client import HttpClient
+
+
+class Gauge(object):
+    def __init__(self):
+        """
+        Generates Gauge object, tracking the peak number of requests in
+        flight per Host header
+        :return: None
+        """
+        self.current = {}
+        self.peak = {}
+        self.lock = threading.Lock()
+
+    def respond(self, handler):
+        host = handler.headers['Host'].split(":")[0]
+        with self.lock:
+            self.current[host] = self.current.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.current[host])
+        time.sleep(0.05)
+        with self.lock:
+            self.current[host] -= 1
+        handler.send(handler.path.encode('ascii'))
+
+
+def test_get_host():
+    assert get_host("http://www.Food52.com/recipes/1") == "food52.com"
+    assert get_host("https://cooking.nytimes.com/x") == "cooking.nytimes.com"
+
+
+def test_per_host_limits(serve):
+    gauge = Gauge()
+    base = serve(gauge.respond)
+    port = base.rsplit(":", 1)[1]
+    urls = ["http://{}:{}/{}".format(host, port, i)
+            for i in range(12) for host in ("127.0.0.1", "localhost")]
+    results = list(fetch_pages(urls, max_workers=12, per_host=2,
+                               limits={"localhost": 3},
+                               client=HttpClient(timeout=5)))
+
+    assert [url for url, data, error in results] == urls
+    assert all(error is None for url, data, error in results)
+    assert gauge.peak == {"127.0.0.1": 2, "localhost": 3}
+
+
+def test_results_in_input_order():
+    def slow_first(url):
+        time.sleep(0.1 if url.endswith("/0") else 0)
+        if url.endswith("/3"):
+            raise ValueError(url)
+        return url.upper()
+
+    urls = ["http://a{}.example/{}".format(i % 3, i) for i in range(8)]
+    results = list(run_concurrently(slow_first, urls, max_workers=4))
+
+    assert [url for url, result, error in results] == urls
+    assert [result for url, result, error in results if not error] == [
+        url.upper() for url in urls if not url.endswith("/3")]
+    assert isinstance(results[3][2], ValueError)
+
+
+def test_pulls_urls_lazily():
+    pulled = []
+
+    def urls():
+        for i in range(100):
+            pulled.append(i)
+            yield "http://example.com/{}".format(i)
+
+    results = run_concurrently(lambda url: url, urls(), max_workers=2,
+                               max_pending=4)
+    next(results)
+    assert len(pulled) <= 5
+    results.close()
@@ -0,0 +1,62 @@
+# coding: utf-8
+
+# Tests of the string helpers in Python/help_me.py...
+
+import ast
+import json
+import random
+import pytest
+from Python.help_me import decode_string_list
+
+LITERALS = [
+    "[]",
+    "[ ]",
+    "['1 onion', '2 cups broth']",
+    '["1 onion", "2 cups broth"]',
+    "['1 onion', \"Grandma's 2 cups broth\"]",
+    "[u'1 onion', u'2 cups broth',]",
+    "['tab\\there', 'new\\nline', 'back\\\\slash', 'it\\'s']",
+    "['\\x41\\u00e9\\U0001F600\\101', '\\a\\b\\f\\v\\r']",
+    "['café au lait', '½ cup sugar']",
+    '["say \\"cheese\\"", "caf\\u00e9"]',
+    "  ['padded']  ",
+]
+
+
+@pytest.mark.parametrize("value", LITERALS)
+def test_matches_literal_eval(value):
+    assert decode_string_list(value) == ast.literal_eval(value.strip())
+
+
+def test_matches_literal_eval_on_random_lists():
+    rng = random.Random(20)
+    alphabet = "ab '\"\\\n\t,[]é½\U0001F600\x00"
+    for _ in range(500):
+        items = ["".join(rng.choice(alphabet) for _ in range(rng.randrange(8)))
+                 for _ in range(rng.randrange(5))]
+        value = repr(items)
+        assert decode_string_list(value) == ast.literal_eval(value) == items
+        # JSON \ud83d\ude00 surrogate pairs are one character, unlike in a
+        # python literal
+        for value in (json.dumps(items), json.dumps(items, ensure_ascii=False)):
+            assert decode_string_list(value) == json.loads(value) == items
+
+
+@pytest.mark.parametrize("value", [
+    "", "'a'", "[1, 2]", "['a', 1]", "['a' 'b']", "['a',, 'b']",
+    "['a'] + ['b']", "[['a']]", "['unterminated]", "{'a': 'b'}",
+])
+def test_rejects_everything_else(value):
+    with pytest.raises(ValueError):
+        decode_string_list(value)
+
+
+def test_limits():
+    with pytest.raises(ValueError):
+        decode_string_list("['a', 'b', 'c']", max_items=2)
+    with pytest.raises(ValueError):
+        decode_string_list("['a', 'b', 'c']", max_chars=10)
+    assert decode_string_list("['a', 'b']", max_items=2) == ['a', 'b']
+    # characters, not utf-8 bytes, are counted
+    assert decode_string_list("['\u00bd \u00e9']", max_chars=7) == [
+        '\u00bd \u00e9']
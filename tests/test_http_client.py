@@ -0,0 +1,58 @@
+# coding: utf-8
+
+# Tests of the keep-alive HTTP client in Python/http_client.py...
+
+import socket
+import threading
+import time
+import pytest
+from Python.http_client import HttpClient
+
+
+class KeepAlive(object):
+    def __init__(self, second_response):
+        """
+        Generates KeepAlive object, answering the first request over a
+        keep-alive connection and the later ones with second_response
+        :param second_response: "close" to drop the idle connection after
+        the first response, "slow" to stall the second one
+        :return: None
+        """
+        self.second_response = second_response
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def respond(self, handler):
+        with self.lock:
+            self.requests += 1
+            count = self.requests
+        if count > 1 and self.second_response == "slow":
+            time.sleep(0.5)
+        handler.send(str(count).encode('ascii'),
+                     headers={'Connection': 'keep-alive'})
+        # the HTTP/1.0 handler closes after every response unless told not
+        # to, "close" advertises keep-alive but closes anyway
+        handler.close_connection = self.second_response == "close"
+
+
+def test_retries_closed_idle_connection(serve):
+    server = KeepAlive("close")
+    url = serve(server.respond)
+    client = HttpClient(timeout=5)
+
+    assert client.get(url).body == b"1"
+    time.sleep(0.1)  # let the server close its side
+    assert client.get(url).body == b"2"
+    assert server.requests == 2
+
+
+def test_never_resends_on_timeout(serve):
+    server = KeepAlive("slow")
+    url = serve(server.respond)
+    client = HttpClient(timeout=0.2)
+
+    assert client.get(url).body == b"1"
+    with pytest.raises(socket.timeout):
+        client.get(url)
+    time.sleep(0.5)
+    assert server.requests == 2
@@ -0,0 +1,32 @@
+# coding: utf-8
+
+# Tests of the command line of Python/main.py...
+
+from Python.main import get_arg_parser
+from Python.fetcher import DEFAULT_PER_HOST
+from Python.http_client import DEFAULT_TIMEOUT
+
+
+def test_defaults():
+    args = get_arg_parser().parse_args(["recipes.txt"])
+    assert args.file == "recipes.txt"
+    assert args.workers > 1
+    assert args.per_host == DEFAULT_PER_HOST
+    assert args.timeout == DEFAULT_TIMEOUT
+    assert args.cache_dir is None
+    assert args.parse_workers == 0
+    assert args.html_parser is None
+    assert args.report is None
+
+
+def test_tuning_flags():
+    args = get_arg_parser().parse_args([
+        "-", "--workers", "16", "--per-host", "2", "--timeout", "2.5",
+        "--cache-dir", "cache", "--cache-bytes", "1024",
+        "--parse-workers", "4", "--parse-chunksize", "3",
+        "--html-parser", "html.parser", "--report", "report.json"])
+    assert (args.workers, args.per_host, args.timeout) == (16, 2, 2.5)
+    assert (args.cache_dir, args.cache_bytes) == ("cache", 1024)
+    assert (args.parse_workers, args.parse_chunksize) == (4, 3)
+    assert args.html_parser == "html.parser"
+    assert args.report == "report.json"
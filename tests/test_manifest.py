@@ -0,0 +1,53 @@
+# coding: utf-8
+
+# Tests of the manifest of generated recipes in Python/manifest.py...
+
+import time
+from Python.manifest import Manifest, DAY
+from Python.main import update_manifest
+
+
+class Written(object):
+    def __init__(self, markdown_file, fetched):
+        self.markdown_file = markdown_file
+        self.content_hash = "hash of " + markdown_file
+        self.fetched = fetched
+
+
+def test_is_fresh(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    manifest.record("http://food52.com/recipes/1#comments", "a.md", "x",
+                    fetched=time.time() - 2 * DAY)
+
+    assert manifest.get("HTTP://food52.com/recipes/1")["file"] == "a.md"
+    assert manifest.is_fresh("http://food52.com/recipes/1")
+    assert manifest.is_fresh("http://food52.com/recipes/1", max_age=3)
+    assert not manifest.is_fresh("http://food52.com/recipes/1", max_age=1)
+    assert not manifest.is_fresh("http://food52.com/recipes/2")
+    manifest.close()
+
+
+def test_records_fetch_time(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    update_manifest(manifest, "http://a.com/1",
+                    Written(str(tmp_path / "a.md"), 1000.0))
+    assert manifest.get("http://a.com/1")["fetched"] == 1000.0
+
+
+def test_removes_file_of_old_title(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.db"))
+    old, new, shared = (tmp_path / "old.md", tmp_path / "new.md",
+                        tmp_path / "shared.md")
+    for path in (old, new, shared):
+        path.write_text("# recipe")
+    update_manifest(manifest, "http://a.com/1", Written(str(old), 1.0))
+    update_manifest(manifest, "http://a.com/2", Written(str(shared), 1.0))
+    update_manifest(manifest, "http://a.com/3", Written(str(shared), 1.0))
+
+    update_manifest(manifest, "http://a.com/1", Written(str(new), 2.0))
+    update_manifest(manifest, "http://a.com/2", Written(str(new), 2.0))
+
+    assert not old.exists()
+    assert shared.exists()  # still the file of http://a.com/3
+    assert new.exists()
+    assert manifest.get("http://a.com/1")["file"] == str(new)
@@ -0,0 +1,93 @@
+# coding: utf-8
+
+# Tests that streamed markdown is byte-identical to the string builders it replaced...
+
+import io
+import pytest
+from Python import help_me
+from Python.RecipeParser import get_parser
+from Python.bench_parsers import load_fixtures
+
+PAGES = [page for pages in load_fixtures().values() for page in pages]
+FILES = [page[0] for page in PAGES]
+
+
+# the string builders as they were before iter_markdown(), kept as reference
+def old_ingredient_table(ingredient_dict):
+    ingredient_table = ''
+    for ingredient, amount in ingredient_dict.items():
+        ingredient_table += "|" + ''.join(amount) + "|" + ingredient + "|\n"
+    return ingredient_table
+
+
+def old_ingredient_table_simple(ingredient_list):
+    ingredient_table = ''
+    for ingredient in ingredient_list:
+        ingredient_table += "|" + ''.join(ingredient) + "|\n"
+    return ingredient_table
+
+
+def old_ingredient_list_with_subtitles(ingredient_dict):
+    ingredient_list = ''
+    for title, ingredients in ingredient_dict.items():
+        ingredient_list += "\n######" + title + "\n" if title else ''
+        for ingredient in ingredients:
+            ingredient_list += "* " + ingredient + "\n"
+    return ingredient_list
+
+
+def old_instruction_list(instruction_list):
+    instruction_list_string = ''
+    for step in instruction_list:
+        instruction_list_string += "\n\n* " + step
+    return instruction_list_string
+
+
+def old_instruction_dict_with_subtitles(instruction_dict):
+    instruction_list = ''
+    for title, steps in instruction_dict.items():
+        if title:
+            instruction_list += "\n####" + title + "\n"
+        else:
+            instruction_list += "\n"
+        for step in steps:
+            instruction_list += "* " + step + "\n"
+        instruction_list += "\n"
+    return instruction_list
+
+
+GROUPS = {'': ['1 cup flour', '2 eggs'], 'Glaze': ['sugar'], 'Empty': []}
+STEPS = ['Mix.', 'Bake at 350°F.', '']
+BUILDERS = [
+    ("get_ingredient_table", old_ingredient_table,
+     {'flour': ['1 ', 'cup'], 'salt': '', 'eggs': ['2']}),
+    ("get_ingredient_table_simple", old_ingredient_table_simple,
+     ['1 cup flour', ['2 ', 'eggs'], '']),
+    ("get_ingredient_list_with_subtitles",
+     old_ingredient_list_with_subtitles, GROUPS),
+    ("get_instruction_list", old_instruction_list, STEPS),
+    ("get_instruction_dict_with_subtitles",
+     old_instruction_dict_with_subtitles, GROUPS),
+]
+
+
+@pytest.mark.parametrize("name, old, value", BUILDERS,
+                         ids=[builder[0] for builder in BUILDERS])
+def test_builders_match_old_strings(name, old, value):
+    assert getattr(help_me, name)(value) == old(value)
+    assert ''.join(getattr(help_me, "iter" + name[3:])(value)) == old(value)
+    assert getattr(help_me, name)(type(value)()) == ''
+
+
+@pytest.mark.parametrize("file, url, data, charset", PAGES, ids=FILES)
+def test_streamed_markdown_matches_string(file, url, data, charset, tmp_path):
+    recipe = get_parser(url).from_html(url, data, charset)
+    recipe.set_recipe_contents()
+    recipe.release_soup()
+    fp = io.StringIO()
+    recipe.render_to(fp)
+
+    assert fp.getvalue() == str(recipe) == ''.join(recipe.iter_markdown())
+    recipe.make_markdown(directory=str(tmp_path) + "/")
+    with open(recipe.markdown_file, 'rb') as f:
+        assert f.read() == str(recipe).encode('utf-8')
@@ -0,0 +1,68 @@
+# coding: utf-8
+
+# Tests of the process pool parse stage in Python/parse_pool.py...
+
+import pickle
+from Python import RecipeParser
+from Python.RecipeParser import get_parser
+from Python.bench_parsers import load_fixtures
+from Python.parse_pool import parse_page, parse_pages
+
+# [(file, url, bytes, charset)] of every recorded page
+PAGES = [page for pages in load_fixtures().values() for page in pages]
+
+
+class ParserProbe(object):
+    """
+    Stand-in RecipeParse sub class recording the tree builder of the process
+    it ran in, or failing on url "bad"
+    """
+    @classmethod
+    def from_html(cls, url, data, charset=None, fetched=None):
+        probe = cls()
+        probe.url = url
+        probe.html_parser = RecipeParser.HTML_PARSER
+        return probe
+
+    def set_recipe_contents(self):
+        if self.url == "bad":
+            raise ValueError("no recipe in " + self.url)
+
+    def release_soup(self):
+        pass
+
+
+def get_tasks():
+    return [(get_parser(url), url, data, charset, None)
+            for _, url, data, charset in PAGES]
+
+
+def test_matches_in_process_parse(monkeypatch):
+    results = list(parse_pages(get_tasks(), max_workers=2, chunksize=3,
+                               html_parser="html.parser"))
+    monkeypatch.setattr(RecipeParser, "HTML_PARSER", "html.parser")
+    expected = [parse_page(task) for task in get_tasks()]
+
+    assert [url for url, _, _ in results] == [page[1] for page in PAGES]
+    for (url, recipe, error), (_, local, _) in zip(results, expected):
+        assert error is None, url
+        assert recipe.soup is False
+        assert str(recipe) == str(local)
+        assert str(pickle.loads(pickle.dumps(recipe))) == str(local)
+
+
+def test_returns_errors_in_input_order():
+    tasks = [(ParserProbe, url, b"", None, None)
+             for url in ("a", "bad", "c", "d", "bad")]
+    results = list(parse_pages(tasks, max_workers=2, chunksize=3,
+                               html_parser="html.parser", max_pending=1))
+
+    assert [url for url, _, _ in results] == ["a", "bad", "c", "d", "bad"]
+    for url, recipe, error in results:
+        if url == "bad":
+            assert recipe is None
+            assert isinstance(error, ValueError)
+            assert str(error) == "no recipe in bad"
+        else:
+            assert error is None
+            assert recipe.html_parser == "html.parser"
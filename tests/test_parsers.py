@@ -0,0 +1,147 @@
+# coding: utf-8
+
+# Golden tests of the site parsers against the recorded pages in Python/fixtures/...
+
+import pytest
+from Python import RecipeParser
+from Python.RecipeParser import make_soup, get_parser
+from Python.bench_parsers import load_fixtures, get_golden_path
+
+# [(file, url, bytes, charset)] of every recorded page
+PAGES = [page for pages in load_fixtures().values() for page in pages]
+FILES = [page[0] for page in PAGES]
+
+
+def parse_tree(url, data, charset=None, html_parser=None, regions=True):
+    """
+    Parses a page from its BeautifulSoup tree only, skipping JSON-LD
+    :param url: Url of the page
+    :param data: Raw html bytes
+    :param charset: Charset from the Content-Type header or None
+    :param html_parser: Tree builder, defaults to HTML_PARSER
+    :param regions: False to build the whole tree instead of the site's
+    regions
+    :return: RecipeParse object with its contents set
+    """
+    parser = get_parser(url)
+    recipe = parser(url, make_soup(data, html_parser,
+                                   parser.regions if regions else None,
+                                   charset=charset))
+    recipe.set_recipe_contents()
+    return recipe
+
+
+@pytest.mark.parametrize("file, url, data, charset", PAGES, ids=FILES)
+def test_lxml_matches_html_parser(file, url, data, charset, monkeypatch):
+    pytest.importorskip("lxml")
+    markdown = {}
+    for html_parser in ("lxml", "html.parser"):
+        monkeypatch.setattr(RecipeParser, "HTML_PARSER", html_parser)
+        recipe = get_parser(url).from_html(url, data, charset)
+        recipe.set_recipe_contents()
+        markdown[html_parser] = (str(recipe), str(parse_tree(url, data,
+                                                             charset)))
+
+    assert markdown["lxml"] == markdown["html.parser"]
+    assert markdown["lxml"][0].startswith("#")
+
+
+@pytest.mark.parametrize("html_parser", ["lxml", "html.parser"])
+def test_region_strainer_skips_other_tags(html_parser):
+    if html_parser == "lxml":
+        pytest.importorskip("lxml")
+    data = (b'<html><body><div class="nav"><p>menu</p></div>'
+            b'<div class="recipe note"><p>keep</p></div>'
+            b'<ul><li itemprop="recipeIngredient">salt</li><li>ad</li></ul>'
+            b'</body></html>')
+    soup = make_soup(data, html_parser, regions={
+        "recipe": ("div", {"class": "recipe"}),
+        "ingredients": ("li", {"itemprop": "recipeIngredient"})})
+
+    assert [str(tag) for tag in soup.find_all(recursive=False)] == [
+        '<div class="recipe note"><p>keep</p></div>',
+        '<li itemprop="recipeIngredient">salt</li>']
+
+
+@pytest.mark.parametrize("file, url, data, charset", PAGES, ids=FILES)
+def test_regions_match_whole_tree(file, url, data, charset):
+    strained = parse_tree(url, data, charset)
+    whole = parse_tree(url, data, charset, regions=False)
+
+    assert str(strained) == str(whole)
+    for tag in make_soup(data, regions=strained.regions,
+                         charset=charset).find_all(recursive=False):
+        assert any(tag.name == name and RecipeParser.matches_attrs(
+            tag.attrs, attrs) for name, attrs in strained.regions.values())
+
+
+def read_golden(file):
+    """
+    Reads the expected markdown of a recorded page, see write_golden()
+    :param file: File name of the page
+    :return: String
+    """
+    with open(get_golden_path(file), encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("file, url, data, charset", PAGES, ids=FILES)
+def test_json_ld_and_tree_match_golden(file, url, data, charset):
+    recipe = get_parser(url).from_html(url, data, charset)
+    recipe.set_recipe_contents()
+
+    assert str(recipe) == read_golden(file)
+    assert str(parse_tree(url, data, charset)) == read_golden(file)
+
+
+def test_json_ld_is_sanitized_like_the_tree():
+    # JSON-LD with padded and wrapped strings, html entities and tags,
+    # HowToSections and no image, the tree spells everything plainly
+    file, url, data, charset = PAGES[FILES.index(
+        "liveeatlearn_sections.html")]
+    recipe = get_parser(url).from_html(url, data, charset)
+    recipe.set_recipe_contents()
+
+    assert recipe.structured == {"title", "recipe_yield", "ingredients",
+                                 "instructions"}
+    assert recipe.img_url == "https://www.liveeatlearn.com/banana-bread.jpg"
+    assert recipe.title == "Banana & Walnut Bread"
+    assert recipe.recipe_yield == "1 loaf (10 slices)"
+    assert recipe.ingredients[2:4] == ["¾ cup sugar  or honey",
+                                       "1/2 cup toasted walnuts"]
+    assert recipe.instructions[1] == "Mash the bananas & whisk in the sugar."
+    assert len(recipe.instructions) == 5
+
+
+@pytest.mark.filterwarnings("error::DeprecationWarning")
+def test_sweet_and_savory_sub_titles_in_paragraphs():
+    url = "https://sweetandsavorybyshinee.com/pie/"
+    data = (b'<div class="ingredients"><div><p>Crust</p><ul><li>flour</li>'
+            b'<li>butter</li></ul><p>Filling \xe2\x80\x93 apples</p><ul>'
+            b'<li>6 apples</li><li>\xc2\xbd cup sugar</li></ul></div></div>')
+    parser = get_parser(url)
+    recipe = parser(url, make_soup(data, regions=parser.regions))
+    recipe.set_ingredients()
+
+    assert recipe.ingredients == {"Crust": ["flour", "butter"],
+                                  "Filling \u2013 apples": [
+                                      "6 apples", "\xbd cup sugar"]}
+
+
+def test_downloads_page_on_first_use(serve):
+    file, url, data, charset = PAGES[0]
+    requests = []
+
+    def respond(handler):
+        requests.append(handler.path)
+        handler.send(data, headers={'Content-Type': 'text/html; charset=' +
+                                    (charset or 'utf-8')})
+
+    page_url = serve(respond) + "/" + file
+    recipe = get_parser(url)(page_url)
+    assert requests == []
+
+    recipe.set_recipe_contents()
+    assert requests == ["/" + file]
+    assert str(recipe) == str(parse_tree(url, data, charset)).replace(
+        url, page_url)
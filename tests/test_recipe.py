@@ -0,0 +1,70 @@
+# coding: utf-8
+
+# Tests of the structured recipe record and its exports in Python/recipe.py...
+
+import io
+import pytest
+from Python import recipe as recipe_module
+from Python.recipe import Recipe, write_ndjson, read_ndjson, \
+    write_msgpack, read_msgpack
+
+RECIPES = [
+    Recipe("Food52Parse", "https://food52.com/recipes/1-pie", "Apple Pie",
+           "https://images.food52.com/pie.jpg", "8 servings",
+           (("Crust", ("2 cups flour", "1 stick butter")),
+            ("Filling", ("6 apples", "1/2 cup sugar"))),
+           (("", ("Make the crust.", "Fill and bake.")),)),
+    Recipe("BonAppetitParse", "https://www.bonappetit.com/recipe/crepes",
+           "Crème Brûlée Crêpes 🍮 — 法式", recipe_yield=None,
+           ingredient_groups=(("", ("œufs", "200 g de farine")),),
+           instruction_groups=(("Pâte", ("Mélanger.",)),
+                               ("Cuisson", ("Cuire 1 min.",)))),
+    Recipe("NYTParse", "https://cooking.nytimes.com/recipes/1", "Toast"),
+]
+
+
+def assert_same(records):
+    assert [r.to_dict() for r in records] == [r.to_dict() for r in RECIPES]
+    for read, written in zip(records, RECIPES):
+        for name in Recipe.__slots__:
+            assert getattr(read, name) == getattr(written, name)
+
+
+def test_dict_round_trip():
+    assert_same([Recipe.from_dict(r.to_dict()) for r in RECIPES])
+    record = RECIPES[0].to_dict()
+    assert record["ingredient_groups"] == [
+        ["Crust", ["2 cups flour", "1 stick butter"]],
+        ["Filling", ["6 apples", "1/2 cup sugar"]]]
+    assert list(RECIPES[0].iter_ingredients()) == [
+        "2 cups flour", "1 stick butter", "6 apples", "1/2 cup sugar"]
+    assert list(RECIPES[1].iter_instructions()) == [
+        "Mélanger.", "Cuire 1 min."]
+
+
+def test_ndjson_round_trip():
+    fp = io.StringIO()
+    assert write_ndjson(RECIPES, fp) == len(RECIPES)
+    lines = fp.getvalue().split("\n")
+    assert len(lines) == len(RECIPES) + 1 and lines[-1] == ""
+    assert "Crème Brûlée Crêpes 🍮 — 法式" in lines[1]  # not \u escaped
+
+    fp.seek(0)
+    assert_same(list(read_ndjson(fp)))
+
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    fp = io.BytesIO()
+    assert write_msgpack(RECIPES, fp) == len(RECIPES)
+
+    fp.seek(0)
+    assert_same(list(read_msgpack(fp)))
+
+
+def test_msgpack_missing(monkeypatch):
+    monkeypatch.setattr(recipe_module, "msgpack", None)
+    with pytest.raises(ImportError):
+        write_msgpack(RECIPES, io.BytesIO())
+    with pytest.raises(ImportError):
+        list(read_msgpack(io.BytesIO()))
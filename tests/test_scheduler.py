@@ -0,0 +1,174 @@
+# coding: utf-8
+
+# Tests of polite crawling in Python/scheduler.py...
+
+import asyncio
+import email.utils
+import io
+import socket
+import ssl
+import threading
+import urllib.error
+import pytest
+from Python.fetcher import fetch_page
+from Python.http_client import HttpClient
+from Python.scheduler import TokenBucket, Backoff, RobotsCache, \
+    PoliteScheduler, RobotsDisallowed, parse_retry_after, is_retryable, \
+    retry_call
+
+
+def http_error(code, headers=None):
+    return urllib.error.HTTPError("http://a.com/", code, "status",
+                                  headers or {}, io.BytesIO())
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    now = bucket.updated
+    for _ in range(2):
+        assert bucket.get_wait(now) == 0
+        bucket.take(now)
+    assert bucket.get_wait(now) == pytest.approx(0.5)
+    assert bucket.get_wait(now + 0.5) == 0
+    assert bucket.get_wait(now + 10) == 0 and bucket.tokens == 2  # capped
+
+    bucket.hold(now + 30)
+    assert bucket.get_wait(now + 10) == pytest.approx(20)
+    bucket.slow_down(0.1)
+    bucket.slow_down(5.0)  # never speeds up
+    assert (bucket.rate, bucket.burst) == (0.1, 1)
+
+
+def test_parse_retry_after():
+    now = 1500000000.0
+    date = email.utils.formatdate(now + 120, usegmt=True)
+    assert parse_retry_after("30") == 30.0
+    assert parse_retry_after(" 0 ") == 0.0
+    assert parse_retry_after(date, now=now) == pytest.approx(120)
+    assert parse_retry_after(date, now=now + 600) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("-5") is None
+    assert parse_retry_after(None) is None
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (http_error(429), True),
+    (http_error(503), True),
+    (http_error(404), False),
+    (socket.timeout("timed out"), True),
+    (asyncio.TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (urllib.error.URLError(socket.timeout("timed out")), True),
+    (socket.gaierror(-2, "Name or service not known"), False),
+    (ConnectionRefusedError(), False),
+    (urllib.error.URLError(ConnectionRefusedError()), False),
+    (urllib.error.URLError("unknown url type: ftp"), False),
+    (ssl.SSLCertVerificationError("bad certificate"), False),
+    (ValueError("bad page"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) == retryable
+
+
+def test_backoff_get_delay():
+    backoff = Backoff(base=1.0, cap=5.0, max_retries=3, max_retry_after=60)
+    for attempt in range(3):
+        for _ in range(20):
+            delay = backoff.get_delay(attempt, http_error(503))
+            assert 0 <= delay <= min(5.0, 2 ** attempt)
+    assert backoff.get_delay(3, http_error(503)) is None
+    assert backoff.get_delay(0, http_error(404)) is None
+
+    delay = backoff.get_delay(0, http_error(429, {'Retry-After': '10'}))
+    assert 10 <= delay <= 11
+    assert backoff.get_delay(0, http_error(429, {'Retry-After': '61'})) is None
+
+
+def test_retry_call_waits_for_retry_after(serve):
+    statuses = [429, 503, 200]
+
+    def respond(handler):
+        status = statuses.pop(0)
+        handler.send(b'page' if status == 200 else b'',
+                     status=status, headers={'Retry-After': '0'})
+
+    url = serve(respond) + "/recipe"
+    client = HttpClient(timeout=5)
+    result = retry_call(lambda url: fetch_page(url, client=client), url,
+                        Backoff(base=0.01))
+    assert result == (b'page', None)
+    assert statuses == []
+
+
+def test_retry_call_gives_up(serve):
+    url = serve(lambda handler: handler.send(b'', status=404)) + "/recipe"
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return fetch_page(url, client=HttpClient(timeout=5))
+
+    with pytest.raises(urllib.error.HTTPError):
+        retry_call(fetch, url, Backoff(base=0.01))
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("status, allowed", [
+    (200, False), (401, False), (403, False), (404, True), (500, True)])
+def test_robots_statuses(serve, status, allowed):
+    def respond(handler):
+        body = b"User-agent: *\nDisallow: /private\nCrawl-delay: 3\n"
+        handler.send(body if status == 200 else b'', status=status)
+
+    base = serve(respond)
+    robots = RobotsCache(HttpClient(timeout=5))
+    assert not robots.is_loaded(base + "/private/1")
+
+    assert robots.can_fetch(base + "/private/1") == allowed
+    assert robots.can_fetch(base + "/public") == (status != 401 and
+                                                  status != 403)
+    assert robots.is_loaded(base + "/other")
+    assert robots.get_crawl_delay(base + "/public") == (
+        3.0 if status == 200 else None)
+
+
+def test_robots_unreachable_allows_everything():
+    with socket.socket() as sock:  # a port nothing listens on
+        sock.bind(("127.0.0.1", 0))
+        base = "http://127.0.0.1:{}".format(sock.getsockname()[1])
+    robots = RobotsCache(HttpClient(timeout=5))
+    assert robots.can_fetch(base + "/recipe")
+
+
+def test_polite_scheduler(serve):
+    lock = threading.Lock()
+    counts = {}
+
+    def respond(handler):
+        if handler.path == "/robots.txt":
+            handler.send(b"User-agent: *\nDisallow: /private\n")
+            return
+        with lock:
+            counts[handler.path] = counts.get(handler.path, 0) + 1
+            throttled = handler.path == "/busy" and counts[handler.path] == 1
+        if throttled:
+            handler.send(b'', status=429, headers={'Retry-After': '0'})
+        else:
+            handler.send(handler.path.encode('ascii'))
+
+    base = serve(respond)
+    client = HttpClient(timeout=5)
+    scheduler = PoliteScheduler(rate=100, burst=10,
+                                robots=RobotsCache(client),
+                                backoff=Backoff(base=0.01))
+    urls = [base + path for path in ("/a", "/busy", "/private/x", "/b")]
+    results = dict((url, (result, error)) for url, result, error in
+                   scheduler.run(lambda url: fetch_page(url, client=client),
+                                 urls, max_workers=4))
+
+    assert sorted(results) == sorted(urls)
+    assert results[base + "/a"] == ((b'/a', None), None)
+    assert results[base + "/busy"] == ((b'/busy', None), None)
+    assert counts["/busy"] == 2
+    assert isinstance(results[base + "/private/x"][1], RobotsDisallowed)
+    assert "/private/x" not in counts
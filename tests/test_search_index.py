@@ -0,0 +1,115 @@
+# coding: utf-8
+
+# Tests of the ingredient/full-text index in Python/search_index.py...
+
+import pytest
+from Python.recipe import Recipe
+from Python.search_index import RecipeIndex, stem, get_ingredient_terms, \
+    get_text_terms, INGREDIENT, TEXT
+
+
+def get_recipe(url, title, ingredients, instructions=()):
+    return Recipe("Food52Parse", url, title,
+                  ingredient_groups=(("", tuple(ingredients)),),
+                  instruction_groups=(("", tuple(instructions)),))
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RecipeIndex(str(tmp_path / "recipes.idx.db"))
+    index.add(get_recipe("http://a.com/1", "Scallion Pancakes",
+                         ["2 cups flour", "4 scallions, thinly sliced",
+                          "1 tsp grated ginger"],
+                         ["Fry the pancakes until golden."]), "pancakes.md")
+    index.add(get_recipe("http://a.com/2", "Chewy Cookies",
+                         ["2 cups flour", "1 cup raisins", "2 eggs"],
+                         ["Bake the cookies for 12 minutes."]))
+    index.add(get_recipe("http://a.com/3", "Berry Pie",
+                         ["1 pie crust", "4 cups mixed berries",
+                          "1 tablespoon lemon juice"],
+                         ["Grill nothing, bake the pie."]))
+    yield index
+    index.close()
+
+
+def get_urls(results):
+    return [result["url"] for result in results]
+
+
+@pytest.mark.parametrize("plural, singular", [
+    ("cookies", "cookie"), ("berries", "berry"), ("scallions", "scallion"),
+    ("tomatoes", "tomato"), ("peaches", "peach"), ("pies", "pie")])
+def test_stem_folds_plurals(plural, singular):
+    assert stem(plural) == stem(singular)
+
+
+def test_terms_skip_stop_words():
+    assert get_ingredient_terms("2 cups thinly sliced Scallions") == \
+        ["scallion"]
+    assert get_text_terms("Bake until it is golden") == ["bake", "golden"]
+
+
+def test_and_or(index):
+    assert get_urls(index.search(["flour"])) == [
+        "http://a.com/2", "http://a.com/1"]
+    assert get_urls(index.search(["flour", "ginger"])) == ["http://a.com/1"]
+    assert index.search(["ginger", "raisins"]) == []
+    assert get_urls(index.search(["ginger", "raisins"], match_all=False)) \
+        == ["http://a.com/2", "http://a.com/1"]
+    assert get_urls(index.search(["flour"], ["bake"])) == ["http://a.com/2"]
+    assert index.search(["flour"], limit=1)[0] == {
+        "url": "http://a.com/2", "title": "Chewy Cookies", "file": None}
+
+
+@pytest.mark.parametrize("query, url", [
+    ("scallion", "http://a.com/1"), ("scallions", "http://a.com/1"),
+    ("berry", "http://a.com/3"), ("berries", "http://a.com/3"),
+    ("egg", "http://a.com/2"), ("raisin", "http://a.com/2")])
+def test_singular_and_plural_queries(index, query, url):
+    assert get_urls(index.search([query])) == [url]
+
+
+def test_text_singular_and_plural(index):
+    assert get_urls(index.search(text=["cookie"])) == ["http://a.com/2"]
+    assert get_urls(index.search(text=["pancake"])) == ["http://a.com/1"]
+
+
+@pytest.mark.parametrize("query, urls", [
+    ("scal*", ["http://a.com/1"]), ("scallions*", ["http://a.com/1"]),
+    ("Berries*", ["http://a.com/3"]), ("rai*", ["http://a.com/2"]),
+    ("zz*", [])])
+def test_prefixes(index, query, urls):
+    assert get_urls(index.search([query])) == urls
+
+
+def test_stop_words_are_not_indexed(index):
+    assert index.search(["cups"]) == []
+    assert index.search(["sliced"]) == []
+    assert index.search(text=["the"]) == []
+    assert index.get_terms("c", INGREDIENT) == [("crust", 1)]
+    assert ("pie", 1) in index.get_terms("p", TEXT)
+
+
+def test_re_add_replaces_postings(index):
+    recipe_id = index.add(get_recipe("HTTP://A.com/2#comments",
+                                     "Oatmeal Cookies", ["3 cups oats"]),
+                          "cookies.md")
+
+    assert index.add(get_recipe("http://a.com/2", "Oatmeal Cookies",
+                                ["3 cups oats"]), "cookies.md") == recipe_id
+    assert index.search(["raisins"]) == []
+    assert get_urls(index.search(["flour"])) == ["http://a.com/1"]
+    assert index.search(["oat"]) == [{"url": "http://a.com/2",
+                                      "title": "Oatmeal Cookies",
+                                      "file": "cookies.md"}]
+
+
+def test_survives_reopening(tmp_path):
+    path = str(tmp_path / "recipes.idx.db")
+    index = RecipeIndex(path, commit_every=1000)
+    index.add(get_recipe("http://a.com/1", "Toast", ["1 slice bread"]))
+    index.close()
+
+    index = RecipeIndex(path)
+    assert get_urls(index.search(["bread"])) == ["http://a.com/1"]
+    index.close()
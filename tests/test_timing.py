@@ -0,0 +1,57 @@
+# coding: utf-8
+
+# Tests of the run report in Python/timing.py...
+
+from Python.timing import RunReport, StageTotals, get_percentile
+
+
+def test_get_percentile():
+    values = list(range(1, 101))
+    assert get_percentile(values, 50) == 50
+    assert get_percentile(values, 99) == 99
+    assert get_percentile([], 50) is None
+
+
+def test_stage_totals_keep_bounded_samples():
+    totals = StageTotals(max_samples=10)
+    for i in range(1000):
+        totals.add(1.0)
+    summary = totals.get_summary()
+
+    assert len(totals.samples) == 10
+    assert summary["count"] == 1000
+    assert summary["total"] == 1000.0
+    assert summary["p50"] == 1.0
+
+
+def test_totals_per_site_and_stage():
+    report = RunReport()
+    for i in range(3):
+        url = "http://food52.com/{}".format(i)
+        report.add_timings(url, {}, site="Food52Parse")
+        report.add_timings(url, {"connect": 0.5, "content_decode": 0.1})
+        report.add_bytes(url, 100)
+        report.add_timings(url, {"charset": 0.2, "tree_build": 1.0})
+        report.finish(url)
+    report.add_bytes("http://unknown.com/", 7)
+    result = report.get_report()
+
+    assert not report.pending and not report.urls
+    assert "per_url" not in result
+    assert result["urls"] == 4
+    assert result["bytes"] == 307
+    assert result["stages"]["connect"]["count"] == 3
+    assert result["stages"]["tree_build"]["total"] == 3.0
+    site = result["sites"]["Food52Parse"]
+    assert (site["urls"], site["bytes"]) == (3, 300)
+    assert set(site["stages"]) == {"connect", "content_decode", "charset",
+                                   "tree_build"}
+    assert result["sites"]["unknown"]["bytes"] == 7
+
+
+def test_per_url_is_opt_in():
+    report = RunReport(per_url=True)
+    report.add_timings("http://a.com/", {"connect": 1.0}, site="AParse")
+    report.finish("http://a.com/")
+    assert report.get_report()["per_url"] == {"http://a.com/": {
+        "site": "AParse", "bytes": 0, "stages": {"connect": 1.0}}}
@@ -0,0 +1,94 @@
+# coding: utf-8
+
+# Tests of the background markdown writer in Python/writer.py...
+
+import os
+import stat
+import pytest
+from Python import writer
+from Python.writer import MarkdownWriter, FSYNC_BATCH, FSYNC_FILE
+from Python.bench_parsers import load_fixtures
+from Python.RecipeParser import get_parser
+
+FILE, URL, DATA, CHARSET = load_fixtures(sites=["AllRecipesParse"])[
+    "AllRecipesParse"][0]
+
+
+def get_recipe(title):
+    """
+    Parses the recorded AllRecipes page under another title
+    :param title: Recipe title
+    :return: AllRecipesParse object
+    """
+    recipe = get_parser(URL).from_html(URL, DATA, CHARSET)
+    recipe.set_recipe_contents()
+    recipe.release_soup()
+    recipe.title = title
+    return recipe
+
+
+def write_all(directory, recipes, **kwargs):
+    """
+    Writes recipes through a MarkdownWriter
+    :return: Dictionary of form {'url': error or None}
+    """
+    markdown_writer = MarkdownWriter(directory, **kwargs)
+    for i, recipe in enumerate(recipes):
+        markdown_writer.submit(str(i), recipe)
+    markdown_writer.close()
+    return dict((url, error) for url, recipe, error in
+                markdown_writer.iter_done())
+
+
+@pytest.mark.parametrize("fsync", ["none", FSYNC_FILE, FSYNC_BATCH])
+def test_writes_long_titles(fsync, tmp_path):
+    directory = str(tmp_path) + "/"
+    title = "Sweet Corn " * 22  # 242 bytes, close to NAME_MAX
+
+    umask = os.umask(0o027)
+    try:
+        results = write_all(directory, [get_recipe(title),
+                                        get_recipe("Pie")], fsync=fsync)
+    finally:
+        os.umask(umask)
+
+    assert results == {"0": None, "1": None}
+    assert sorted(os.listdir(directory)) == sorted(
+        [title + ".md", "Pie.md"])
+    mode = stat.S_IMODE(os.stat(directory + "Pie.md").st_mode)
+    assert mode == 0o640
+
+
+def test_reports_failed_renders(tmp_path):
+    directory = str(tmp_path) + "/"
+    broken = get_recipe("Broken")
+    broken.ingredients = None  # rendering raises TypeError
+
+    results = write_all(directory, [broken, get_recipe("Pie"),
+                                    get_recipe("Pie")])
+
+    assert isinstance(results["0"], TypeError)
+    assert results["1"] is None
+    assert isinstance(results["2"], FileExistsError)
+    assert os.listdir(directory) == ["Pie.md"]
+
+
+def test_reports_directory_fsync_errors(tmp_path, monkeypatch):
+    directory = str(tmp_path) + "/"
+    fsync_path = writer.fsync_path
+
+    def failing_fsync(path):
+        if os.path.isdir(path):
+            raise OSError(5, "Input/output error")
+        fsync_path(path)
+
+    monkeypatch.setattr(writer, "fsync_path", failing_fsync)
+    recipes = [get_recipe("Pie {}".format(i)) for i in range(5)]
+    results = write_all(directory, recipes, fsync=FSYNC_BATCH, batch_size=2,
+                        max_pending=1)
+
+    assert len(results) == 5
+    if os.name == "posix":
+        assert all(isinstance(error, OSError) for error in results.values())
+    assert not [name for name in os.listdir(directory)
+                if name.endswith(".tmp")]